@@ -6,22 +6,24 @@ Supports users from any country with localized currency and benchmarks
 
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime, timedelta
-import joblib
+import logging
+import threading
+from typing import TypedDict
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(__file__))
 
 from src.feature_engineer import FinancialFeatureEngineer
-from src.preprocessor import FinancialDataPreprocessor
 from src.recommender import FinancialRecommendationEngine
+from src.profile_scorer import FastProfileScorer
+from src.registry import artifact_path, current_bundle
 from src.utils import VisualizationUtils, DataUtils
 import config
 
+logger = logging.getLogger(__name__)
+
 # ==================== PAGE CONFIG ====================
 
 st.set_page_config(
@@ -152,6 +154,175 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# ==================== MODEL REGISTRY ====================
+
+# Unversioned layout only (before the first promotion): files whose size or mtime change triggers a reload
+ARTIFACT_PATHS = [
+    config.RISK_MODEL_PATH, config.HEALTH_MODEL_PATH, config.FORECAST_MODEL_PATH,
+    config.RISK_BOOSTER_PATH, config.HEALTH_BOOSTER_PATH, config.FORECAST_ARRAYS_DIR / 'manifest.json',
+    config.SCALER_PATH, config.SCORER_DIR / 'manifest.json'
+]
+
+
+class Predictions(TypedDict):
+    """Result of ModelRegistry.predict_all for one profile"""
+    risk_category: str
+    risk_probabilities: dict
+    predicted_health_score: float
+    forecasted_expenses: float
+
+
+class ModelRegistry:
+    """
+    Compiled scorer plus, when needed, the full models and preprocessor, shared by every session.
+    
+    With config.FAST_STARTUP only the memory-mapped compiled scorer is loaded;
+    the models (and scikit-learn/XGBoost) are loaded the first time a prediction
+    falls back to the DataFrame path. Artifacts are reloaded when they change on
+    disk, so a retrain is picked up without restarting Streamlit. A reload builds
+    the new set completely before swapping it in; a failed load keeps the old one.
+    
+    Artifacts come from the promoted version in the model registry
+    (src/registry.py): a new version is one read of its CURRENT pointer, and
+    its bundle never changes, so all parts of a set come from the same run.
+    
+    Prediction needs no lock: the compiled scorer and the fitted models are
+    only read, and FastProfileScorer keeps no per-call state on itself.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.model_dir = None
+        self.state = None  # (fast_scorer, models, preprocessor)
+        self.load_error = None  # Why the latest artifacts could not be loaded, for the UI
+        self.failed_version = None
+        self.refresh()
+    
+    @staticmethod
+    def artifact_version():
+        """(version, model_dir) of the promoted bundle; without one, the files' (size, mtime) as version"""
+        version, model_dir = current_bundle()
+        if version is not None:
+            return version, model_dir
+        
+        version = []
+        for path in ARTIFACT_PATHS:
+            try:
+                stat = os.stat(path)
+                version.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                version.append(None)
+        return tuple(version), model_dir
+    
+    @property
+    def loaded(self):
+        return self.state is not None
+    
+    @staticmethod
+    def load_full_models(model_dir):
+        """Models and fitted preprocessor for the DataFrame path (imports scikit-learn and XGBoost)"""
+        from src.model_trainer import FinancialModelTrainer
+        from src.preprocessor import FinancialDataPreprocessor
+        
+        trainer = FinancialModelTrainer()
+        # The forecaster's node arrays are memory-mapped, so workers share one copy
+        trainer.load_models(forest_arrays=True, model_dir=model_dir)
+        preprocessor = FinancialDataPreprocessor()
+        preprocessor.load_preprocessor(artifact_path(config.SCALER_PATH, model_dir))
+        return trainer.models, preprocessor
+    
+    def refresh(self):
+        """Reload the artifacts if they changed; returns True when a new set was swapped in"""
+        version, model_dir = self.artifact_version()
+        if version == self.version:
+            self.load_error = None  # e.g. CURRENT rolled back past a version that failed to load
+            return False
+        
+        with self.lock:
+            if version == self.version:
+                return False
+            try:
+                scorer_dir = artifact_path(config.SCORER_DIR, model_dir)
+                compiled = (scorer_dir / 'manifest.json').exists()
+                if config.FAST_STARTUP and compiled:
+                    state = (FastProfileScorer.load(scorer_dir), None, None)
+                else:
+                    models, preprocessor = self.load_full_models(model_dir)
+                    try:
+                        # Compiling needs the pickled forest, not its memory-mapped arrays
+                        fast_scorer = (FastProfileScorer.load(scorer_dir) if compiled
+                                       else FastProfileScorer(preprocessor))
+                    except OSError:
+                        fast_scorer = None  # Predictions use the DataFrame path
+                    except Exception:
+                        logger.exception("Could not compile the fast scorer, using the DataFrame path")
+                        fast_scorer = None
+                    state = (fast_scorer, models, preprocessor)
+            except OSError:
+                return False  # Missing, or a retrain is still writing; retried on the next call
+            except Exception as e:
+                # Present but unloadable (corrupt or incompatible): keep serving the old set, and say why
+                if version != self.failed_version:
+                    logger.exception("Could not load model artifacts from %s", model_dir)
+                    self.failed_version = version
+                self.load_error = f"{type(e).__name__}: {e}"
+                return False
+            
+            self.state = state
+            self.load_error = None
+            self.version = version
+            self.model_dir = model_dir
+        return True
+    
+    def fallback_models(self):
+        """Models and preprocessor of the current set, loading them on first use"""
+        with self.lock:
+            fast_scorer, models, preprocessor = self.state
+            if models is None:
+                models, preprocessor = self.load_full_models(self.model_dir)
+                self.state = (fast_scorer, models, preprocessor)
+        return models, preprocessor
+    
+    def predict_all(self, features) -> Predictions:
+        """Risk category and probabilities, health score and expense forecast for one engineered profile"""
+        self.refresh()
+        fast_scorer, models, preprocessor = self.state
+        
+        if fast_scorer is not None:
+            try:
+                return fast_scorer.predict(features)
+            except (KeyError, TypeError, ValueError):
+                # Inputs the compiled path cannot handle: log it and use the DataFrame pipeline below
+                logger.exception("Fast scorer failed, falling back to the DataFrame pipeline")
+        
+        if models is None:
+            models, preprocessor = self.fallback_models()
+        X = preprocessor.transform_features(pd.DataFrame([features]))
+        
+        def model_input(model_name):
+            if model_name in preprocessor.model_features:
+                return preprocessor.model_view(X, model_name)
+            return X
+        
+        risk_proba = models['risk_classifier'].predict_proba(model_input('risk_classifier'))[0]
+        health_score = models['health_predictor'].predict(model_input('health_predictor'))[0]
+        expense_forecast = models['expense_forecaster'].predict(model_input('expense_forecaster'))[0]
+        
+        return {
+            'risk_category': config.RISK_LABELS[int(risk_proba.argmax())],
+            'risk_probabilities': dict(zip(config.RISK_LABELS, risk_proba.tolist())),
+            'predicted_health_score': float(max(0, min(100, health_score))),
+            'forecasted_expenses': float(max(0, expense_forecast))
+        }
+
+
+@st.cache_resource
+def get_model_registry():
+    """The process-wide ModelRegistry"""
+    return ModelRegistry()
+
+
 # ==================== MAIN APP CLASS ====================
 
 class GlobalFinSightApp:
@@ -159,16 +330,16 @@ class GlobalFinSightApp:
     
     def __init__(self):
         self.initialize_session_state()
-        self.load_models()
+        self.registry = get_model_registry()
+        self.registry.refresh()
+        if self.registry.load_error:
+            st.warning(f"⚠️ Could not load the latest models ({self.registry.load_error}); see the server log.")
+        if not self.registry.loaded:
+            st.error("⚠️ Models not found! Run `python train.py` first.")
+            st.stop()
         self.feature_engineer = FinancialFeatureEngineer()
-        self.preprocessor = FinancialDataPreprocessor()
         self.recommender = FinancialRecommendationEngine()
         self.viz = VisualizationUtils()
-        
-        try:
-            self.preprocessor.load_preprocessor()
-        except:
-            pass
     
     def initialize_session_state(self):
         """Initialize session state"""
@@ -184,19 +355,6 @@ class GlobalFinSightApp:
             if key not in st.session_state:
                 st.session_state[key] = value
     
-    @st.cache_resource
-    def load_models(_self):
-        """Load trained models"""
-        try:
-            return {
-                'risk_classifier': joblib.load(config.RISK_MODEL_PATH),
-                'health_predictor': joblib.load(config.HEALTH_MODEL_PATH),
-                'expense_forecaster': joblib.load(config.FORECAST_MODEL_PATH)
-            }
-        except FileNotFoundError:
-            st.error("⚠️ Models not found! Run `python train.py` first.")
-            st.stop()
-    
     def render_header(self):
         """Render header with country info"""
         st.markdown('<h1 class="main-header">🌍 FinSight AI Global</h1>', unsafe_allow_html=True)
@@ -341,38 +499,15 @@ class GlobalFinSightApp:
     
     def engineer_user_features(self, user_data):
         """Engineer features"""
-        df = pd.DataFrame([user_data])
-        df['user_id'] = 'USER_INPUT'
-        df['created_date'] = datetime.now().strftime('%Y-%m-%d')
-        df_engineered = self.feature_engineer.engineer_all_features(df)
-        return df_engineered.iloc[0].to_dict()
+        user_features = self.feature_engineer.compute_profile_features(user_data)
+        user_features['user_id'] = 'USER_INPUT'
+        user_features['created_date'] = datetime.now().strftime('%Y-%m-%d')
+        return user_features
     
     def make_predictions(self, user_features_dict):
         """Make predictions"""
-        df = pd.DataFrame([user_features_dict])
-        
         try:
-            X, _, _ = self.preprocessor.full_preprocessing_pipeline(df.copy(), fit=False)
-            
-            if hasattr(self.preprocessor, 'feature_names') and self.preprocessor.feature_names:
-                missing_cols = set(self.preprocessor.feature_names) - set(X.columns)
-                for col in missing_cols:
-                    X[col] = 0
-                X = X[self.preprocessor.feature_names]
-            
-            risk_pred = self.load_models()['risk_classifier'].predict(X)[0]
-            risk_proba = self.load_models()['risk_classifier'].predict_proba(X)[0]
-            risk_labels = ['Low Risk', 'Medium Risk', 'High Risk']
-            
-            health_score = self.load_models()['health_predictor'].predict(X)[0]
-            expense_forecast = self.load_models()['expense_forecaster'].predict(X)[0]
-            
-            return {
-                'risk_category': risk_labels[risk_pred],
-                'risk_probabilities': {label: prob for label, prob in zip(risk_labels, risk_proba)},
-                'predicted_health_score': max(0, min(100, health_score)),
-                'forecasted_expenses': max(0, expense_forecast)
-            }
+            return self.registry.predict_all(user_features_dict)
         except Exception as e:
             st.error(f"Prediction error: {str(e)}")
             return {
@@ -384,6 +519,8 @@ class GlobalFinSightApp:
     
     def render_overview_tab(self):
         """Render overview with animations"""
+        import plotly.graph_objects as go  # Deferred until a tab renders (slow import)
+        
         st.markdown("<div class='glass-card'>", unsafe_allow_html=True)
         st.header("📊 Financial Dashboard")
         
@@ -639,6 +776,8 @@ class GlobalFinSightApp:
     
     def render_forecast_tab(self):
         """Render forecast"""
+        import plotly.graph_objects as go  # Deferred until a tab renders (slow import)
+        
         st.markdown("<div class='glass-card'>", unsafe_allow_html=True)
         st.header("🔮 Financial Forecast & Projections")
         
@@ -0,0 +1,87 @@
+"""
+Benchmark: app cold start
+Times `import app`, loading the model registry and the first prediction in a fresh interpreter, with
+the full models (config.FAST_STARTUP = False) and with the compiled scorer; needs trained models
+
+Usage: python benchmarks/bench_cold_start.py [--runs 3]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import subprocess
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Slow-to-import libraries the startup-optimised mode should not load
+HEAVY_MODULES = ['sklearn', 'xgboost', 'plotly', 'matplotlib', 'joblib']
+
+# A profile as the sidebar builds it
+SAMPLE_PROFILE = {
+    'age': 32, 'employment_type': 'Full-time', 'dependents': 1, 'credit_score': 720,
+    'monthly_income': 5200.0, 'additional_income': 300.0, 'total_income': 5500.0,
+    'rent': 1400.0, 'groceries': 450.0, 'utilities': 180.0, 'transportation': 220.0, 'entertainment': 160.0,
+    'total_expenses': 2410.0, 'loan_payments': 350.0, 'credit_card_debt': 2400.0,
+    'savings': 600.0, 'emergency_fund': 9000.0, 'investments': 250.0
+}
+
+MODES = {'full-models': False, 'fast-startup': True}
+
+
+def measure(mode):
+    """Run one cold start in this process and print its phase timings as JSON"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        import config
+        config.FAST_STARTUP = MODES[mode]
+        import app
+        imported = time.perf_counter()
+
+        registry = app.ModelRegistry()
+        loaded = time.perf_counter()
+
+        features = app.FinancialFeatureEngineer().compute_profile_features(SAMPLE_PROFILE)
+        registry.predict_all(features)
+        predicted = time.perf_counter()
+
+    print(json.dumps({
+        'import': imported - start,
+        'load': loaded - imported,
+        'predict': predicted - loaded,
+        'heavy': [name for name in HEAVY_MODULES if name in sys.modules]
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--mode', choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode)
+        return
+
+    print(f"median of {args.runs} fresh interpreters (warm page cache), {os.cpu_count()} CPUs")
+    print(f"{'mode':<14} {'import (s)':>10} {'load (s)':>9} {'1st predict (s)':>16} {'total (s)':>10}  heavy modules")
+    for mode in MODES:
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--mode', mode],
+                capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+            runs.append(json.loads(output))
+
+        median = {phase: sorted(run[phase] for run in runs)[len(runs) // 2]
+                  for phase in ['import', 'load', 'predict']}
+        total = sum(median.values())
+        print(f"{mode:<14} {median['import']:>10.2f} {median['load']:>9.2f} {median['predict']:>16.3f} "
+              f"{total:>10.2f}  {', '.join(runs[-1]['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: memory per worker of the expense forecaster
+Starts N worker processes that each load the RandomForest forecaster and predict a batch, then reads
+their memory from /proc/<pid>/smaps_rollup while all are alive; needs trained models, Linux only
+
+Usage: python benchmarks/bench_forecaster_memory.py [--workers 4] [--rows 1000]
+"""
+
+import argparse
+import subprocess
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+# pickle: joblib.load as before; pickle-mmap: joblib.load(mmap_mode='r'); arrays: CompiledForestRegressor.load()
+MODES = ['pickle', 'pickle-mmap', 'arrays']
+
+
+def memory(pid):
+    """Rss, Pss and private (clean + dirty) MB of a process"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return fields['Rss'], fields['Pss'], fields['Private_Clean'] + fields['Private_Dirty']
+
+
+def worker(mode, rows):
+    """Load the forecaster in `mode`, predict once, report the memory from before loading, then wait"""
+    import numpy as np
+    import pandas as pd
+    # Libraries are imported before the baseline, so the growth is the model alone
+    if mode == 'arrays':
+        from src.tree_arrays import CompiledForestRegressor
+    else:
+        import joblib
+        from sklearn.ensemble import RandomForestRegressor
+    baseline = memory('self')
+    if mode == 'arrays':
+        model = CompiledForestRegressor.load()
+    else:
+        model = joblib.load(config.MODEL_DIR / 'expense_forecaster.pkl',
+                            mmap_mode='r' if mode == 'pickle-mmap' else None)
+        assert isinstance(model, RandomForestRegressor)
+
+    columns = list(model.feature_names_in_)
+    model.predict(pd.DataFrame(np.random.default_rng(0).normal(size=(rows, len(columns))), columns=columns))
+    print(*baseline, flush=True)
+    sys.stdin.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        worker(args.mode, args.rows)
+        return
+
+    print(f"{args.workers} concurrent workers, {args.rows:,}-row predict each; MB per worker, "
+          f"growth over the worker's state before loading")
+    print(f"{'mode':<12} {'Rss':>8} {'Pss':>8} {'private':>8}")
+    for mode in MODES:
+        workers = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--mode', mode,
+                                     '--rows', str(args.rows)],
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                   for _ in range(args.workers)]
+        baselines = [tuple(map(float, process.stdout.readline().split())) for process in workers]
+        # All workers are loaded: shared pages are now split between them in Pss
+        growth = [[after - before for after, before in zip(memory(process.pid), baseline)]
+                  for process, baseline in zip(workers, baselines)]
+        for process in workers:
+            process.communicate('')
+
+        rss, pss, private = (sum(values) / len(values) for values in zip(*growth))
+        print(f"{mode:<12} {rss:>8.1f} {pss:>8.1f} {private:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
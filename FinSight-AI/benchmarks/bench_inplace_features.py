@@ -0,0 +1,102 @@
+"""
+Benchmark: peak memory of feature engineering + preprocessing
+Compares the previous copy-per-stage flow with the copy-once default and the in-place mode
+
+Usage: python benchmarks/bench_inplace_features.py [--rows 1000000]
+"""
+
+import argparse
+import contextlib
+import io
+import resource
+import subprocess
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_generator import FinancialDataGenerator
+from src.feature_engineer import FinancialFeatureEngineer
+from src.preprocessor import FinancialDataPreprocessor
+
+
+def copy_per_stage(df):
+    """Previous behaviour: every stage copied its input, and train.py copied again"""
+    engineer = FinancialFeatureEngineer()
+    df = engineer.create_ratio_features(df)
+    df = engineer.create_financial_health_score(df)
+    df = engineer.create_risk_category(df)
+
+    preprocessor = FinancialDataPreprocessor()
+    staged = preprocessor.handle_missing_values(df.copy())
+    staged = preprocessor.encode_categorical_features(staged)
+    X, y = preprocessor.create_feature_matrix(staged, target_col='financial_health_score')
+    return preprocessor.scale_features(X), y
+
+
+def copy_once(df):
+    """Default behaviour: each entry point copies its input once"""
+    df = FinancialFeatureEngineer().engineer_all_features(df)
+    X, y, _ = FinancialDataPreprocessor().full_preprocessing_pipeline(df, target_col='financial_health_score')
+    return X, y
+
+
+def in_place(df):
+    """Opt-in zero-copy mode: derived columns are appended to the base frame"""
+    df = FinancialFeatureEngineer().engineer_all_features(df, inplace=True)
+    X, y, _ = FinancialDataPreprocessor().full_preprocessing_pipeline(
+        df, target_col='financial_health_score', inplace=True
+    )
+    return X, y
+
+
+MODES = {
+    'copy-per-stage': copy_per_stage,
+    'copy-once': copy_once,
+    'in-place': in_place
+}
+
+
+def max_rss_mb():
+    """Peak resident set size of this process so far (MB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(mode, rows):
+    """Run one mode in this process; print raw frame size, peak RSS above baseline and wall time"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = FinancialDataGenerator(rows).generate_complete_dataset()
+    base_mb = df.memory_usage(deep=True).sum() / 1e6
+    baseline_rss = max_rss_mb()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        MODES[mode](df)
+    elapsed = time.perf_counter() - start
+
+    print(f"{base_mb} {max_rss_mb() - baseline_rss} {elapsed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--mode', choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args.rows)
+        return
+
+    # Each mode runs in a fresh interpreter so peak RSS is not shared between them
+    print(f"{'mode':<16} {'raw frame (MB)':>15} {'peak RSS growth (MB)':>21} {'time (s)':>9}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--rows', str(args.rows), '--mode', mode],
+            capture_output=True, text=True, check=True
+        ).stdout.split()
+        base_mb, peak_mb, elapsed = map(float, output[-3:])
+        print(f"{mode:<16} {base_mb:>15.1f} {peak_mb:>21.1f} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
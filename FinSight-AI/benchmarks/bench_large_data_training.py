@@ -0,0 +1,126 @@
+"""
+Benchmark: XGBoost training of the risk and health models
+Compares per-model sklearn fits on DataFrames with the large-data mode (one shared QuantileDMatrix)
+
+Usage: python benchmarks/bench_large_data_training.py [--rows 1000000] [--rounds 50]
+"""
+
+import argparse
+import contextlib
+import io
+import resource
+import subprocess
+import threading
+import time
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from src.data_generator import FinancialDataGenerator
+from src.feature_engineer import FinancialFeatureEngineer
+from src.preprocessor import FinancialDataPreprocessor
+from src.model_trainer import FinancialModelTrainer
+from src.tuner import TUNABLE_MODELS
+
+
+def per_model_fits(trainer, datasets, n_jobs):
+    """Default mode: each wrapper converts its own DataFrame and builds its own matrix"""
+    for name in TUNABLE_MODELS:
+        trainer.train_with_timing(name, *datasets[name], n_jobs)
+
+
+def shared_matrix(trainer, datasets, n_jobs):
+    """Large-data mode: quantise once, swap labels between models"""
+    X_train, _, X_test, _ = datasets['risk_classifier']
+    dtrain, dtest = trainer.build_quantile_matrices(X_train, X_test, n_jobs)
+    trainer.train_shared_boosters(
+        dtrain, dtest, {name: (datasets[name][1], datasets[name][3]) for name in TUNABLE_MODELS}, n_jobs
+    )
+
+
+MODES = {
+    'per-model': per_model_fits,
+    'shared-matrix': shared_matrix
+}
+
+
+def current_rss_mb():
+    """Current resident set size of this process (MB, Linux)"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1e6
+
+
+class PeakRSSSampler(threading.Thread):
+    """Tracks the highest current RSS while training runs (preprocessing peaks are excluded)"""
+
+    def __init__(self, interval=0.01):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+
+def measure(mode, rows, rounds):
+    """Run one mode in this process; print peak RSS growth, wall time, accuracy and health MAE"""
+    # Same round count for both models and both modes
+    config.RISK_CLASSIFIER_PARAMS['n_estimators'] = rounds
+    config.HEALTH_PREDICTOR_PARAMS['n_estimators'] = rounds
+    n_jobs = config.TRAINING_THREADS or os.cpu_count() or 1
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = FinancialFeatureEngineer().engineer_all_features(
+            FinancialDataGenerator(rows).generate_complete_dataset(), inplace=True
+        )
+        preprocessor = FinancialDataPreprocessor()
+        X, targets = preprocessor.shared_preprocessing_pipeline(
+            df, config.MODEL_TARGETS.values(), inplace=True, shared_models=list(TUNABLE_MODELS)
+        )
+        datasets = preprocessor.split_model_datasets(X, targets)
+        del df
+    baseline_rss = current_rss_mb()
+    sampler = PeakRSSSampler()
+    sampler.start()
+
+    trainer = FinancialModelTrainer()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        MODES[mode](trainer, datasets, n_jobs)
+    elapsed = time.perf_counter() - start
+    sampler.stopped.set()
+    sampler.join()
+
+    print(f"{sampler.peak - baseline_rss} {elapsed} "
+          f"{trainer.metrics['risk_classifier']['accuracy']} {trainer.metrics['health_predictor']['mae']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--mode', choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args.rows, args.rounds)
+        return
+
+    # Each mode runs in a fresh interpreter so peak RSS is not shared between them
+    print(f"{args.rows:,} rows, {args.rounds} rounds per model, {os.cpu_count()} CPUs")
+    print(f"{'mode':<15} {'peak RSS growth (MB)':>21} {'time (s)':>9} {'risk acc':>9} {'health MAE':>11}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--rows', str(args.rows),
+             '--rounds', str(args.rounds), '--mode', mode],
+            capture_output=True, text=True, check=True
+        ).stdout.split()
+        peak_mb, elapsed, accuracy, mae = map(float, output[-4:])
+        print(f"{mode:<15} {peak_mb:>21.1f} {elapsed:>9.2f} {accuracy:>9.4f} {mae:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: latency of scoring one profile
+Compares the pandas path (one-row DataFrame through feature engineering, preprocessing and the
+sklearn wrappers) with FastProfileScorer; needs trained models (python train.py)
+
+Usage: python benchmarks/bench_profile_latency.py [--profiles 200] [--repeat 3]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+import numpy as np
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from src.data_generator import FinancialDataGenerator
+from src.feature_engineer import FEATURE_REGISTRY, METADATA_COLUMNS
+from src.profile_scorer import FastProfileScorer
+from src.score import BatchScorer
+
+
+def sample_profiles(n):
+    """Raw profile dicts of Python scalars, as the app builds them"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = FinancialDataGenerator(n).generate_complete_dataset()
+    df = df.drop(columns=[col for col in df.columns if col in FEATURE_REGISTRY or col in METADATA_COLUMNS])
+    return [{name: value.item() if isinstance(value, np.generic) else value for name, value in row.items()}
+            for row in df.astype(object).to_dict('records')]
+
+
+def latencies(score, profiles, repeat):
+    """Per-call wall times (µs) after one warm-up pass"""
+    for profile in profiles:
+        score(profile)
+
+    times = []
+    for _ in range(repeat):
+        for profile in profiles:
+            start = time.perf_counter()
+            score(profile)
+            times.append(time.perf_counter() - start)
+    return np.array(times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    profiles = sample_profiles(args.profiles)
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch_scorer = BatchScorer(n_jobs=1)
+        fast_scorer = FastProfileScorer(batch_scorer.preprocessor, batch_scorer.models)
+
+    def pandas_path(profile):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return batch_scorer.score_frame(pd.DataFrame([profile])).iloc[0]
+
+    # Both paths must agree before their timings mean anything
+    worst = {'risk': 0, 'health': 0, 'expenses': 0}
+    for profile in profiles:
+        expected = pandas_path(profile)
+        result = fast_scorer.predict(profile)
+        assert result['risk_category'] == expected['predicted_risk_category']
+        worst['risk'] = max(worst['risk'], max(
+            abs(result['risk_probabilities'][label] - expected[column])
+            for label, column in zip(config.RISK_LABELS, ['prob_' + label.lower().replace(' ', '_')
+                                                          for label in config.RISK_LABELS])
+        ))
+        worst['health'] = max(worst['health'], abs(result['predicted_health_score']
+                                                   - expected['predicted_health_score']))
+        worst['expenses'] = max(worst['expenses'], abs(result['forecasted_expenses']
+                                                       - expected['forecasted_expenses']))
+
+    print(f"{args.profiles:,} profiles x {args.repeat}, {os.cpu_count()} CPUs")
+    print(f"max abs difference: risk prob {worst['risk']:.2e}, health {worst['health']:.2e}, "
+          f"expenses {worst['expenses']:.2e}")
+    print(f"{'path':<8} {'p50 (µs)':>10} {'p90 (µs)':>10} {'p99 (µs)':>10}")
+    for name, score in [('pandas', pandas_path), ('fast', fast_scorer.predict)]:
+        times = latencies(score, profiles, args.repeat)
+        p50, p90, p99 = np.percentile(times, [50, 90, 99])
+        print(f"{name:<8} {p50:>10.0f} {p90:>10.0f} {p99:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: recommendations for many users
+Compares a Python loop over the single-profile methods (generate_recommendations,
+analyze_financial_profile, generate_ai_insights) with generate_batch on a feature DataFrame
+
+Usage: python benchmarks/bench_recommendations_batch.py [--rows 50000]
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import time
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+from src.data_generator import FinancialDataGenerator
+from src.feature_engineer import FinancialFeatureEngineer
+from src.recommender import FinancialRecommendationEngine
+
+
+def loop(engine, profiles):
+    """The three single-profile methods for each profile dict"""
+    return [(engine.generate_recommendations(profile), engine.analyze_financial_profile(profile),
+             engine.generate_ai_insights(profile)) for profile in profiles]
+
+
+def same(actual, expected):
+    """Equal outputs; amounts (raw floats, vectorized vs scalar math) to within rounding"""
+    if isinstance(expected, dict):
+        if 'amounts' in expected:
+            return (actual.keys() == expected.keys() and actual['amounts'].keys() == expected['amounts'].keys()
+                    and all(math.isclose(actual['amounts'][name], value) for name, value in expected['amounts'].items())
+                    and all(actual[key] == value for key, value in expected.items() if key != 'amounts'))
+        return actual.keys() == expected.keys() and all(same(actual[key], value) for key, value in expected.items())
+    if isinstance(expected, (list, tuple)):
+        return len(actual) == len(expected) and all(map(same, actual, expected))
+    return actual == expected
+
+
+def check(engine, table, profiles, results):
+    """Rendered batch rows must equal the single-profile output for every profile"""
+    rendered = engine.render_batch(table)
+    expected = {profile['user_id']: result for profile, result in zip(profiles, results)}
+    actual = {user_id: ([], {'strengths': [], 'weaknesses': [], 'opportunities': [], 'threats': []}, [])
+              for user_id in expected}
+    for user_id, rule_id, priority, output in zip(table['user_id'], table['rule_id'], table['priority'], rendered):
+        rule = engine.rule_table.rules[rule_id]
+        recommendations, analysis, insights = actual[user_id]
+        if rule['group'] == 'recommendations':
+            recommendations.append({'priority': priority, **output})
+        elif rule['group'] == 'analysis':
+            analysis[rule['section']].append(output['text'])
+        else:
+            insights.append(output)
+    assert all(same(actual[user_id], tuple(result)) for user_id, result in expected.items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50_000)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = FinancialFeatureEngineer().compute_features(FinancialDataGenerator(args.rows).generate_complete_dataset())
+    # Mixed countries, so amounts are checked in every configured currency
+    df['country'] = np.random.default_rng(0).choice(list(config.COUNTRY_CONFIG), len(df))
+    profiles = [{name: value.item() if hasattr(value, 'item') else value for name, value in row.items()}
+                for row in df.astype(object).to_dict('records')]
+    engine = FinancialRecommendationEngine()
+
+    start = time.perf_counter()
+    results = loop(engine, profiles)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table = engine.generate_batch(df)
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.render_batch(table)
+    render_time = time.perf_counter() - start
+
+    check(engine, table, profiles, results)
+    print(f"{args.rows:,} users, {len(table):,} fired rules (outputs identical)")
+    print(f"{'path':<28} {'time (s)':>9} {'users/sec':>12}")
+    for name, elapsed in [('loop (3 methods, text)', loop_time), ('generate_batch (no text)', batch_time),
+                          ('generate_batch + render', batch_time + render_time)]:
+        print(f"{name:<28} {elapsed:>9.2f} {args.rows / elapsed:>12,.0f}")
+
+    cache = engine.cache_info()
+    print(f"skeleton cache (loop): {cache['hits']:,} hits, {cache['misses']:,} misses, "
+          f"hit rate {cache['hit_rate']:.1%}, {cache['size']:,}/{cache['maxsize']:,} signatures")
+
+
+if __name__ == "__main__":
+    main()
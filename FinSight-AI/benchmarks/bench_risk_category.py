@@ -0,0 +1,87 @@
+"""
+Benchmark: risk scoring + labelling
+Compares the previous list-comprehension labelling with the vectorized path
+
+Usage: python benchmarks/bench_risk_category.py [--rows 1000000 10000000]
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.feature_engineer import FinancialFeatureEngineer
+
+
+def legacy_create_risk_category(df):
+    """Risk labelling as implemented before vectorization"""
+    df = df.copy()
+
+    risk_score = np.zeros(len(df))
+
+    risk_score += np.where(df['debt_to_income_ratio'] > 0.43, 3,
+                          np.where(df['debt_to_income_ratio'] > 0.36, 2, 1))
+
+    risk_score += np.where(df['savings_ratio'] < 0.05, 3,
+                          np.where(df['savings_ratio'] < 0.15, 2, 1))
+
+    risk_score += np.where(df['emergency_fund_months'] < 1, 3,
+                          np.where(df['emergency_fund_months'] < 3, 2, 1))
+
+    df['risk_category'] = ['Low Risk' if score <= 5 else 'Medium Risk' if score <= 7 else 'High Risk'
+                           for score in risk_score]
+
+    df['risk_score'] = risk_score
+
+    return df
+
+
+def make_frame(rows, seed=0):
+    """Ratio columns with realistic spread"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'debt_to_income_ratio': rng.uniform(0, 0.6, rows).astype(np.float32),
+        'savings_ratio': rng.uniform(0, 0.4, rows).astype(np.float32),
+        'emergency_fund_months': rng.uniform(0, 8, rows).astype(np.float32)
+    })
+
+
+def best_of(fn, repeats):
+    """Best wall time of `repeats` runs"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    engineer = FinancialFeatureEngineer()
+
+    print(f"{'rows':>12} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for rows in args.rows:
+        df = make_frame(rows)
+
+        legacy = legacy_create_risk_category(df)
+        vectorized = engineer.create_risk_category(df)
+        assert (legacy['risk_category'].to_numpy() == vectorized['risk_category'].astype(str).to_numpy()).all()
+        assert (legacy['risk_score'].to_numpy() == vectorized['risk_score'].to_numpy()).all()
+        del legacy, vectorized
+
+        legacy_time = best_of(lambda: legacy_create_risk_category(df), args.repeats)
+        vectorized_time = best_of(lambda: engineer.create_risk_category(df), args.repeats)
+
+        print(f"{rows:>12,} {legacy_time:>12.3f} {vectorized_time:>15.3f} {legacy_time / vectorized_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
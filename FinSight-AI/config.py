@@ -13,21 +13,47 @@ RAW_DATA_DIR = DATA_DIR / 'raw'
 PROCESSED_DATA_DIR = DATA_DIR / 'processed'
 MODEL_DIR = BASE_DIR / 'models'
 
-# Create directories
-for directory in [DATA_DIR, RAW_DATA_DIR, PROCESSED_DATA_DIR, MODEL_DIR]:
-    directory.mkdir(parents=True, exist_ok=True)
+
+def ensure_directories():
+    """Create the data and model directories (called by entry points that write to them)"""
+    for directory in [DATA_DIR, RAW_DATA_DIR, PROCESSED_DATA_DIR, MODEL_DIR, REGISTRY_DIR]:
+        directory.mkdir(parents=True, exist_ok=True)
+
+
+# Dataset Storage ('parquet' or 'csv'; CSV stays available via storage.export_csv)
+DATA_FORMAT = 'parquet'
+PARQUET_COMPRESSION = 'zstd'
 
 # File Paths
-RAW_DATA_PATH = RAW_DATA_DIR / 'financial_data.csv'
-PROCESSED_DATA_PATH = PROCESSED_DATA_DIR / 'processed_financial_data.csv'
+RAW_DATA_PATH = RAW_DATA_DIR / f'financial_data.{DATA_FORMAT}'
+PROCESSED_DATA_PATH = PROCESSED_DATA_DIR / f'processed_financial_data.{DATA_FORMAT}'
 RISK_MODEL_PATH = MODEL_DIR / 'risk_classifier.pkl'
 HEALTH_MODEL_PATH = MODEL_DIR / 'health_predictor.pkl'
 FORECAST_MODEL_PATH = MODEL_DIR / 'expense_forecaster.pkl'
 SCALER_PATH = MODEL_DIR / 'scaler.pkl'
+# Native XGBoost copies of the boosters, loaded in preference to the pickles
+RISK_BOOSTER_PATH = MODEL_DIR / 'risk_classifier.ubj'
+HEALTH_BOOSTER_PATH = MODEL_DIR / 'health_predictor.ubj'
+# Compiled single-profile scorer: .npy node arrays plus manifest.json, memory-mapped at load
+SCORER_DIR = MODEL_DIR / 'scorer'
+# Expense forecaster as memory-mapped node arrays, shared by every process that loads it
+FORECAST_ARRAYS_DIR = MODEL_DIR / 'expense_forecaster'
+FORECAST_ARCHIVE_PATH = MODEL_DIR / 'expense_forecaster.npz'  # Compressed copy for shipping (optional)
+METRICS_PATH = MODEL_DIR / 'training_metrics.json'
+# Published model versions (src/registry.py); CURRENT names the one being served
+REGISTRY_DIR = MODEL_DIR / 'registry'
+CURRENT_VERSION_PATH = REGISTRY_DIR / 'CURRENT'
+CHECKPOINT_PATH = MODEL_DIR / 'pipeline_state.json'
+TUNED_PARAMS_PATH = MODEL_DIR / 'tuned_params.json'
+TUNING_HISTORY_PATH = MODEL_DIR / 'tuning_history.json'
+# Recommendation rule table (src/recommender.py); edits are picked up without a restart
+RECOMMENDATION_RULES_PATH = BASE_DIR / 'recommendation_rules.json'
+RECOMMENDATION_CACHE_SIZE = 1024  # Bucketed signatures kept per rule table and group (LRU)
 
 # Data Generation Parameters
 NUM_SAMPLES = 3000
 RANDOM_STATE = 42
+CHUNK_SIZE = 100_000  # Rows per chunk for out-of-core generation
 
 # Model Hyperparameters
 RISK_CLASSIFIER_PARAMS = {
@@ -45,6 +71,61 @@ HEALTH_PREDICTOR_PARAMS = {
     'random_state': RANDOM_STATE
 }
 
+# Hyperparameter Search (src/tuner.py)
+# Lists are sampled uniformly; (low, high) tuples as uniform floats, (low, high, 'log') log-uniform
+RISK_CLASSIFIER_SEARCH_SPACE = {
+    'max_depth': [3, 4, 6, 8, 10],
+    'learning_rate': (0.02, 0.3, 'log'),
+    'subsample': (0.6, 1.0),
+    'colsample_bytree': (0.6, 1.0),
+    'min_child_weight': [1, 3, 5, 10]
+}
+
+HEALTH_PREDICTOR_SEARCH_SPACE = {
+    'max_depth': [3, 4, 6, 8, 10],
+    'learning_rate': (0.02, 0.3, 'log'),
+    'subsample': (0.6, 1.0),
+    'colsample_bytree': (0.6, 1.0),
+    'min_child_weight': [1, 3, 5, 10]
+}
+
+TUNING_CANDIDATES = 27        # Configurations sampled for the first halving rung
+TUNING_HALVING_FACTOR = 3     # Keep the best 1/factor each rung; rounds grow by the factor
+TUNING_MIN_ROUNDS = 50        # Boosting rounds for the first rung
+TUNING_MAX_ROUNDS = 1000      # Upper bound on rounds for the last rung
+TUNING_TIME_BUDGET = 600      # Seconds; no new trials start once it is spent
+EARLY_STOPPING_ROUNDS = 20
+
+# Training Resources (None = all cores)
+TRAINING_THREADS = None
+PARALLEL_TRAINING = True
+CV_FOLDS = 5                      # train.py --cv: k-fold evaluation, stratified on risk
+
+# Large-data XGBoost mode: one quantised (hist) matrix shared by the risk and health models
+LARGE_DATA_ROWS = 1_000_000       # train.py switches to it from this many records (or --large-data)
+XGB_TREE_METHOD = 'hist'
+XGB_MAX_BIN = 256
+XGB_CACHE_DIR = DATA_DIR / 'xgb_cache'  # External-memory pages (--external-memory)
+EXTERNAL_MEMORY_RF_ROWS = 500_000  # Random forest has no out-of-core fit: trains on a sample this size
+
+# App startup: serve from the compiled scorer in SCORER_DIR; the scikit-learn/XGBoost models
+# are loaded (and those libraries imported) only if it is missing or a prediction falls back
+FAST_STARTUP = True
+
+# Target column of each model
+MODEL_TARGETS = {
+    'risk_classifier': 'risk_category',
+    'health_predictor': 'financial_health_score',
+    'expense_forecaster': 'total_expenses'
+}
+
+# Columns withheld from each model's inputs: its target plus any leakage
+MODEL_EXCLUDED_FEATURES = {
+    'risk_classifier': ['risk_category', 'risk_score'],
+    'health_predictor': ['financial_health_score'],
+    'expense_forecaster': ['total_expenses']
+}
+
 # ==================== MULTI-CURRENCY CONFIGURATION ====================
 
 CURRENCIES = {
@@ -129,19 +210,35 @@ COUNTRY_CONFIG = {
 }
 
 # Financial Thresholds
+# Part of the row fingerprints (feature_settings): changing one re-engineers every row,
+# also with train.py --incremental
 SAVINGS_RATIO_THRESHOLD = {
     'excellent': 0.30,
     'good': 0.20,
+    'low': 0.15,
     'moderate': 0.10,
     'poor': 0.05
 }
 
+# score_risk adds a point above 'elevated' and another above 'critical'
 DEBT_TO_INCOME_THRESHOLD = {
     'low_risk': 0.20,
-    'medium_risk': 0.35,
+    'elevated': 0.36,
+    'critical': 0.43,
     'high_risk': 0.50
 }
 
+EMERGENCY_FUND_THRESHOLD = {
+    'critical': 1,
+    'low': 3
+}
+
+# Risk score (3-9) upper bounds for each label; anything above is 'High Risk'
+RISK_SCORE_CUTOFFS = {
+    'Low Risk': 5,
+    'Medium Risk': 7
+}
+
 EXPENSE_RATIO_THRESHOLD = {
     'conservative': 0.50,
     'moderate': 0.70,
@@ -159,4 +256,45 @@ FEATURE_GROUPS = {
 }
 
 # Risk Categories
-RISK_LABELS = ['Low Risk', 'Medium Risk', 'High Risk']
\ No newline at end of file
+RISK_LABELS = ['Low Risk', 'Medium Risk', 'High Risk']
+
+EMPLOYMENT_TYPES = ['Full-time', 'Part-time', 'Self-employed']
+
+# Compact dtype schema for financial records (applied by src/schema.py)
+COLUMN_DTYPES = {
+    # Demographics
+    'age': 'int16',
+    'dependents': 'int16',
+    'credit_score': 'int16',
+    'employment_type': 'category',
+    # Money columns
+    'monthly_income': 'float32',
+    'additional_income': 'float32',
+    'total_income': 'float32',
+    'rent': 'float32',
+    'groceries': 'float32',
+    'utilities': 'float32',
+    'transportation': 'float32',
+    'entertainment': 'float32',
+    'total_expenses': 'float32',
+    'loan_payments': 'float32',
+    'credit_card_debt': 'float32',
+    'savings': 'float32',
+    'emergency_fund': 'float32',
+    'investments': 'float32',
+    # Engineered features
+    'savings_ratio': 'float32',
+    'debt_to_income_ratio': 'float32',
+    'expense_ratio': 'float32',
+    'investment_ratio': 'float32',
+    'emergency_fund_months': 'float32',
+    'discretionary_ratio': 'float32',
+    'financial_health_score': 'float32',
+    'risk_score': 'int8',
+    'risk_category': 'category'
+}
+
+CATEGORY_LEVELS = {
+    'employment_type': EMPLOYMENT_TYPES,
+    'risk_category': RISK_LABELS
+}
\ No newline at end of file
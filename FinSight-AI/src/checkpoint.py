@@ -0,0 +1,104 @@
+"""
+Pipeline Checkpoints
+Content-hash manifest that lets the training pipeline skip up-to-date stages
+"""
+
+import hashlib
+import json
+from pathlib import Path
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import config
+
+
+def hash_file(filepath, block_size=1 << 20):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_params(params):
+    """SHA-256 of a JSON-serialisable parameter structure"""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PipelineCheckpoint:
+    """
+    Records, per stage, a key over its inputs and the hashes of its outputs.
+    
+    A stage is current when its key is unchanged and every output still
+    exists with the recorded content. The manifest is rewritten atomically
+    after each completed stage, so a failed run resumes from the last good one.
+    """
+    
+    def __init__(self, filepath=config.CHECKPOINT_PATH):
+        self.filepath = Path(filepath)
+        self.stages = self._load()
+        self._file_hashes = {}
+    
+    def _load(self):
+        """Read the manifest; a missing or unreadable one means nothing is checkpointed"""
+        try:
+            with open(self.filepath) as f:
+                return json.load(f).get('stages', {})
+        except (OSError, ValueError):
+            return {}
+    
+    def file_hash(self, filepath):
+        """Content hash of a file, memoised on (size, mtime) for this run"""
+        stat = os.stat(filepath)
+        cache_key = (str(filepath), stat.st_size, stat.st_mtime_ns)
+        if cache_key not in self._file_hashes:
+            self._file_hashes[cache_key] = hash_file(filepath)
+        return self._file_hashes[cache_key]
+    
+    def stage_key(self, inputs=(), params=None):
+        """Key over the contents of input files plus the stage's parameters"""
+        return hash_params({
+            'inputs': {Path(path).name: self.file_hash(path) for path in inputs},
+            'params': params
+        })
+    
+    def is_current(self, stage, key):
+        """True if `stage` last completed with `key` and its outputs are intact"""
+        record = self.stages.get(stage)
+        if not record or record['key'] != key:
+            return False
+        
+        for path, digest in record['outputs'].items():
+            path = config.BASE_DIR / path
+            if not path.exists() or self.file_hash(path) != digest:
+                return False
+        return True
+    
+    def info(self, stage):
+        """Extra details stored with a completed stage"""
+        return self.stages.get(stage, {}).get('info', {})
+    
+    def mark_complete(self, stage, key, outputs, info=None):
+        """Record `stage` as done and persist the manifest"""
+        self.stages[stage] = {
+            'key': key,
+            'outputs': {os.path.relpath(path, config.BASE_DIR): self.file_hash(path) for path in outputs},
+            'info': info or {},
+            'completed_at': pd.Timestamp.now().isoformat(timespec='seconds')
+        }
+        self.save()
+    
+    def invalidate(self, stage):
+        """Forget a stage so it reruns"""
+        if self.stages.pop(stage, None) is not None:
+            self.save()
+    
+    def save(self):
+        """Write the manifest via a temporary file so it is never left half-written"""
+        tmp_path = self.filepath.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'stages': self.stages}, f, indent=2)
+        os.replace(tmp_path, self.filepath)
@@ -3,13 +3,18 @@ Synthetic Financial Data Generator
 Creates realistic financial profiles for training
 """
 
+import argparse
 import numpy as np
 import pandas as pd
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 import config
+from src.schema import apply_dtype_schema
+from src.storage import get_storage
 
 class FinancialDataGenerator:
     """Generates synthetic but realistic financial data"""
@@ -17,25 +22,32 @@ class FinancialDataGenerator:
     def __init__(self, num_samples=config.NUM_SAMPLES, random_state=config.RANDOM_STATE):
         self.num_samples = num_samples
         self.random_state = random_state
-        np.random.seed(random_state)
+        self.created_date = datetime.now().strftime('%Y-%m-%d')
+        # Private legacy stream: same draws as np.random.seed(random_state)
+        # without touching numpy's global state
+        self.rng = np.random.RandomState(random_state)
         
-    def generate_income_data(self):
+    def generate_income_data(self, rng=None, size=None):
         """Generate income data with realistic distribution"""
-        monthly_income = np.random.lognormal(mean=8.5, sigma=0.6, size=self.num_samples)
+        rng = self.rng if rng is None else rng
+        size = self.num_samples if size is None else size
+        monthly_income = rng.lognormal(mean=8.5, sigma=0.6, size=size)
         monthly_income = np.clip(monthly_income, 2500, 15000)
         
-        has_additional = np.random.choice([0, 1], size=self.num_samples, p=[0.8, 0.2])
-        additional_income = has_additional * np.random.gamma(2, 300, size=self.num_samples)
+        has_additional = rng.choice([0, 1], size=size, p=[0.8, 0.2])
+        additional_income = has_additional * rng.gamma(2, 300, size=size)
         
         return monthly_income, additional_income
     
-    def generate_expense_data(self, monthly_income):
+    def generate_expense_data(self, monthly_income, rng=None):
         """Generate expenses correlated with income"""
-        rent = monthly_income * np.random.uniform(0.25, 0.35, size=self.num_samples)
-        groceries = np.random.normal(400, 100, size=self.num_samples).clip(200, 1000)
-        utilities = np.random.normal(150, 50, size=self.num_samples).clip(80, 400)
-        transportation = monthly_income * np.random.uniform(0.05, 0.15, size=self.num_samples)
-        entertainment = monthly_income * np.random.uniform(0.03, 0.10, size=self.num_samples)
+        rng = self.rng if rng is None else rng
+        size = len(monthly_income)
+        rent = monthly_income * rng.uniform(0.25, 0.35, size=size)
+        groceries = rng.normal(400, 100, size=size).clip(200, 1000)
+        utilities = rng.normal(150, 50, size=size).clip(80, 400)
+        transportation = monthly_income * rng.uniform(0.05, 0.15, size=size)
+        entertainment = monthly_income * rng.uniform(0.03, 0.10, size=size)
         
         return {
             'rent': rent,
@@ -45,60 +57,73 @@ class FinancialDataGenerator:
             'entertainment': entertainment
         }
     
-    def generate_debt_data(self, monthly_income):
+    def generate_debt_data(self, monthly_income, rng=None):
         """Generate debt obligations"""
-        has_loan = np.random.choice([0, 1], size=self.num_samples, p=[0.3, 0.7])
-        loan_payments = has_loan * monthly_income * np.random.uniform(0.1, 0.25, size=self.num_samples)
+        rng = self.rng if rng is None else rng
+        size = len(monthly_income)
+        has_loan = rng.choice([0, 1], size=size, p=[0.3, 0.7])
+        loan_payments = has_loan * monthly_income * rng.uniform(0.1, 0.25, size=size)
         
-        has_cc_debt = np.random.choice([0, 1], size=self.num_samples, p=[0.4, 0.6])
-        credit_card_debt = has_cc_debt * np.random.gamma(2, 200, size=self.num_samples)
+        has_cc_debt = rng.choice([0, 1], size=size, p=[0.4, 0.6])
+        credit_card_debt = has_cc_debt * rng.gamma(2, 200, size=size)
         
         return loan_payments, credit_card_debt
     
-    def generate_savings_data(self, monthly_income, total_expenses):
+    def generate_savings_data(self, monthly_income, total_expenses, rng=None):
         """Generate savings based on income and expenses"""
+        rng = self.rng if rng is None else rng
+        size = len(monthly_income)
         potential_savings = monthly_income - total_expenses
-        savings_efficiency = np.random.beta(5, 2, size=self.num_samples)
+        savings_efficiency = rng.beta(5, 2, size=size)
         savings = np.maximum(0, potential_savings * savings_efficiency)
         
-        emergency_fund = total_expenses * np.random.uniform(1, 6, size=self.num_samples)
+        emergency_fund = total_expenses * rng.uniform(1, 6, size=size)
         
-        invests = np.random.choice([0, 1], size=self.num_samples, p=[0.5, 0.5])
-        investments = invests * savings * np.random.uniform(0.3, 0.7, size=self.num_samples)
+        invests = rng.choice([0, 1], size=size, p=[0.5, 0.5])
+        investments = invests * savings * rng.uniform(0.3, 0.7, size=size)
         
         return savings, emergency_fund, investments
     
-    def generate_demographics(self):
+    def generate_demographics(self, rng=None, size=None):
         """Generate demographic information"""
-        ages = np.random.normal(35, 10, size=self.num_samples).clip(22, 65).astype(int)
-        employment_types = np.random.choice(
-            ['Full-time', 'Part-time', 'Self-employed'],
-            size=self.num_samples,
+        rng = self.rng if rng is None else rng
+        size = self.num_samples if size is None else size
+        ages = rng.normal(35, 10, size=size).clip(22, 65).astype(int)
+        employment_types = rng.choice(
+            config.EMPLOYMENT_TYPES,
+            size=size,
             p=[0.75, 0.15, 0.10]
         )
-        dependents = np.random.choice([0, 1, 2, 3], size=self.num_samples, p=[0.3, 0.3, 0.25, 0.15])
-        credit_scores = np.random.normal(700, 80, size=self.num_samples).clip(500, 850).astype(int)
+        dependents = rng.choice([0, 1, 2, 3], size=size, p=[0.3, 0.3, 0.25, 0.15])
+        credit_scores = rng.normal(700, 80, size=size).clip(500, 850).astype(int)
         
         return ages, employment_types, dependents, credit_scores
     
-    def generate_complete_dataset(self):
-        """Generate complete financial dataset"""
-        print("🔄 Generating synthetic financial data...")
+    @staticmethod
+    def make_user_ids(start, stop):
+        """Build USER_xxxxx identifiers for a contiguous row range"""
+        ids = pd.Index(np.arange(start, stop)).astype(str).str.zfill(5)
+        return 'USER_' + ids
+    
+    def build_records(self, rng=None, size=None, start=0):
+        """Generate one block of financial records starting at row `start`"""
+        rng = self.rng if rng is None else rng
+        size = self.num_samples if size is None else size
         
-        monthly_income, additional_income = self.generate_income_data()
+        monthly_income, additional_income = self.generate_income_data(rng, size)
         total_income = monthly_income + additional_income
         
-        expenses = self.generate_expense_data(monthly_income)
+        expenses = self.generate_expense_data(monthly_income, rng)
         total_expenses = sum(expenses.values())
         
-        loan_payments, credit_card_debt = self.generate_debt_data(monthly_income)
+        loan_payments, credit_card_debt = self.generate_debt_data(monthly_income, rng)
         total_expenses += loan_payments
         
-        savings, emergency_fund, investments = self.generate_savings_data(total_income, total_expenses)
-        ages, employment_types, dependents, credit_scores = self.generate_demographics()
+        savings, emergency_fund, investments = self.generate_savings_data(total_income, total_expenses, rng)
+        ages, employment_types, dependents, credit_scores = self.generate_demographics(rng, size)
         
         df = pd.DataFrame({
-            'user_id': [f'USER_{i:05d}' for i in range(self.num_samples)],
+            'user_id': self.make_user_ids(start, start + size),
             'age': ages,
             'employment_type': employment_types,
             'dependents': dependents,
@@ -117,19 +142,124 @@ class FinancialDataGenerator:
             'savings': savings,
             'emergency_fund': emergency_fund,
             'investments': investments,
-            'created_date': datetime.now().strftime('%Y-%m-%d')
+            'created_date': self.created_date
         })
         
+        return apply_dtype_schema(df)
+    
+    def generate_complete_dataset(self):
+        """Generate complete financial dataset"""
+        print("🔄 Generating synthetic financial data...")
+        
+        df = self.build_records()
+        
+        print(f"✅ Generated {len(df)} financial records")
+        return df
+    
+    def count_chunks(self, chunk_size):
+        """Number of chunks of `chunk_size` rows in the dataset"""
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+        return -(-self.num_samples // chunk_size)
+    
+    def chunk_seeds(self, num_chunks):
+        """Independent, reproducible seed for each chunk of the dataset"""
+        return np.random.SeedSequence(self.random_state).spawn(num_chunks)
+    
+    def generate_chunk(self, chunk_index, chunk_size=config.CHUNK_SIZE, seed=None):
+        """
+        Generate a single chunk of the dataset.
+        
+        Chunk i always covers rows [i * chunk_size, (i + 1) * chunk_size) and
+        draws from the i-th child of SeedSequence(random_state), so any chunk
+        can be regenerated on its own.
+        """
+        num_chunks = self.count_chunks(chunk_size)
+        if not 0 <= chunk_index < num_chunks:
+            raise ValueError(f"chunk_index must be in [0, {num_chunks}) for {self.num_samples} samples "
+                             f"in chunks of {chunk_size}, got {chunk_index}")
+        
+        start = chunk_index * chunk_size
+        size = min(chunk_size, self.num_samples - start)
+        if seed is None:
+            seed = self.chunk_seeds(chunk_index + 1)[chunk_index]
+        
+        rng = np.random.default_rng(seed)
+        return self.build_records(rng, size, start)
+    
+    def generate_chunks(self, chunk_size=config.CHUNK_SIZE):
+        """
+        Yield the dataset as DataFrames of at most `chunk_size` rows.
+        
+        Only one chunk is held in memory at a time, so num_samples can be far
+        larger than RAM. Output depends on (random_state, chunk_size) only.
+        """
+        seeds = self.chunk_seeds(self.count_chunks(chunk_size))
+        
+        for chunk_index, seed in enumerate(seeds):
+            yield self.generate_chunk(chunk_index, chunk_size, seed)
+    
+    def generate_chunks_parallel(self, chunk_size=config.CHUNK_SIZE, num_workers=None):
+        """
+        Yield the same chunks as generate_chunks(), built across a process pool.
+        
+        Shards are the fixed-size chunks, each with its own np.random.Generator,
+        so the merged output is bit-identical for any number of workers.
+        Chunks are yielded in order with at most 2 * num_workers in flight.
+        """
+        seeds = self.chunk_seeds(self.count_chunks(chunk_size))
+        num_workers = num_workers or os.cpu_count() or 1
+        
+        if num_workers == 1:
+            yield from self.generate_chunks(chunk_size)
+            return
+        
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            pending = deque()
+            for chunk_index, seed in enumerate(seeds):
+                pending.append(executor.submit(self.generate_chunk, chunk_index, chunk_size, seed))
+                if len(pending) >= 2 * num_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+    
+    def generate_parallel_dataset(self, chunk_size=config.CHUNK_SIZE, num_workers=None):
+        """Generate the complete dataset using a process pool"""
+        print(f"🔄 Generating synthetic financial data with {num_workers or os.cpu_count()} workers...")
+        
+        if self.count_chunks(chunk_size) == 0:
+            # No chunks to concatenate: an empty frame with the schema's columns and dtypes
+            df = self.build_records(np.random.default_rng(self.random_state), 0)
+        else:
+            df = pd.concat(self.generate_chunks_parallel(chunk_size, num_workers), ignore_index=True)
+        
         print(f"✅ Generated {len(df)} financial records")
         return df
     
     def save_data(self, df, filepath=config.RAW_DATA_PATH):
-        """Save generated data to CSV"""
-        df.to_csv(filepath, index=False)
+        """Save generated data (format follows the file suffix)"""
+        get_storage(filepath).write(df, filepath)
         print(f"💾 Data saved to {filepath}")
+    
+    def save_chunks(self, chunks, filepath=config.RAW_DATA_PATH):
+        """Stream generated chunks to disk without materialising the full dataset"""
+        total_rows = get_storage(filepath).write_chunks(chunks, filepath)
+        print(f"💾 {total_rows} records streamed to {filepath}")
 
 
 if __name__ == "__main__":
-    generator = FinancialDataGenerator()
-    df = generator.generate_complete_dataset()
-    generator.save_data(df)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="FinSight AI synthetic data generator")
+    parser.add_argument('--samples', type=int, default=config.NUM_SAMPLES)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="generate in chunks across processes (0 = all cores)")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help=f"rows per chunk (default {config.CHUNK_SIZE:,}); implies chunked generation")
+    args = parser.parse_args()
+    
+    config.ensure_directories()
+    generator = FinancialDataGenerator(args.samples)
+    if args.workers is None and args.chunk_size is None:
+        generator.save_data(generator.generate_complete_dataset())
+    else:
+        # Streamed to disk: only the chunks in flight are in memory
+        generator.save_chunks(generator.generate_chunks_parallel(args.chunk_size or config.CHUNK_SIZE, args.workers))
\ No newline at end of file
@@ -2,100 +2,362 @@
 Advanced Feature Engineering for Financial Analysis
 """
 
+import inspect
 import numpy as np
 import pandas as pd
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 import config
+from src.schema import apply_dtype_schema, resolve_dtype
+from src.storage import load_dataframe, save_dataframe
+from src.checkpoint import hash_params
+
+# ==================== FEATURE REGISTRY ====================
+
+# name -> {'inputs': [...], 'compute': fn(df) -> column}
+FEATURE_REGISTRY = {}
+
+# Raw columns that may be absent from user input, filled with a constant
+FEATURE_DEFAULTS = {'investments': 0}
+
+# Per-row hash of the raw inputs and feature settings, stored with processed data for incremental refreshes
+FINGERPRINT_COLUMN = 'row_fingerprint'
+METADATA_COLUMNS = ['user_id', 'created_date', FINGERPRINT_COLUMN]
+
+RATIO_FEATURES = ['savings_ratio', 'debt_to_income_ratio', 'expense_ratio',
+                  'emergency_fund_months', 'discretionary_ratio', 'investment_ratio']
+
+
+def register_feature(name, inputs):
+    """Register a derived feature and the columns it is computed from"""
+    def decorator(compute):
+        FEATURE_REGISTRY[name] = {'inputs': list(inputs), 'compute': compute}
+        return compute
+    return decorator
+
+
+def feature_settings():
+    """Everything besides the raw inputs that engineered values depend on"""
+    engineer = FinancialFeatureEngineer
+    return {
+        'debt_to_income': config.DEBT_TO_INCOME_THRESHOLD,
+        'savings_ratio': config.SAVINGS_RATIO_THRESHOLD,
+        'emergency_fund': config.EMERGENCY_FUND_THRESHOLD,
+        'risk_cutoffs': config.RISK_SCORE_CUTOFFS,
+        'risk_labels': config.RISK_LABELS,
+        'dtypes': config.COLUMN_DTYPES,
+        'features': {name: [spec['inputs'], inspect.getsource(spec['compute'])]
+                     for name, spec in FEATURE_REGISTRY.items()},
+        'risk': [inspect.getsource(engineer.score_risk), inspect.getsource(engineer.label_risk)]
+    }
+
+
+@register_feature('savings_ratio', ['savings', 'total_income'])
+def _savings_ratio(df):
+    return np.clip(df['savings'] / df['total_income'], 0, 1)
+
+
+@register_feature('debt_to_income_ratio', ['loan_payments', 'credit_card_debt', 'total_income'])
+def _debt_to_income_ratio(df):
+    total_debt = df['loan_payments'] + (df['credit_card_debt'] * 0.03)
+    return np.clip(total_debt / df['total_income'], 0, 1)
+
+
+@register_feature('expense_ratio', ['total_expenses', 'total_income'])
+def _expense_ratio(df):
+    return np.clip(df['total_expenses'] / df['total_income'], 0, 1.5)
+
+
+@register_feature('emergency_fund_months', ['emergency_fund', 'total_expenses'])
+def _emergency_fund_months(df):
+    return np.clip(df['emergency_fund'] / (df['total_expenses'] + 1), 0, 12)
+
+
+@register_feature('discretionary_ratio', ['entertainment', 'total_income'])
+def _discretionary_ratio(df):
+    return np.clip(df['entertainment'] / df['total_income'], 0, 1)
+
+
+@register_feature('investment_ratio', ['investments', 'total_income'])
+def _investment_ratio(df):
+    return np.clip(df['investments'] / df['total_income'], 0, 1)
+
+
+@register_feature('financial_health_score',
+                  ['savings_ratio', 'debt_to_income_ratio', 'emergency_fund_months', 'credit_score'])
+def _financial_health_score(df):
+    savings_score = np.clip(df['savings_ratio'] * 100 / 0.3, 0, 100)
+    debt_score = np.clip(100 - (df['debt_to_income_ratio'] * 100 / 0.5), 0, 100)
+    emergency_score = np.clip(df['emergency_fund_months'] * 100 / 6, 0, 100)
+    credit_score_norm = (df['credit_score'] - 500) / 350 * 100
+    
+    return np.clip(
+        savings_score * 0.30 +
+        debt_score * 0.25 +
+        emergency_score * 0.20 +
+        credit_score_norm * 0.25,
+        0, 100
+    )
+
+
+@register_feature('risk_score', ['debt_to_income_ratio', 'savings_ratio', 'emergency_fund_months'])
+def _risk_score(df):
+    return FinancialFeatureEngineer.score_risk(
+        df['debt_to_income_ratio'], df['savings_ratio'], df['emergency_fund_months']
+    )
+
+
+@register_feature('risk_category', ['risk_score'])
+def _risk_category(df):
+    return FinancialFeatureEngineer.label_risk(df['risk_score'])
+
+
+# ==================== FEATURE ENGINEER ====================
 
 class FinancialFeatureEngineer:
     """Feature engineering for financial data"""
     
     def __init__(self):
         self.feature_names = []
+    
+    @staticmethod
+    def plan_features(features, available_columns, refresh=False):
+        """
+        Order in which registered features must be computed.
         
-    def create_ratio_features(self, df):
-        """Create financial ratio features"""
-        df = df.copy()
+        Dependencies come first. Columns already present are treated as cached
+        and skipped, except requested features when refresh=True.
+        """
+        available = set(available_columns)
+        requested = set(features)
+        plan = []
+        visiting = set()
         
-        df['savings_ratio'] = (df['savings'] / df['total_income']).clip(0, 1)
+        def visit(name):
+            if name in plan:
+                return
+            if name in available and not (refresh and name in requested):
+                return
+            if name not in FEATURE_REGISTRY:
+                if name in FEATURE_DEFAULTS:
+                    plan.append(name)
+                    return
+                raise KeyError(f"Missing input column '{name}' and no registered feature computes it")
+            if name in visiting:
+                raise ValueError(f"Circular feature dependency involving '{name}'")
+            
+            visiting.add(name)
+            for dependency in FEATURE_REGISTRY[name]['inputs']:
+                visit(dependency)
+            visiting.discard(name)
+            plan.append(name)
         
-        total_debt = df['loan_payments'] + (df['credit_card_debt'] * 0.03)
-        df['debt_to_income_ratio'] = (total_debt / df['total_income']).clip(0, 1)
+        for name in features:
+            visit(name)
         
-        df['expense_ratio'] = (df['total_expenses'] / df['total_income']).clip(0, 1.5)
+        return plan
+    
+    def compute_features(self, df, features=None, refresh=False, inplace=False):
+        """
+        Lazily compute `features` (default: every registered feature).
         
-        df['emergency_fund_months'] = (df['emergency_fund'] / (df['total_expenses'] + 1)).clip(0, 12)
+        Only the minimal dependency graph is evaluated; intermediate columns
+        are kept on the frame so later requests reuse them.
+        """
+        features = list(FEATURE_REGISTRY) if features is None else list(features)
+        plan = self.plan_features(features, df.columns, refresh=refresh)
         
-        df['discretionary_ratio'] = (df['entertainment'] / df['total_income']).clip(0, 1)
+        if not inplace:
+            df = df.copy()
         
-        if 'investments' not in df.columns:
-            df['investments'] = 0
-        df['investment_ratio'] = (df['investments'] / df['total_income']).clip(0, 1)
+        for name in plan:
+            if name in FEATURE_REGISTRY:
+                df[name] = FEATURE_REGISTRY[name]['compute'](df)
+            else:
+                df[name] = FEATURE_DEFAULTS[name]
         
-        return df
+        self.feature_names = features
+        return apply_dtype_schema(df, plan)
     
-    def create_financial_health_score(self, df):
-        """Create composite financial health score (0-100)"""
-        df = df.copy()
+    def compute_profile_features(self, profile, features=None):
+        """
+        Compute registered features for a single profile dict, without pandas.
         
-        savings_score = np.clip(df['savings_ratio'] * 100 / 0.3, 0, 100)
-        debt_score = np.clip(100 - (df['debt_to_income_ratio'] * 100 / 0.5), 0, 100)
-        emergency_score = np.clip(df['emergency_fund_months'] * 100 / 6, 0, 100)
-        credit_score_norm = (df['credit_score'] - 500) / 350 * 100
+        Returns a new dict of the profile's values plus the derived features as
+        Python scalars (risk_category as its label); for interactive scoring.
+        """
+        features = list(FEATURE_REGISTRY) if features is None else list(features)
         
-        df['financial_health_score'] = (
-            savings_score * 0.30 +
-            debt_score * 0.25 +
-            emergency_score * 0.20 +
-            credit_score_norm * 0.25
-        ).clip(0, 100)
+        # NumPy scalars of the schema dtypes round like the columns of a frame
+        values = {}
+        for name, value in profile.items():
+            dtype = config.COLUMN_DTYPES.get(name)
+            values[name] = value if dtype in (None, 'category') else np.dtype(dtype).type(value)
         
-        return df
-    
-    def create_risk_category(self, df):
-        """Create risk classification"""
-        df = df.copy()
+        plan = self.plan_features(features, values.keys())
+        for name in plan:
+            if name in FEATURE_REGISTRY:
+                values[name] = FEATURE_REGISTRY[name]['compute'](values)
+            else:
+                values[name] = FEATURE_DEFAULTS[name]
         
-        risk_score = np.zeros(len(df))
+        # Cast derived features afterwards, as compute_features() does for frames
+        for name in plan:
+            dtype = config.COLUMN_DTYPES.get(name)
+            if dtype not in (None, 'category'):
+                values[name] = np.dtype(dtype).type(values[name])
         
-        risk_score += np.where(df['debt_to_income_ratio'] > 0.43, 3,
-                              np.where(df['debt_to_income_ratio'] > 0.36, 2, 1))
+        return {name: value.item() if isinstance(value, (np.ndarray, np.generic)) else value
+                for name, value in values.items()}
+    
+    def create_ratio_features(self, df, inplace=False):
+        """Create financial ratio features"""
+        return self.compute_features(df, RATIO_FEATURES, refresh=True, inplace=inplace)
+    
+    def create_financial_health_score(self, df, inplace=False):
+        """Create composite financial health score (0-100)"""
+        return self.compute_features(df, ['financial_health_score'], refresh=True, inplace=inplace)
+    
+    @staticmethod
+    def score_risk(dti, savings_ratio, emergency_months,
+                   dti_thresholds=config.DEBT_TO_INCOME_THRESHOLD,
+                   savings_thresholds=config.SAVINGS_RATIO_THRESHOLD,
+                   emergency_thresholds=config.EMERGENCY_FUND_THRESHOLD):
+        """Risk score (3-9): 1-3 points each for debt load, savings rate and emergency cover"""
+        dti = np.asarray(dti)
+        savings_ratio = np.asarray(savings_ratio)
+        emergency_months = np.asarray(emergency_months)
         
-        risk_score += np.where(df['savings_ratio'] < 0.05, 3,
-                              np.where(df['savings_ratio'] < 0.15, 2, 1))
+        risk_score = np.full(dti.shape, 3, dtype=np.int8)
+        risk_score += (dti > dti_thresholds['elevated'])
+        risk_score += (dti > dti_thresholds['critical'])
+        risk_score += (savings_ratio < savings_thresholds['low'])
+        risk_score += (savings_ratio < savings_thresholds['poor'])
+        risk_score += (emergency_months < emergency_thresholds['low'])
+        risk_score += (emergency_months < emergency_thresholds['critical'])
         
-        risk_score += np.where(df['emergency_fund_months'] < 1, 3,
-                              np.where(df['emergency_fund_months'] < 3, 2, 1))
+        return risk_score
+    
+    @staticmethod
+    def label_risk(risk_score, cutoffs=config.RISK_SCORE_CUTOFFS):
+        """Map risk scores to an ordered Categorical of config.RISK_LABELS (a label for a scalar score)"""
+        risk_score = np.asarray(risk_score)
+        codes = ((risk_score > cutoffs['Low Risk']).astype(np.int8)
+                 + (risk_score > cutoffs['Medium Risk']))
+        
+        if codes.ndim == 0:
+            return config.RISK_LABELS[codes]
+        return pd.Categorical.from_codes(codes, dtype=resolve_dtype('risk_category'))
+    
+    def create_risk_category(self, df,
+                             dti_thresholds=config.DEBT_TO_INCOME_THRESHOLD,
+                             savings_thresholds=config.SAVINGS_RATIO_THRESHOLD,
+                             emergency_thresholds=config.EMERGENCY_FUND_THRESHOLD,
+                             inplace=False):
+        """Create risk classification"""
+        if not inplace:
+            df = df.copy()
         
-        df['risk_category'] = ['Low Risk' if score <= 5 else 'Medium Risk' if score <= 7 else 'High Risk' 
-                               for score in risk_score]
+        risk_score = self.score_risk(
+            df['debt_to_income_ratio'], df['savings_ratio'], df['emergency_fund_months'],
+            dti_thresholds, savings_thresholds, emergency_thresholds
+        )
         
+        df['risk_category'] = self.label_risk(risk_score)
         df['risk_score'] = risk_score
         
         return df
     
-    def engineer_all_features(self, df):
-        """Apply all feature engineering transformations"""
+    def engineer_all_features(self, df, inplace=False):
+        """
+        Apply all feature engineering transformations.
+        
+        By default the input is copied once up front; with inplace=True the
+        derived columns are appended to `df` itself and no copy is made.
+        """
         print("🔧 Engineering financial features...")
         
-        df = self.create_ratio_features(df)
+        if not inplace:
+            df = df.copy()
+        
+        df = self.create_ratio_features(df, inplace=True)
         print("  ✓ Ratio features created")
         
-        df = self.create_financial_health_score(df)
+        df = self.create_financial_health_score(df, inplace=True)
         print("  ✓ Health score computed")
         
-        df = self.create_risk_category(df)
+        df = self.create_risk_category(df, inplace=True)
         print("  ✓ Risk categories assigned")
         
         print(f"✅ Feature engineering complete. Total features: {len(df.columns)}")
         
         return df
+    
+    @staticmethod
+    def fingerprint_rows(df):
+        """
+        Stable 64-bit hash per row over the raw input columns.
+        
+        The hash of feature_settings() is folded in, so a threshold, cutoff or
+        feature definition change alters every fingerprint and no stored row
+        is reused.
+        """
+        raw_columns = sorted(col for col in df.columns
+                             if col not in FEATURE_REGISTRY and col not in METADATA_COLUMNS)
+        settings = np.uint64(int(hash_params(feature_settings())[:16], 16))
+        return pd.util.hash_pandas_object(df[raw_columns], index=False).to_numpy() ^ settings
+    
+    def engineer_incremental(self, raw_df, processed_df=None):
+        """
+        Engineer only new or changed rows and reuse the rest of `processed_df`.
+        
+        All engineered features are row-local, so a row whose fingerprint
+        (raw inputs and feature settings) matches the stored one keeps its
+        processed values. Users no
+        longer present in `raw_df` are dropped. Unchanged rows keep the raw
+        order and the newly engineered rows are appended after them.
+        """
+        fingerprints = self.fingerprint_rows(raw_df)
+        
+        # Nothing to reuse (an empty file may be left by an interrupted run): engineer everything
+        if processed_df is None or FINGERPRINT_COLUMN not in processed_df.columns or len(processed_df) == 0:
+            df = self.engineer_all_features(raw_df)
+            df[FINGERPRINT_COLUMN] = fingerprints
+            return df
+        
+        raw_ids = raw_df['user_id'].array
+        processed_ids = processed_df['user_id'].array
+        aligned = min(len(raw_ids), len(processed_ids))
+        if (raw_ids[:aligned] == processed_ids[:aligned]).all():
+            # Common case: existing users unchanged in order, new users appended
+            positions = np.full(len(raw_ids), -1)
+            positions[:aligned] = np.arange(aligned)
+        else:
+            positions = pd.Index(processed_ids).get_indexer(raw_ids)
+        
+        stored = processed_df[FINGERPRINT_COLUMN].to_numpy()
+        unchanged = (positions >= 0) & (stored[positions] == fingerprints)
+        
+        reused = processed_df.iloc[positions[unchanged]]
+        delta = raw_df.loc[~unchanged]
+        
+        print(f"♻️  Incremental refresh: {unchanged.sum()} rows reused, "
+              f"{len(delta)} new/changed, {len(processed_df) - unchanged.sum()} stale rows replaced or dropped")
+        
+        if len(delta):
+            delta = self.engineer_all_features(delta)
+            delta[FINGERPRINT_COLUMN] = fingerprints[~unchanged]
+            df = pd.concat([reused, delta[reused.columns]], ignore_index=True)
+        else:
+            df = reused.reset_index(drop=True)
+        
+        return df
 
 
 if __name__ == "__main__":
-    df = pd.read_csv(config.RAW_DATA_PATH)
+    config.ensure_directories()
+    df = load_dataframe(config.RAW_DATA_PATH)
     engineer = FinancialFeatureEngineer()
     df_engineered = engineer.engineer_all_features(df)
-    df_engineered.to_csv(config.PROCESSED_DATA_PATH, index=False)
\ No newline at end of file
+    save_dataframe(df_engineered, config.PROCESSED_DATA_PATH)
\ No newline at end of file
@@ -10,33 +10,60 @@ from sklearn.metrics import (
     mean_absolute_error, mean_squared_error, r2_score,
     accuracy_score
 )
+import xgboost as xgb
 from xgboost import XGBClassifier, XGBRegressor
+from sklearn.model_selection import StratifiedKFold
+from concurrent.futures import ProcessPoolExecutor
+from joblib import Parallel, delayed
+import contextlib
+import io
 import joblib
+import json
+import time
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 import config
+from src.tuner import load_tuned_params, TUNABLE_MODELS, RISK_MAPPING
+from src.tree_arrays import CompiledForestRegressor
+from src.registry import artifact_path
 
 class FinancialModelTrainer:
     """Trains multiple models for different financial prediction tasks"""
     
+    TRAIN_METHODS = {
+        'risk_classifier': 'train_risk_classifier',
+        'health_predictor': 'train_health_predictor',
+        'expense_forecaster': 'train_expense_forecaster'
+    }
+    
+    # Metrics aggregated across cross-validation folds
+    CV_METRICS = {
+        'risk_classifier': ['accuracy', 'macro_f1'],
+        'health_predictor': ['mae', 'rmse', 'r2_score'],
+        'expense_forecaster': ['mae', 'rmse', 'mape', 'r2_score']
+    }
+    
     def __init__(self):
         self.models = {}
         self.metrics = {}
+        self.timings = {}
+        self.cv_results = {}
         
-    def train_risk_classifier(self, X_train, y_train, X_test, y_test):
+    def train_risk_classifier(self, X_train, y_train, X_test, y_test, n_jobs=None):
         """Train risk classification model"""
         print("\n🎯 Training Risk Classification Model...")
         
-        risk_mapping = {'Low Risk': 0, 'Medium Risk': 1, 'High Risk': 2}
-        y_train_encoded = y_train.map(risk_mapping)
-        y_test_encoded = y_test.map(risk_mapping)
+        y_train_encoded = y_train.map(RISK_MAPPING).astype(int)
+        y_test_encoded = y_test.map(RISK_MAPPING).astype(int)
         
         model = XGBClassifier(
-            **config.RISK_CLASSIFIER_PARAMS,
+            **{**config.RISK_CLASSIFIER_PARAMS, **load_tuned_params('risk_classifier')},
             objective='multi:softmax',
             num_class=3,
-            eval_metric='mlogloss'
+            eval_metric='mlogloss',
+            tree_method=config.XGB_TREE_METHOD,
+            n_jobs=n_jobs
         )
         
         model.fit(
@@ -45,36 +72,18 @@ class FinancialModelTrainer:
             verbose=False
         )
         
-        y_pred = model.predict(X_test)
-        y_pred_labels = [list(risk_mapping.keys())[i] for i in y_pred]
-        
-        accuracy = accuracy_score(y_test, y_pred_labels)
-        report = classification_report(y_test, y_pred_labels, output_dict=True)
-        
-        print(f"  ✓ Accuracy: {accuracy:.4f}")
-        print(f"  ✓ Macro F1-Score: {report['macro avg']['f1-score']:.4f}")
-        
-        feature_importance = pd.DataFrame({
-            'feature': X_train.columns,
-            'importance': model.feature_importances_
-        }).sort_values('importance', ascending=False)
-        
-        self.models['risk_classifier'] = model
-        self.metrics['risk_classifier'] = {
-            'accuracy': accuracy,
-            'classification_report': report,
-            'feature_importance': feature_importance
-        }
-        
-        return model, accuracy
+        self.evaluate_model('risk_classifier', model, X_train.columns, y_test, model.predict(X_test))
+        return model, self.metrics['risk_classifier']['accuracy']
     
-    def train_health_predictor(self, X_train, y_train, X_test, y_test):
+    def train_health_predictor(self, X_train, y_train, X_test, y_test, n_jobs=None):
         """Train financial health score predictor"""
         print("\n📊 Training Financial Health Predictor...")
         
         model = XGBRegressor(
-            **config.HEALTH_PREDICTOR_PARAMS,
-            objective='reg:squarederror'
+            **{**config.HEALTH_PREDICTOR_PARAMS, **load_tuned_params('health_predictor')},
+            objective='reg:squarederror',
+            tree_method=config.XGB_TREE_METHOD,
+            n_jobs=n_jobs
         )
         
         model.fit(
@@ -83,32 +92,10 @@ class FinancialModelTrainer:
             verbose=False
         )
         
-        y_pred = model.predict(X_test)
-        
-        mae = mean_absolute_error(y_test, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-        r2 = r2_score(y_test, y_pred)
-        
-        print(f"  ✓ MAE: {mae:.2f} points")
-        print(f"  ✓ RMSE: {rmse:.2f}")
-        print(f"  ✓ R² Score: {r2:.4f}")
-        
-        feature_importance = pd.DataFrame({
-            'feature': X_train.columns,
-            'importance': model.feature_importances_
-        }).sort_values('importance', ascending=False)
-        
-        self.models['health_predictor'] = model
-        self.metrics['health_predictor'] = {
-            'mae': mae,
-            'rmse': rmse,
-            'r2_score': r2,
-            'feature_importance': feature_importance
-        }
-        
-        return model, mae
+        self.evaluate_model('health_predictor', model, X_train.columns, y_test, model.predict(X_test))
+        return model, self.metrics['health_predictor']['mae']
     
-    def train_expense_forecaster(self, X_train, y_train, X_test, y_test):
+    def train_expense_forecaster(self, X_train, y_train, X_test, y_test, n_jobs=None):
         """Train expense forecasting model"""
         print("\n💰 Training Expense Forecaster...")
         
@@ -117,49 +104,414 @@ class FinancialModelTrainer:
             max_depth=15,
             min_samples_split=5,
             random_state=config.RANDOM_STATE,
-            n_jobs=-1
+            n_jobs=n_jobs or -1
         )
         
         model.fit(X_train, y_train)
         
-        y_pred = model.predict(X_test)
-        
-        mae = mean_absolute_error(y_test, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-        r2 = r2_score(y_test, y_pred)
-        mape = np.mean(np.abs((y_test - y_pred) / y_test)) * 100
-        
-        print(f"  ✓ MAE: ${mae:.2f}")
-        print(f"  ✓ RMSE: ${rmse:.2f}")
-        print(f"  ✓ MAPE: {mape:.2f}%")
-        print(f"  ✓ R² Score: {r2:.4f}")
+        self.evaluate_model('expense_forecaster', model, X_train.columns, y_test, model.predict(X_test))
+        return model, self.metrics['expense_forecaster']['mae']
+    
+    def evaluate_model(self, model_name, model, feature_names, y_test, y_pred):
+        """Compute, print and store test metrics and feature importance for a fitted model"""
+        if model_name == 'risk_classifier':
+            y_pred_labels = np.asarray(config.RISK_LABELS)[np.asarray(y_pred, dtype=int)]
+            
+            accuracy = accuracy_score(y_test, y_pred_labels)
+            report = classification_report(y_test, y_pred_labels, output_dict=True)
+            
+            print(f"  ✓ Accuracy: {accuracy:.4f}")
+            print(f"  ✓ Macro F1-Score: {report['macro avg']['f1-score']:.4f}")
+            
+            metrics = {'accuracy': accuracy, 'classification_report': report}
+        else:
+            mae = mean_absolute_error(y_test, y_pred)
+            rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+            r2 = r2_score(y_test, y_pred)
+            
+            if model_name == 'expense_forecaster':
+                mape = np.mean(np.abs((y_test - y_pred) / y_test)) * 100
+                print(f"  ✓ MAE: ${mae:.2f}")
+                print(f"  ✓ RMSE: ${rmse:.2f}")
+                print(f"  ✓ MAPE: {mape:.2f}%")
+                metrics = {'mae': mae, 'rmse': rmse, 'mape': mape, 'r2_score': r2}
+            else:
+                print(f"  ✓ MAE: {mae:.2f} points")
+                print(f"  ✓ RMSE: {rmse:.2f}")
+                metrics = {'mae': mae, 'rmse': rmse, 'r2_score': r2}
+            print(f"  ✓ R² Score: {r2:.4f}")
         
-        feature_importance = pd.DataFrame({
-            'feature': X_train.columns,
+        metrics['feature_importance'] = pd.DataFrame({
+            'feature': feature_names,
             'importance': model.feature_importances_
         }).sort_values('importance', ascending=False)
         
-        self.models['expense_forecaster'] = model
-        self.metrics['expense_forecaster'] = {
-            'mae': mae,
-            'rmse': rmse,
-            'mape': mape,
-            'r2_score': r2,
-            'feature_importance': feature_importance
+        self.models[model_name] = model
+        self.metrics[model_name] = metrics
+        return metrics
+    
+    # ==================== LARGE-DATA MODE ====================
+    
+    @staticmethod
+    def native_params(model_name, n_jobs=None):
+        """xgboost.train() parameters and round count: config defaults, tuned values, hist trees"""
+        spec = TUNABLE_MODELS[model_name]
+        params = {**spec['base_params'], **load_tuned_params(model_name), **spec['fixed_params']}
+        num_rounds = params.pop('n_estimators')
+        params['seed'] = params.pop('random_state', config.RANDOM_STATE)
+        params.update(
+            tree_method=config.XGB_TREE_METHOD,
+            max_bin=config.XGB_MAX_BIN,
+            nthread=n_jobs or os.cpu_count() or 1
+        )
+        return params, num_rounds
+    
+    @staticmethod
+    def build_quantile_matrices(X_train, X_test, n_jobs=None):
+        """Quantise the train matrix once (float32) and the test matrix against its bins"""
+        feature_names = list(X_train.columns)
+        dtrain = xgb.QuantileDMatrix(X_train.to_numpy(dtype=np.float32), max_bin=config.XGB_MAX_BIN,
+                                     feature_names=feature_names, nthread=n_jobs)
+        dtest = xgb.QuantileDMatrix(X_test.to_numpy(dtype=np.float32), ref=dtrain,
+                                    feature_names=feature_names, nthread=n_jobs)
+        return dtrain, dtest
+    
+    @staticmethod
+    def build_external_matrices(train_chunks, test_chunks, feature_names, n_jobs=None,
+                                cache_dir=config.XGB_CACHE_DIR):
+        """
+        External-memory counterparts of build_quantile_matrices().
+        
+        `train_chunks` / `test_chunks` are callables returning an iterable of
+        float32 arrays; XGBoost walks them to build quantised pages cached
+        under `cache_dir`, so only one chunk is in memory at a time.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        dtrain = xgb.ExtMemQuantileDMatrix(
+            _ChunkIterator(train_chunks, os.path.join(cache_dir, 'train'), feature_names),
+            max_bin=config.XGB_MAX_BIN, nthread=n_jobs
+        )
+        dtest = xgb.ExtMemQuantileDMatrix(
+            _ChunkIterator(test_chunks, os.path.join(cache_dir, 'test'), feature_names),
+            ref=dtrain, nthread=n_jobs
+        )
+        return dtrain, dtest
+    
+    def train_shared_boosters(self, dtrain, dtest, labels, n_jobs=None):
+        """
+        Fit every XGBoost model on the same quantised matrices.
+        
+        `labels` maps model name -> (y_train, y_test); only the label vector is
+        swapped between models. Each booster is loaded into the usual sklearn
+        wrapper so saved models and the app are unchanged.
+        """
+        for model_name, (y_train, y_test) in labels.items():
+            print(f"\n🌲 Training {model_name} on the shared quantised matrix...")
+            start_wall = time.perf_counter()
+            start_cpu = time.process_time()
+            
+            if model_name == 'risk_classifier':
+                dtrain.set_label(y_train.map(RISK_MAPPING).astype(int).to_numpy())
+                dtest.set_label(y_test.map(RISK_MAPPING).astype(int).to_numpy())
+            else:
+                dtrain.set_label(np.asarray(y_train, dtype=np.float32))
+                dtest.set_label(np.asarray(y_test, dtype=np.float32))
+            
+            params, num_rounds = self.native_params(model_name, n_jobs)
+            booster = xgb.train(params, dtrain, num_rounds, evals=[(dtest, 'test')], verbose_eval=False)
+            
+            model = TUNABLE_MODELS[model_name]['estimator']()
+            model.load_model(bytearray(booster.save_raw('ubj')))
+            self.evaluate_model(model_name, model, dtrain.feature_names, y_test, booster.predict(dtest))
+            self.record_timing(model_name, start_wall, start_cpu, params['nthread'])
+    
+    def train_all_models_large(self, datasets, total_threads=None):
+        """
+        Large-data variant of train_all_models().
+        
+        The XGBoost models must share one column view (see
+        FinancialDataPreprocessor.build_model_features(shared_models=...)); their
+        train/test matrices are quantised once and reused. Training is
+        sequential, each model using every thread.
+        """
+        n_jobs = total_threads or config.TRAINING_THREADS or os.cpu_count() or 1
+        start = time.perf_counter()
+        
+        xgb_models = [name for name in datasets if name in TUNABLE_MODELS]
+        X_train, _, X_test, _ = datasets[xgb_models[0]]
+        
+        print(f"\n📦 Quantising {len(X_train):,} x {X_train.shape[1]} training matrix "
+              f"({config.XGB_MAX_BIN} bins, {n_jobs} threads)...")
+        dtrain, dtest = self.build_quantile_matrices(X_train, X_test, n_jobs)
+        self.train_shared_boosters(
+            dtrain, dtest, {name: (datasets[name][1], datasets[name][3]) for name in xgb_models}, n_jobs
+        )
+        del dtrain, dtest
+        
+        for name, data in datasets.items():
+            if name not in xgb_models:
+                self.train_with_timing(name, *data, n_jobs)
+        
+        total_wall = time.perf_counter() - start
+        self.print_timing_report(total_wall)
+        return total_wall
+    
+    def train_with_timing(self, model_name, X_train, y_train, X_test, y_test, n_jobs):
+        """Train one model in this process and record its timing"""
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        getattr(self, self.TRAIN_METHODS[model_name])(X_train, y_train, X_test, y_test, n_jobs=n_jobs)
+        self.record_timing(model_name, start_wall, start_cpu, n_jobs)
+    
+    def record_timing(self, model_name, start_wall, start_cpu, threads):
+        """Store wall time, CPU time and utilisation since (start_wall, start_cpu)"""
+        wall_time = time.perf_counter() - start_wall
+        cpu_time = time.process_time() - start_cpu
+        self.timings[model_name] = {
+            'wall_time': wall_time,
+            'cpu_time': cpu_time,
+            'threads': threads,
+            'cpu_utilization': cpu_time / (wall_time * threads) if wall_time > 0 else 0.0
         }
+    
+    def thread_budgets(self, model_names, total_threads=None, parallel=True):
+        """Threads per model so concurrent fits never oversubscribe the cores"""
+        total_threads = total_threads or config.TRAINING_THREADS or os.cpu_count() or 1
+        if not parallel:
+            return {name: total_threads for name in model_names}
+        
+        share, extra = divmod(total_threads, len(model_names))
+        return {name: max(1, share + (i < extra)) for i, name in enumerate(model_names)}
+    
+    def train_all_models(self, datasets, parallel=config.PARALLEL_TRAINING, total_threads=None):
+        """
+        Train every model in `datasets` ({model_name: (X_train, y_train, X_test, y_test)}).
         
-        return model, mae
+        With parallel=True each model trains in its own process with an
+        explicit share of the thread budget, so a retrain takes about as long
+        as the slowest model. Falls back to sequential training, each model
+        using every thread, when there are fewer cores than models. Per-model
+        wall time, CPU time and utilisation are stored in self.timings.
+        """
+        total_threads = total_threads or config.TRAINING_THREADS or os.cpu_count() or 1
+        # Fewer cores than models: concurrent fits would only oversubscribe
+        parallel = parallel and 1 < len(datasets) <= total_threads
+        budgets = self.thread_budgets(list(datasets), total_threads, parallel)
+        start = time.perf_counter()
+        
+        if parallel:
+            print(f"\n⚡ Training {len(datasets)} models in parallel "
+                  f"({', '.join(f'{name}: {n} threads' for name, n in budgets.items())})")
+            with ProcessPoolExecutor(max_workers=len(datasets)) as executor:
+                futures = [
+                    executor.submit(_train_model_task, name, *data, budgets[name])
+                    for name, data in datasets.items()
+                ]
+                results = [future.result() for future in futures]
+        else:
+            results = [_train_model_task(name, *data, budgets[name]) for name, data in datasets.items()]
+        
+        for name, model, metrics, timing, log in results:
+            print(log, end='')
+            self.models[name] = model
+            self.metrics[name] = metrics
+            self.timings[name] = timing
+        
+        total_wall = time.perf_counter() - start
+        self.print_timing_report(total_wall)
+        return total_wall
+    
+    def print_timing_report(self, total_wall):
+        """Per-model wall time and CPU utilisation"""
+        print("\n⏱️  Training time per model:")
+        for name, timing in self.timings.items():
+            print(f"  • {name:<20} wall {timing['wall_time']:7.2f}s | cpu {timing['cpu_time']:7.2f}s | "
+                  f"{timing['threads']} threads | utilisation {timing['cpu_utilization'] * 100:5.1f}%")
+        print(f"  • {'total':<20} wall {total_wall:7.2f}s")
+    
+    def cross_validate(self, X, targets, model_features, n_splits=config.CV_FOLDS, total_threads=None):
+        """
+        K-fold evaluation of every model in `model_features` ({model_name: columns of X}).
+        
+        Folds are stratified on the risk label and shared by all models. Each
+        (fold, model) pair runs in a joblib worker; X is converted once to a
+        float32 array that joblib memory-maps into the workers instead of
+        pickling it per task. Results, with mean/std per metric and per-fold
+        timings, are stored in self.cv_results.
+        """
+        total_threads = total_threads or config.TRAINING_THREADS or os.cpu_count() or 1
+        n_workers = min(total_threads, n_splits * len(model_features))
+        n_jobs = max(1, total_threads // n_workers)
+        
+        X_values = X.to_numpy(dtype=np.float32)
+        y_values = {
+            name: (targets[config.MODEL_TARGETS[name]].map(RISK_MAPPING).astype(np.int8).to_numpy()
+                   if name == 'risk_classifier'
+                   else targets[config.MODEL_TARGETS[name]].to_numpy(dtype=np.float64))
+            for name in model_features
+        }
+        folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=config.RANDOM_STATE).split(
+            X_values, targets[config.MODEL_TARGETS['risk_classifier']]
+        ))
+        
+        print(f"\n📐 {n_splits}-fold cross-validation (risk-stratified, {n_workers} workers x {n_jobs} threads)...")
+        start = time.perf_counter()
+        results = Parallel(n_jobs=n_workers, max_nbytes='1M', mmap_mode='r')(
+            delayed(_cross_validation_task)(
+                name, fold, X_values, X.columns.get_indexer(columns), list(columns),
+                y_values[name], train_idx, test_idx, n_jobs
+            )
+            for fold, (train_idx, test_idx) in enumerate(folds)
+            for name, columns in model_features.items()
+        )
+        
+        self.cv_results = {}
+        for name in model_features:
+            fold_results = sorted((r for r in results if r['model'] == name), key=lambda r: r['fold'])
+            self.cv_results[name] = {
+                metric: {
+                    'mean': float(np.mean([r['metrics'][metric] for r in fold_results])),
+                    'std': float(np.std([r['metrics'][metric] for r in fold_results])),
+                    'folds': [float(r['metrics'][metric]) for r in fold_results]
+                }
+                for metric in self.CV_METRICS[name]
+            }
+            self.cv_results[name]['fold_timings'] = [r['timing'] for r in fold_results]
+        
+        self.print_cv_report(time.perf_counter() - start)
+        return self.cv_results
+    
+    def print_cv_report(self, total_wall):
+        """Mean ± std of each metric and fold wall times"""
+        print("\n📐 Cross-validation results (mean ± std):")
+        for name, results in self.cv_results.items():
+            summary = ' | '.join(f"{metric} {results[metric]['mean']:.4f} ± {results[metric]['std']:.4f}"
+                                 for metric in self.CV_METRICS[name])
+            fold_walls = [timing['wall_time'] for timing in results['fold_timings']]
+            print(f"  • {name:<20} {summary}")
+            print(f"    {'':<20} fold wall {np.mean(fold_walls):.2f}s avg, {max(fold_walls):.2f}s max")
+        print(f"  • {'total':<20} wall {total_wall:.2f}s")
     
     def save_models(self):
-        """Save all trained models"""
+        """Save all trained models (plus native UBJ boosters and the forecaster's node arrays)"""
         joblib.dump(self.models['risk_classifier'], config.RISK_MODEL_PATH)
         joblib.dump(self.models['health_predictor'], config.HEALTH_MODEL_PATH)
         joblib.dump(self.models['expense_forecaster'], config.FORECAST_MODEL_PATH)
+        self.models['risk_classifier'].save_model(config.RISK_BOOSTER_PATH)
+        self.models['health_predictor'].save_model(config.HEALTH_BOOSTER_PATH)
+        CompiledForestRegressor.from_forest(self.models['expense_forecaster']).save()
         print("\n💾 All models saved successfully")
     
-    def load_models(self):
-        """Load saved models"""
-        self.models['risk_classifier'] = joblib.load(config.RISK_MODEL_PATH)
-        self.models['health_predictor'] = joblib.load(config.HEALTH_MODEL_PATH)
-        self.models['expense_forecaster'] = joblib.load(config.FORECAST_MODEL_PATH)
-        
\ No newline at end of file
+    def load_models(self, forest_arrays=False, model_dir=None):
+        """
+        Load saved models; XGBoost ones from their native files when present (no unpickling).
+        
+        With forest_arrays=True the expense forecaster is memory-mapped from its
+        node arrays (shared between processes, but slower on large batches).
+        model_dir is a published version's bundle (default: the files in MODEL_DIR).
+        """
+        for name, estimator, booster_path, pickle_path in [
+            ('risk_classifier', XGBClassifier, artifact_path(config.RISK_BOOSTER_PATH, model_dir),
+             artifact_path(config.RISK_MODEL_PATH, model_dir)),
+            ('health_predictor', XGBRegressor, artifact_path(config.HEALTH_BOOSTER_PATH, model_dir),
+             artifact_path(config.HEALTH_MODEL_PATH, model_dir))
+        ]:
+            if os.path.exists(booster_path):
+                self.models[name] = estimator()
+                self.models[name].load_model(booster_path)
+            else:
+                self.models[name] = joblib.load(pickle_path)
+        
+        if forest_arrays:
+            self.models['expense_forecaster'] = CompiledForestRegressor.load(
+                artifact_path(config.FORECAST_ARRAYS_DIR, model_dir)
+            )
+        else:
+            self.models['expense_forecaster'] = joblib.load(artifact_path(config.FORECAST_MODEL_PATH, model_dir))
+    
+    def save_metrics(self, filepath=config.METRICS_PATH):
+        """Save evaluation metrics and timings as JSON"""
+        metrics = {
+            name: {key: (value.to_dict(orient='records') if isinstance(value, pd.DataFrame) else value)
+                   for key, value in model_metrics.items()}
+            for name, model_metrics in self.metrics.items()
+        }
+        with open(filepath, 'w') as f:
+            json.dump({'metrics': metrics, 'timings': self.timings, 'cross_validation': self.cv_results},
+                      f, indent=2, default=lambda value: value.item() if hasattr(value, 'item') else str(value))
+        print(f"💾 Metrics saved to {filepath}")
+    
+    def load_metrics(self, filepath=config.METRICS_PATH):
+        """Load metrics saved by save_metrics()"""
+        with open(filepath) as f:
+            saved = json.load(f)
+        
+        for name, model_metrics in saved['metrics'].items():
+            if 'feature_importance' in model_metrics:
+                model_metrics['feature_importance'] = pd.DataFrame(model_metrics['feature_importance'])
+            self.metrics[name] = model_metrics
+        self.timings = saved.get('timings', {})
+        self.cv_results = saved.get('cross_validation', {})
+
+
+def _train_model_task(model_name, X_train, y_train, X_test, y_test, n_jobs):
+    """Train one model in a fresh trainer; runs inline or in a worker process"""
+    trainer = FinancialModelTrainer()
+    log = io.StringIO()
+    
+    with contextlib.redirect_stdout(log):
+        trainer.train_with_timing(model_name, X_train, y_train, X_test, y_test, n_jobs)
+    
+    return (model_name, trainer.models[model_name], trainer.metrics[model_name],
+            trainer.timings[model_name], log.getvalue())
+
+
+def _cross_validation_task(model_name, fold, X, columns, feature_names, y, train_idx, test_idx, n_jobs):
+    """Train and score one model on one fold; X may be a read-only memmap shared with other workers"""
+    X_train = pd.DataFrame(X[np.ix_(train_idx, columns)], columns=feature_names)
+    X_test = pd.DataFrame(X[np.ix_(test_idx, columns)], columns=feature_names)
+    if model_name == 'risk_classifier':
+        risk_dtype = pd.CategoricalDtype(config.RISK_LABELS, ordered=True)
+        y_train = pd.Series(pd.Categorical.from_codes(y[train_idx], dtype=risk_dtype))
+        y_test = pd.Series(pd.Categorical.from_codes(y[test_idx], dtype=risk_dtype))
+    else:
+        y_train, y_test = pd.Series(y[train_idx]), pd.Series(y[test_idx])
+    
+    trainer = FinancialModelTrainer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        trainer.train_with_timing(model_name, X_train, y_train, X_test, y_test, n_jobs)
+    
+    metrics = trainer.metrics[model_name]
+    if model_name == 'risk_classifier':
+        metrics['macro_f1'] = metrics['classification_report']['macro avg']['f1-score']
+    
+    return {
+        'model': model_name,
+        'fold': fold,
+        'metrics': {metric: metrics[metric] for metric in FinancialModelTrainer.CV_METRICS[model_name]},
+        'timing': {**trainer.timings[model_name], 'fold': fold}
+    }
+
+
+class _ChunkIterator(xgb.DataIter):
+    """Feeds float32 chunks to an external-memory DMatrix; pages are cached on disk"""
+    
+    def __init__(self, make_chunks, cache_prefix, feature_names=None):
+        self.make_chunks = make_chunks
+        self.feature_names = feature_names
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+    
+    def next(self, input_data):
+        """Pass the next chunk to XGBoost; False once exhausted"""
+        if self._chunks is None:
+            self._chunks = iter(self.make_chunks())
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        input_data(data=chunk, feature_names=self.feature_names)
+        return True
+    
+    def reset(self):
+        """Restart from the first chunk"""
+        self._chunks = None
@@ -11,57 +11,107 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 import config
+from src.storage import get_storage
 
 class FinancialDataPreprocessor:
     """Data preprocessing for financial data"""
     
+    CATEGORICAL_COLUMNS = ['employment_type']
+    EXCLUDE_COLUMNS = ['user_id', 'created_date', 'risk_category', 'row_fingerprint']
+    
     def __init__(self):
         self.scaler = StandardScaler()
         self.label_encoders = {}
         self.feature_names = None
+        self.model_features = {}
         
-    def handle_missing_values(self, df):
+    def handle_missing_values(self, df, inplace=False):
         """Handle missing values"""
-        df = df.copy()
+        if not inplace:
+            df = df.copy()
         
         numeric_features = df.select_dtypes(include=[np.number]).columns
         for col in numeric_features:
             if df[col].isnull().any():
                 df[col] = df[col].fillna(df[col].median())
         
-        categorical_features = df.select_dtypes(include=['object']).columns
+        categorical_features = df.select_dtypes(include=['object', 'category']).columns
         for col in categorical_features:
             if df[col].isnull().any():
                 df[col] = df[col].fillna(df[col].mode()[0])
         
         return df
     
-    def encode_categorical_features(self, df, fit=True):
+    def working_frame(self, df, keep=()):
+        """
+        The pipelines' copy of `df`: every column except the excluded ids and
+        dates (unless in `keep`), which would only be duplicated
+        """
+        return df.drop(columns=[col for col in self.EXCLUDE_COLUMNS if col in df.columns and col not in keep])
+    
+    def encode_categorical_features(self, df, fit=True, inplace=False):
         """Encode categorical variables"""
-        df = df.copy()
-        
-        categorical_columns = ['employment_type']
+        if not inplace:
+            df = df.copy()
         
-        for col in categorical_columns:
+        for col in self.CATEGORICAL_COLUMNS:
             if col in df.columns:
                 if fit:
                     self.label_encoders[col] = LabelEncoder()
-                    df[col] = self.label_encoders[col].fit_transform(df[col].astype(str))
+                    df[col] = self._encode_column(self.label_encoders[col], df[col], fit=True)
                 else:
                     if col in self.label_encoders:
-                        df[col] = self.label_encoders[col].transform(df[col].astype(str))
+                        df[col] = self._encode_column(self.label_encoders[col], df[col], fit=False)
         
         return df
     
-    def create_feature_matrix(self, df, target_col=None):
-        """Create feature matrix for modeling"""
-        exclude_cols = ['user_id', 'created_date', 'risk_category']
+    @staticmethod
+    def _encode_column(encoder, series, fit):
+        """Label-encode one column; Categoricals encode their few levels and broadcast via codes"""
+        if isinstance(series.dtype, pd.CategoricalDtype) and not series.isna().any():
+            codes = series.cat.codes.to_numpy()
+            levels = series.cat.categories.astype(str)
+            used = np.unique(codes)
+            if fit:
+                encoder.fit(levels[used])
+            lookup = np.zeros(len(levels), dtype=np.int64)
+            lookup[used] = encoder.transform(levels[used])
+            return lookup[codes]
+        
+        if fit:
+            return encoder.fit_transform(series.astype(str))
+        return encoder.transform(series.astype(str))
+    
+    def select_feature_columns(self, dtypes, target_col=None, encoded=True):
+        """
+        Pick model feature columns from a column -> dtype mapping.
+        
+        With encoded=False the dtypes are those of the stored dataset, so
+        categorical columns are kept because they become numeric once encoded.
+        """
+        exclude_cols = self.EXCLUDE_COLUMNS + ([target_col] if target_col else [])
         
-        if target_col:
-            exclude_cols.append(target_col)
+        return [col for col, dtype in dtypes.items()
+                if col not in exclude_cols
+                and ((pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype))
+                     or (not encoded and col in self.CATEGORICAL_COLUMNS))]
+    
+    def read_feature_frame(self, filepath, target_cols=()):
+        """
+        Load only the columns needed to build the feature matrix, and the targets.
+        
+        Column dtypes come from the file footer (Parquet) or a small sample
+        (CSV), so unused columns such as user_id are never read.
+        """
+        storage = get_storage(filepath)
+        columns = self.select_feature_columns(storage.read_dtypes(filepath), encoded=False)
+        columns += [col for col in target_cols if col not in columns]
         
-        feature_cols = [col for col in df.columns 
-                       if col not in exclude_cols and df[col].dtype in [np.float64, np.int64]]
+        return storage.read(filepath, columns=columns)
+    
+    def create_feature_matrix(self, df, target_col=None):
+        """Create feature matrix for modeling"""
+        feature_cols = self.select_feature_columns(df.dtypes, target_col)
         
         X = df[feature_cols]
         self.feature_names = feature_cols
@@ -72,26 +122,95 @@ class FinancialDataPreprocessor:
         
         return X
     
+    def align_features(self, df):
+        """Feature matrix in the fitted column order; missing columns are zero-filled"""
+        return df.reindex(columns=self.feature_names, fill_value=0)
+    
+    def build_model_features(self, exclusions=config.MODEL_EXCLUDED_FEATURES, shared_models=None):
+        """
+        Per-model column lists: the shared features minus each model's target/leakage columns.
+        
+        Models in `shared_models` all get the union of their exclusions, so they
+        train on identical columns (large-data mode shares one XGBoost matrix).
+        """
+        if shared_models:
+            shared = [col for name in shared_models for col in exclusions[name]]
+            exclusions = {name: (shared if name in shared_models else excluded)
+                          for name, excluded in exclusions.items()}
+        
+        self.model_features = {
+            model_name: [col for col in self.feature_names if col not in excluded]
+            for model_name, excluded in exclusions.items()
+        }
+        return self.model_features
+    
+    def model_view(self, X, model_name):
+        """Columns of the shared matrix that `model_name` was trained on"""
+        return X[self.model_features[model_name]]
+    
+    def transform_features(self, df):
+        """Fitted preprocessing of one batch, in place and without progress output"""
+        df = self.handle_missing_values(df, inplace=True)
+        df = self.encode_categorical_features(df, fit=False, inplace=True)
+        return self.scale_features(self.align_features(df), fit=False)
+    
+    def fit_streaming(self, filepath, chunk_size=config.CHUNK_SIZE, shared_models=None):
+        """
+        Fit encoders and scaler chunk by chunk, for data that does not fit in memory.
+        
+        Encoders use the fixed category levels from config, and the scaler is
+        fitted incrementally with StandardScaler.partial_fit().
+        """
+        storage = get_storage(filepath)
+        self.feature_names = self.select_feature_columns(storage.read_dtypes(filepath), encoded=False)
+        self.build_model_features(shared_models=shared_models)
+        
+        for col in self.CATEGORICAL_COLUMNS:
+            if col in self.feature_names:
+                self.label_encoders[col] = LabelEncoder().fit(config.CATEGORY_LEVELS[col])
+        
+        self.scaler = StandardScaler()
+        for chunk in storage.iter_chunks(filepath, chunk_size, columns=self.feature_names):
+            chunk = self.handle_missing_values(chunk, inplace=True)
+            chunk = self.encode_categorical_features(chunk, fit=False, inplace=True)
+            self.scaler.partial_fit(chunk[self.feature_names].to_numpy(dtype=np.float32))
+        
+        return self
+    
     def scale_features(self, X, fit=True):
-        """Scale features using StandardScaler"""
+        """Scale features using StandardScaler (float32 output, as the models consume)"""
+        # One float32 copy of the matrix, then scaled in place
+        X_values = X.to_numpy(dtype=np.float32)
         if fit:
-            X_scaled = self.scaler.fit_transform(X)
-        else:
-            X_scaled = self.scaler.transform(X)
+            self.scaler.fit(X_values)
+        X_scaled = self.scaler.transform(X_values, copy=False)
         
-        return pd.DataFrame(X_scaled, columns=X.columns, index=X.index)
+        return pd.DataFrame(X_scaled, columns=X.columns, index=X.index, copy=False)
     
-    def full_preprocessing_pipeline(self, df, target_col=None, fit=True):
-        """Complete preprocessing pipeline"""
+    def full_preprocessing_pipeline(self, df, target_col=None, fit=True, inplace=False):
+        """
+        Complete preprocessing pipeline.
+        
+        The input is copied once (see working_frame) unless inplace=True, in
+        which case missing values are filled and categoricals encoded directly
+        in `df`.
+        """
         print("🔄 Starting preprocessing pipeline...")
         
-        df = self.handle_missing_values(df)
+        if not inplace:
+            df = self.working_frame(df, keep=[target_col])
+        
+        df = self.handle_missing_values(df, inplace=True)
         print("  ✓ Missing values handled")
         
-        df = self.encode_categorical_features(df, fit=fit)
+        df = self.encode_categorical_features(df, fit=fit, inplace=True)
         print("  ✓ Categorical features encoded")
         
-        if target_col:
+        if not fit and self.feature_names:
+            X = self.align_features(df)
+            y = df[target_col] if target_col and target_col in df.columns else None
+            print(f"  ✓ Feature matrix aligned: {X.shape}")
+        elif target_col:
             X, y = self.create_feature_matrix(df, target_col=target_col)
             print(f"  ✓ Feature matrix created: {X.shape}")
         else:
@@ -106,12 +225,69 @@ class FinancialDataPreprocessor:
         
         return X_scaled, y, df
     
+    def shared_preprocessing_pipeline(self, df, target_cols, inplace=False, shared_models=None):
+        """
+        Preprocess once for several models.
+        
+        Missing values, encoding, feature selection and scaling run a single
+        time over every numeric column (targets included; StandardScaler is
+        per-column, so this does not change any model's inputs). Each model's
+        view is then a column mask: see model_features / model_view().
+        """
+        print("🔄 Starting shared preprocessing pipeline...")
+        
+        if not inplace:
+            df = self.working_frame(df, keep=target_cols)
+        
+        df = self.handle_missing_values(df, inplace=True)
+        print("  ✓ Missing values handled")
+        
+        df = self.encode_categorical_features(df, fit=True, inplace=True)
+        print("  ✓ Categorical features encoded")
+        
+        X = self.create_feature_matrix(df)
+        self.build_model_features(shared_models=shared_models)
+        print(f"  ✓ Shared feature matrix created: {X.shape}")
+        
+        X_scaled = self.scale_features(X, fit=True)
+        print("  ✓ Features scaled")
+        
+        targets = {col: df[col] for col in target_cols}
+        
+        print("✅ Preprocessing complete\n")
+        
+        return X_scaled, targets
+    
+    def split_model_datasets(self, X, targets, test_size=0.2):
+        """
+        One train/test split shared by every model.
+        
+        Stratified on the risk label; returns {model_name: (X_train, y_train,
+        X_test, y_test)} with each model's column view of the shared matrix.
+        """
+        train_idx, test_idx = train_test_split(
+            np.arange(len(X)), test_size=test_size, random_state=config.RANDOM_STATE,
+            stratify=targets[config.MODEL_TARGETS['risk_classifier']]
+        )
+        X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+        
+        datasets = {}
+        for model_name, target_col in config.MODEL_TARGETS.items():
+            y = targets[target_col]
+            datasets[model_name] = (
+                self.model_view(X_train, model_name), y.iloc[train_idx],
+                self.model_view(X_test, model_name), y.iloc[test_idx]
+            )
+        
+        return datasets
+    
     def save_preprocessor(self, filepath=config.SCALER_PATH):
         """Save scaler and encoders"""
         joblib.dump({
             'scaler': self.scaler,
             'label_encoders': self.label_encoders,
-            'feature_names': self.feature_names
+            'feature_names': self.feature_names,
+            'model_features': self.model_features
         }, filepath)
         print(f"💾 Preprocessor saved to {filepath}")
     
@@ -121,4 +297,5 @@ class FinancialDataPreprocessor:
         self.scaler = saved_objects['scaler']
         self.label_encoders = saved_objects['label_encoders']
         self.feature_names = saved_objects['feature_names']
+        self.model_features = saved_objects.get('model_features', {})
         print(f"📂 Preprocessor loaded from {filepath}")
\ No newline at end of file
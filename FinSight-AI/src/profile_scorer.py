@@ -0,0 +1,142 @@
+"""
+Single-Profile Scoring
+Compiles the trained models into NumPy node arrays for low-latency scoring of one profile at a time
+"""
+
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import config
+from src.feature_engineer import FinancialFeatureEngineer, FEATURE_REGISTRY
+from src.tree_arrays import TreeArrays, iteration_range, xgboost_trees, sklearn_trees, save_arrays, load_arrays
+
+
+class FastProfileScorer:
+    """
+    Low-latency scoring of one profile dict, without pandas.
+    
+    Features are computed on scalars, written into a float32 vector in
+    preprocessor.feature_names order and standardised in place with the
+    saved scaler's mean_ and scale_. The vector is allocated per call, so one
+    scorer can serve many threads. The trees of all three models are
+    flattened into one set of node arrays at load time and traversed together
+    in NumPy, which avoids XGBoost's per-call overhead on single rows.
+    
+    save() writes the compiled arrays to disk and load() memory-maps them back,
+    so serving needs neither scikit-learn nor xgboost.
+    """
+    
+    # Arrays written by save() besides the trees' (everything else goes in the manifest)
+    ARRAYS = ['mean', 'scale', 'intercept']
+    MANIFEST = ['feature_names', 'features', 'category_codes', 'health_slot', 'expense_slot', 'n_forest_trees']
+    
+    def __init__(self, preprocessor=None, models=None):
+        if preprocessor is None:
+            from src.preprocessor import FinancialDataPreprocessor
+            preprocessor = FinancialDataPreprocessor()
+            preprocessor.load_preprocessor()
+        if models is None:
+            from src.model_trainer import FinancialModelTrainer
+            trainer = FinancialModelTrainer()
+            trainer.load_models()
+            models = trainer.models
+        
+        self.feature_engineer = FinancialFeatureEngineer()
+        self.feature_names = list(preprocessor.feature_names)
+        self.features = [name for name in self.feature_names if name in FEATURE_REGISTRY]
+        # StandardScaler.transform casts these to the input dtype
+        self.mean = preprocessor.scaler.mean_.astype(np.float32)
+        self.scale = preprocessor.scaler.scale_.astype(np.float32)
+        
+        self.category_codes = {
+            col: {label: code for code, label in enumerate(encoder.classes_)}
+            for col, encoder in preprocessor.label_encoders.items()
+        }
+        
+        # Positions of each model's columns in the feature vector
+        positions = {name: i for i, name in enumerate(self.feature_names)}
+        columns = {
+            model_name: np.array([positions[col] for col in preprocessor.model_features.get(model_name,
+                                                                                         self.feature_names)])
+            for model_name in models
+        }
+        
+        # Output slots: one margin per risk class, then health score, then expense forecast
+        n_classes = len(config.RISK_LABELS)
+        self.health_slot = n_classes
+        self.expense_slot = n_classes + 1
+        self.trees = TreeArrays(
+            list(xgboost_trees(models['risk_classifier'], columns['risk_classifier'], 0))
+            + list(xgboost_trees(models['health_predictor'], columns['health_predictor'], self.health_slot))
+            + list(sklearn_trees(models['expense_forecaster'], columns['expense_forecaster'], self.expense_slot))
+        )
+        self.n_forest_trees = len(models['expense_forecaster'].estimators_)
+        
+        # Recover each booster's intercept (base_score) from its own margin output
+        x = np.zeros(len(self.feature_names), dtype=np.float32)
+        sums = self.trees.sums(x)
+        self.intercept = np.zeros_like(sums)
+        for model_name, slots in [('risk_classifier', slice(0, n_classes)),
+                                  ('health_predictor', slice(self.health_slot, self.health_slot + 1))]:
+            model = models[model_name]
+            margin = model.get_booster().inplace_predict(
+                x[columns[model_name]][None, :], predict_type='margin', iteration_range=iteration_range(model)
+            )
+            self.intercept[slots] = np.ravel(margin) - sums[slots]
+    
+    def save(self, directory=config.SCORER_DIR):
+        """Write the compiled arrays as .npy files and the rest as manifest.json"""
+        arrays, manifest = self.trees.state()
+        save_arrays(directory, {**arrays, **{name: getattr(self, name) for name in self.ARRAYS}},
+                    {**manifest, **{name: getattr(self, name) for name in self.MANIFEST}})
+        print(f"💾 Compiled scorer saved to {directory}")
+    
+    @classmethod
+    def load(cls, directory=config.SCORER_DIR):
+        """Scorer from save() output; the arrays are memory-mapped, not read into memory"""
+        arrays, manifest = load_arrays(directory)
+        scorer = cls.__new__(cls)
+        scorer.trees = TreeArrays.from_state(arrays, manifest)
+        for name in cls.ARRAYS:
+            setattr(scorer, name, arrays[name])
+        for name in cls.MANIFEST:
+            setattr(scorer, name, manifest[name])
+        
+        scorer.feature_engineer = FinancialFeatureEngineer()
+        return scorer
+    
+    def transform(self, features):
+        """Scaled float32 feature vector (a new one per call) for an engineered profile dict"""
+        vector = np.empty(len(self.feature_names), dtype=np.float32)
+        for i, name in enumerate(self.feature_names):
+            value = features.get(name, 0)
+            if name in self.category_codes:
+                value = self.category_codes[name].get(value, 0)
+            vector[i] = value
+        
+        vector -= self.mean
+        vector /= self.scale
+        return vector
+    
+    def predict(self, profile):
+        """
+        Predictions for one profile, in the format of GlobalFinSightApp.make_predictions.
+        
+        `profile` may be raw inputs or already engineered; missing engineered
+        features are computed first.
+        """
+        if any(name not in profile for name in self.features):
+            profile = self.feature_engineer.compute_profile_features(profile, self.features)
+        outputs = self.trees.sums(self.transform(profile)) + self.intercept
+        
+        margins = outputs[:self.health_slot]
+        risk_proba = np.exp(margins - margins.max())
+        risk_proba /= risk_proba.sum()
+        
+        return {
+            'risk_category': config.RISK_LABELS[int(risk_proba.argmax())],
+            'risk_probabilities': dict(zip(config.RISK_LABELS, risk_proba.tolist())),
+            'predicted_health_score': float(min(max(outputs[self.health_slot], 0), 100)),
+            'forecasted_expenses': float(max(outputs[self.expense_slot] / self.n_forest_trees, 0))
+        }
@@ -3,12 +3,641 @@ Enhanced AI-Powered Financial Recommendation Engine
 Advanced recommendations using pattern matching and financial rules
 """
 
+import ast
+from bisect import bisect_left, bisect_right
+import functools
+import json
+import string
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
 import numpy as np
 import pandas as pd
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 import config
+from src.utils import DataUtils
+
+
+# ==================== RULE TABLE ====================
+
+# Rule groups in output order: generate_recommendations, analyze_financial_profile, generate_ai_insights
+RULE_GROUPS = ['recommendations', 'analysis', 'insights']
+# Options of a rule's `amounts`: {"decimals": N} for unscaled amounts, {"format": "compact"} for 3.8M
+AMOUNT_OPTIONS = {'decimals', 'format'}
+
+# Syntax allowed in rule expressions: arithmetic, comparisons, and/or, `a if cond else b`, names and numbers
+EXPRESSION_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.BoolOp, ast.IfExp, ast.Name, ast.Constant, ast.Load,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.USub, ast.UAdd,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq, ast.And, ast.Or
+)
+
+
+def _where(condition, if_true, if_false):
+    """`if_true if condition else if_false`, element-wise for arrays"""
+    if isinstance(condition, np.ndarray):
+        return np.where(condition, if_true, if_false)
+    return if_true if condition else if_false
+
+
+class _VectorizeExpression(ast.NodeTransformer):
+    """
+    Rewrites a rule expression to run element-wise on metric arrays as well
+    as on scalars: names become lookups in the metrics dict `m`, thresholds
+    become constants, and/or become &/|, chained comparisons are split, and
+    conditional expressions call _where.
+    """
+    
+    def __init__(self, names, thresholds):
+        self.names = names
+        self.thresholds = thresholds
+    
+    def generic_visit(self, node):
+        if not isinstance(node, EXPRESSION_NODES):
+            raise ValueError(f"Unsupported syntax in rule expression: {type(node).__name__}")
+        return super().generic_visit(node)
+    
+    def visit_Constant(self, node):
+        if isinstance(node.value, str):
+            raise ValueError(f"Unsupported constant in rule expression: {node.value!r}")
+        return node
+    
+    def visit_Name(self, node):
+        if node.id in self.thresholds:
+            return ast.Constant(self.thresholds[node.id])
+        if node.id not in self.names:
+            raise ValueError(f"Unknown name in rule expression: {node.id}")
+        return ast.Subscript(value=ast.Name('m', ast.Load()), slice=ast.Constant(node.id), ctx=ast.Load())
+    
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        return functools.reduce(lambda left, right: ast.BinOp(left, op, right), node.values)
+    
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        operands = [node.left, *node.comparators]
+        comparisons = [ast.Compare(left, [op], [right])
+                       for left, op, right in zip(operands, node.ops, operands[1:])]
+        return functools.reduce(lambda left, right: ast.BinOp(left, ast.BitAnd(), right), comparisons)
+    
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        return ast.Call(ast.Name('where', ast.Load()), [node.test, node.body, node.orelse], [])
+
+
+def compile_expression(source, names, thresholds):
+    """Compile a rule expression into fn(metrics) that works on a dict of arrays or of scalars"""
+    tree = _VectorizeExpression(names, thresholds).visit(ast.parse(str(source), mode='eval'))
+    function = ast.Expression(ast.Lambda(
+        args=ast.arguments(posonlyargs=[], args=[ast.arg('m')], kwonlyargs=[], kw_defaults=[], defaults=[]),
+        body=tree.body
+    ))
+    code = compile(ast.fix_missing_locations(function), f'<rule expression: {source}>', 'eval')
+    return eval(code, {'__builtins__': {}, 'where': _where})
+
+
+class _SignatureAnalysis:
+    """
+    Finds the rule expressions that the bucketed signature determines.
+    
+    An expression is determined when it only combines constants (numbers
+    and thresholds), names already determined, and comparisons of a
+    signature input with a constant. Each such comparison makes the constant
+    a cut point of that input, so a profile's bucket (its position among the
+    cut points, equality included) fixes the expression's value.
+    """
+    
+    def __init__(self, inputs, thresholds):
+        self.thresholds = thresholds
+        self.determined = set()
+        self.cuts = {name: set() for name in inputs}
+    
+    def constant(self, node):
+        """Value of an expression of numbers and thresholds only, else None"""
+        if all(node.id in self.thresholds for node in ast.walk(node) if isinstance(node, ast.Name)):
+            return compile_expression(ast.unparse(node), set(), self.thresholds)({})
+        return None
+    
+    def is_determined(self, node, cuts):
+        """Whether the signature determines `node`; its cut points are appended to `cuts`"""
+        if self.constant(node) is not None:
+            return True
+        if isinstance(node, ast.Name):
+            return node.id in self.determined
+        if isinstance(node, ast.Compare):
+            operands = [node.left, *node.comparators]
+            for left, right in zip(operands, operands[1:]):
+                for name, other in [(left, right), (right, left)]:
+                    if isinstance(name, ast.Name) and name.id in self.cuts:
+                        value = self.constant(other)
+                        if value is not None:
+                            cuts.append((name.id, value))
+                            break
+                else:
+                    if not (self.is_determined(left, cuts) and self.is_determined(right, cuts)):
+                        return False
+            return True
+        if isinstance(node, (ast.BoolOp, ast.UnaryOp, ast.BinOp, ast.IfExp)):
+            return all(self.is_determined(child, cuts) for child in ast.iter_child_nodes(node)
+                       if isinstance(child, ast.expr))
+        return False
+    
+    def add(self, source, name=None):
+        """Whether the signature determines `source`; if so its cut points are kept and `name` is determined"""
+        cuts = []
+        if not self.is_determined(ast.parse(str(source), mode='eval').body, cuts):
+            return False
+        for input_name, value in cuts:
+            self.cuts[input_name].add(value)
+        if name is not None:
+            self.determined.add(name)
+        return True
+
+
+class SkeletonCache:
+    """
+    Bounded LRU of rule skeletons: for a bucketed signature, per group, the
+    rules it determines that fire and the prepared outputs for each outcome
+    of the other rules.
+    
+    Shared between threads; `hits` and `misses` count lookups since the rule
+    table loaded.
+    """
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        with self.lock:
+            skeleton = self.entries.get(key)
+            if skeleton is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return skeleton
+    
+    def put(self, key, skeleton):
+        with self.lock:
+            self.entries[key] = skeleton
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+    
+    def info(self):
+        """Hit and miss counts, hit rate, current and maximum size"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'size': len(self.entries), 'maxsize': self.maxsize}
+
+
+def resolve_threshold(name, value):
+    """A threshold's value: a literal, or a "SETTING.key" reference read from config"""
+    if not isinstance(value, str):
+        return value
+    setting, _, key = value.partition('.')
+    try:
+        return getattr(config, setting)[key]
+    except (AttributeError, KeyError, TypeError):
+        raise ValueError(f"Threshold {name}: unknown config setting {value}") from None
+
+
+class RuleTable:
+    """
+    Compiled recommendation rules, read from a JSON table (config.RECOMMENDATION_RULES_PATH).
+    
+    The table lists the profile `inputs` the rules read (with the default for
+    a missing one; its type sets the dtype), named `thresholds` (a number, or
+    a "SETTING.key" reference such as "DEBT_TO_INCOME_THRESHOLD.critical" so
+    the cutoffs score_risk also uses live in config only), derived `metrics`
+    and shared `conditions`, the `signature` inputs (the skeleton cache's
+    key, see signature_key) and the `rules` of all three groups.
+    Metrics and conditions are evaluated once per profile or batch; each rule
+    then only combines them. A rule has an id, group, `when` condition,
+    `params` for its text, a `priority` (recommendations; otherwise table
+    order), a SWOT `section` (analysis), `amounts` (the params that are
+    money, with their format options), `constants` and `text` templates,
+    which are pre-parsed at load (compile_template).
+    """
+    
+    def __init__(self, spec):
+        self.inputs = spec['inputs']
+        thresholds = {name: resolve_threshold(name, value) for name, value in spec.get('thresholds', {}).items()}
+        names = set(self.inputs)
+        signature = spec.get('signature', [])
+        if not set(signature) <= names:
+            raise ValueError(f"Signature inputs {sorted(set(signature) - names)} are not inputs")
+        analysis = _SignatureAnalysis(signature, thresholds)
+        
+        # Metrics, then conditions, in table order; each may use the names before it
+        self.derived = []
+        for name, source in [*spec.get('metrics', {}).items(), *spec.get('conditions', {}).items()]:
+            self.derived.append((name, compile_expression(source, names, thresholds)))
+            analysis.add(source, name)
+            names.add(name)
+        
+        self.rules = {}
+        self.group_rules = {group: [] for group in RULE_GROUPS}
+        for entry in spec['rules']:
+            rule_id, group = entry['id'], entry['group']
+            if group not in self.group_rules:
+                raise ValueError(f"Rule {rule_id}: unknown group {group}")
+            if rule_id in self.rules:
+                raise ValueError(f"Duplicate rule id {rule_id}")
+            
+            param_names = list(entry.get('params', {}))
+            amounts = entry.get('amounts', {})
+            if not set(amounts) <= set(param_names):
+                raise ValueError(f"Rule {rule_id}: amounts {sorted(set(amounts) - set(param_names))} are not params")
+            for name, options in amounts.items():
+                if not set(options) <= AMOUNT_OPTIONS or options.get('format', 'compact') != 'compact':
+                    raise ValueError(f"Rule {rule_id}: invalid options for amount {name}: {options}")
+            
+            priority = entry.get('priority', len(self.group_rules[group]) + 1)
+            rule = {
+                'group': group,
+                'position': len(self.group_rules[group]),
+                'when': compile_expression(entry['when'], names, thresholds),
+                'params': {name: compile_expression(source, names, thresholds)
+                           for name, source in entry.get('params', {}).items()},
+                'priority': compile_expression(priority, names, thresholds),
+                # Whether the bucketed signature fixes if the rule fires and its priority
+                'keyed': analysis.add(entry['when']) and analysis.add(priority),
+                'section': entry.get('section'),
+                # (name, index, decimals, compact) of the params that are money in the profile's currency
+                'amounts': tuple((name, param_names.index(name), options.get('decimals'),
+                                  options.get('format') == 'compact') for name, options in amounts.items()),
+                # Lists are paths into RECOMMENDATION_DATABASE
+                'templates': {field: compile_template(resolve_template(template), param_names,
+                                                      entry.get('constants', {}), amounts)
+                              for field, template in entry['text'].items()}
+            }
+            # Output dict with the static fields filled, and the (field, text, slots) left to format per profile
+            rule['static'] = {**{field: None if slots else text for field, (text, slots) in rule['templates'].items()},
+                              'amounts': None, 'currency': None}
+            rule['formatted'] = tuple((field, text, slots) for field, (text, slots) in rule['templates'].items()
+                                      if slots)
+            self.rules[rule_id] = rule
+            self.group_rules[group].append((rule_id, rule))
+        
+        self.keyed_rules = {group: [(rule_id, rule) for rule_id, rule in rules if rule['keyed']]
+                            for group, rules in self.group_rules.items()}
+        self.residual_rules = {group: [(rule_id, rule) for rule_id, rule in rules if not rule['keyed']]
+                               for group, rules in self.group_rules.items()}
+        # (input, sorted cut points) of the signature inputs that the keyed rules compare
+        self.signature = [(name, sorted(analysis.cuts[name])) for name in signature if analysis.cuts[name]]
+        # Per table, so a reload starts with an empty cache
+        self.skeletons = SkeletonCache(config.RECOMMENDATION_CACHE_SIZE)
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+    
+    def evaluate(self, features):
+        """Inputs, metrics and conditions: arrays for a feature DataFrame, Python scalars for one profile dict"""
+        if isinstance(features, pd.DataFrame):
+            values = {
+                name: (features[name].to_numpy(dtype=type(default)) if name in features.columns
+                       else np.full(len(features), default))
+                for name, default in self.inputs.items()
+            }
+        else:
+            # Scalars: NumPy's per-call overhead would dominate on one profile
+            values = {name: type(default)(features.get(name, default)) for name, default in self.inputs.items()}
+        
+        for name, expression in self.derived:
+            values[name] = expression(values)
+        return values
+    
+    def signature_key(self, metrics):
+        """
+        Bucketed signature of one profile: per signature input, its bucket
+        among the cut points (2i between cut points i-1 and i, 2i + 1 on cut
+        point i; -1 for NaN). Only bisects the inputs, no rule is evaluated.
+        """
+        key = []
+        for name, cuts in self.signature:
+            value = metrics[name]
+            key.append(bisect_left(cuts, value) + bisect_right(cuts, value) if value == value else -1)
+        return tuple(key)
+
+
+# Seconds between checks of the rules file for changes
+RULES_CHECK_INTERVAL = 1.0
+# path -> (mtime_ns, time of the last check, RuleTable), shared by every engine in the process
+_RULE_TABLES = {}
+
+
+def load_rules(path=None):
+    """
+    The compiled rule table at `path` (default config.RECOMMENDATION_RULES_PATH).
+    
+    Compiled once per process and recompiled when the file changes (checked
+    at most every RULES_CHECK_INTERVAL seconds), so rules and thresholds can
+    be edited without a restart. An edit that fails to compile is reported
+    and the previous table stays in use.
+    """
+    path = path or config.RECOMMENDATION_RULES_PATH
+    now = time.monotonic()
+    cached = _RULE_TABLES.get(path)
+    if cached is not None and now - cached[1] < RULES_CHECK_INTERVAL:
+        return cached[2]
+    
+    mtime = os.stat(path).st_mtime_ns
+    if cached is not None and cached[0] == mtime:
+        table = cached[2]
+    else:
+        try:
+            table = RuleTable.load(path)
+        except (ValueError, KeyError, TypeError, SyntaxError) as e:
+            if cached is None:
+                raise
+            print(f"❌ Keeping the previous recommendation rules, {path} failed to load: {e}")
+            table = cached[2]
+    _RULE_TABLES[path] = (mtime, now, table)
+    return table
+
+
+# ==================== TEMPLATES ====================
+
+
+def _freeze(value):
+    """Read-only copy of nested dicts and lists, safe to share between sessions and threads"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+# Recommendation text by topic, built once per process
+RECOMMENDATION_DATABASE = _freeze({
+    'emergency_fund': {
+        'critical': [
+            "🚨 **URGENT**: Build emergency fund immediately. Start with $1,000 baseline.",
+            "⚠️ **High Priority**: Set up automatic transfer of 10% income to emergency savings.",
+            "💡 **Quick Win**: Cut one non-essential expense and redirect to emergency fund."
+        ],
+        'low': [
+            "⚠️ **Action Needed**: Your emergency fund covers less than 2 months. Aim for 3-6 months.",
+            "📊 **Target**: Build emergency fund to cover {months} months of expenses.",
+            "💰 **Strategy**: Allocate {amount} per month to reach 6-month coverage in 1 year."
+        ],
+        'moderate': [
+            "✅ **Good Progress**: You have {months} months covered. Aim for 6 months.",
+            "📈 **Enhancement**: Consider high-yield savings account for emergency fund.",
+            "🎯 **Goal**: Increase emergency fund by {percentage}% over next 6 months."
+        ]
+    },
+    'debt_management': {
+        'high': [
+            "🔴 **Critical Debt Level**: Debt-to-income ratio is {dti}%. Immediate action required.",
+            "💳 **Debt Avalanche**: Focus on highest interest rate debt first (typically credit cards).",
+            "📉 **Consolidation**: Consider debt consolidation loan if rate is below {current_rate}%.",
+            "⚡ **Quick Impact**: Pay extra ${amount} toward debt monthly to reduce payoff time by {months} months.",
+            "🎯 **Target**: Reduce DTI to below 36% within 12 months."
+        ],
+        'medium': [
+            "⚠️ **Debt Optimization**: Your DTI is {dti}%. Industry standard recommends below 36%.",
+            "💡 **Balance Transfer**: Explore 0% APR balance transfer cards for credit card debt.",
+            "📊 **Snowball Method**: Pay off smallest debt first for psychological wins.",
+            "🔄 **Refinancing**: Check if you can refinance high-interest loans at lower rates."
+        ],
+        'low': [
+            "✅ **Healthy Debt Level**: DTI of {dti}% is well-managed.",
+            "📈 **Optimization**: Consider extra payments to save on interest long-term.",
+            "💰 **Investment vs Debt**: With low debt, focus more on investing for higher returns."
+        ]
+    },
+    'savings_optimization': {
+        'poor': [
+            "🚨 **Savings Alert**: Current savings rate is {rate}%. Aim for minimum 15-20%.",
+            "💡 **Pay Yourself First**: Set up automatic transfer on payday to savings account.",
+            "📊 **Expense Audit**: Review subscriptions and recurring charges - cut unused services.",
+            "🎯 **Challenge**: Increase savings rate by 1% each month for next 6 months.",
+            "💰 **Side Income**: Consider freelancing or part-time work to boost savings."
+        ],
+        'moderate': [
+            "📈 **Good Start**: {rate}% savings rate is solid. Push toward 20-25% for excellence.",
+            "🔄 **Automation**: Automate savings increases with each raise or bonus.",
+            "💡 **Tax Advantage**: Max out tax-advantaged accounts (401k, IRA) first.",
+            "🎯 **Goal**: Reach {target}% savings rate within 12 months."
+        ],
+        'excellent': [
+            "🌟 **Outstanding**: {rate}% savings rate is excellent! You're wealth-building.",
+            "📈 **Next Level**: Focus on optimizing investment allocation for growth.",
+            "💎 **Tax Efficiency**: Review tax-loss harvesting and Roth conversions.",
+            "🎯 **Wealth Building**: Consider real estate or business investment opportunities."
+        ]
+    },
+    'investment_strategy': {
+        'beginner': [
+            "📚 **Start Simple**: Begin with low-cost index funds (S&P 500, Total Market).",
+            "🎯 **401(k) First**: Contribute enough to get full employer match (free money!).",
+            "💰 **Roth IRA**: Open Roth IRA and contribute ${amount} monthly.",
+            "📊 **Diversification**: Follow 60/40 stocks/bonds allocation for balanced growth.",
+            "⏰ **Time is Power**: Starting now gives you {years} years of compound growth."
+        ],
+        'intermediate': [
+            "📈 **Portfolio Review**: Rebalance portfolio quarterly to maintain target allocation.",
+            "💎 **Tax Optimization**: Use tax-loss harvesting to offset capital gains.",
+            "🌍 **International Exposure**: Add 20-30% international stocks for diversification.",
+            "🏠 **Real Estate**: Consider REITs for real estate exposure without buying property.",
+            "🎯 **Target**: Aim for {target_percentage}% portfolio growth over next 3 years."
+        ],
+        'advanced': [
+            "🚀 **Alternative Investments**: Explore opportunities in private equity or startups.",
+            "💼 **Business Ventures**: Your financial foundation supports entrepreneurship.",
+            "🌐 **Geographic Diversification**: Consider international real estate or assets.",
+            "📊 **Advanced Strategies**: Use options for income generation (covered calls).",
+            "🎯 **Wealth Preservation**: Focus on asset protection and estate planning."
+        ]
+    },
+    'tax_optimization': {
+        'strategies': [
+            "💰 **Tax-Advantaged Accounts**: Max out 401(k) (${k401_limit}) and IRA (${ira_limit}).",
+            "📊 **HSA Triple Tax Advantage**: If eligible, max out HSA - tax deductible, grows tax-free, withdraws tax-free.",
+            "🎯 **Capital Gains**: Hold investments >1 year for lower long-term capital gains tax.",
+            "💡 **Tax-Loss Harvesting**: Offset gains with losses to reduce taxable income.",
+            "🏠 **Homeownership**: Mortgage interest and property tax deductions if applicable.",
+            "📈 **Roth Conversion**: Consider Roth IRA conversion in low-income years."
+        ]
+    },
+    'lifestyle_optimization': {
+        'high_discretionary': [
+            "⚠️ **Lifestyle Inflation**: Discretionary spending is {percentage}% of income - aim for <15%.",
+            "💡 **30-Day Rule**: Wait 30 days before purchases over ${amount}.",
+            "📱 **Subscription Audit**: Cancel unused subscriptions (average person wastes $200/month).",
+            "🎯 **Challenge**: Reduce discretionary spending by 20% for 3 months.",
+            "💰 **Redirect Savings**: Put 50% of spending cuts toward investments."
+        ],
+        'balanced': [
+            "✅ **Balanced Lifestyle**: Your discretionary spending is well-controlled.",
+            "📊 **Optimization**: Look for value optimization (better deals on same items).",
+            "💡 **Mindful Spending**: Continue tracking expenses to maintain awareness.",
+            "🎯 **Upgrade**: With controlled spending, focus on income growth."
+        ]
+    },
+    'income_growth': {
+        'strategies': [
+            "🚀 **Career Advancement**: Negotiate raise or seek promotion (avg increase: 10-20%).",
+            "💼 **Side Income**: Start freelancing in your expertise area.",
+            "📚 **Skill Development**: Invest in courses that increase earning potential.",
+            "🌐 **Passive Income**: Create digital products, courses, or rental income streams.",
+            "🎯 **Target**: Increase income by {percentage}% within 12 months.",
+            "💡 **Job Market**: Update resume and explore market value (avg 20% increase when switching)."
+        ]
+    },
+    'retirement_planning': {
+        'age_based': {
+            '20s-30s': [
+                "⚡ **Time Advantage**: You have 30-40 years for compound growth - invest aggressively.",
+                "📈 **Target Allocation**: 80-90% stocks, 10-20% bonds for maximum growth.",
+                "🎯 **Retirement Goal**: Save 1x annual salary by age 30, 3x by age 40.",
+                "💰 **Minimum**: Contribute 15% of income to retirement accounts.",
+                "🚀 **Power of Starting Early**: $500/month at 25 = $1.2M at 65 (7% return)."
+            ],
+            '40s-50s': [
+                "⏰ **Critical Decade**: 40s-50s are peak earning years - maximize savings.",
+                "🎯 **Catch-Up**: If behind, you can contribute extra $7,500 to 401(k) after age 50.",
+                "📊 **Target Allocation**: 60-70% stocks, 30-40% bonds as you approach retirement.",
+                "💡 **Retirement Calculator**: Need ${target_amount} for ${desired_income}/month in retirement.",
+                "🏠 **Mortgage**: Consider paying off mortgage before retirement to reduce expenses."
+            ],
+            '50s-60s': [
+                "🎯 **Retirement Ready**: Focus on preservation and guaranteed income.",
+                "📉 **Risk Reduction**: Shift to 40-50% stocks, 50-60% bonds/fixed income.",
+                "💰 **Social Security**: Delay claiming until 70 for maximum benefit (8% increase/year).",
+                "🏥 **Healthcare**: Plan for Medicare gap coverage and long-term care insurance.",
+                "📊 **Withdrawal Strategy**: Plan 4% safe withdrawal rate from retirement portfolio."
+            ]
+        }
+    },
+    'country_specific': {
+        'India': [
+            "🇮🇳 **PPF/EPF**: Maximize Public Provident Fund contributions (tax-free returns).",
+            "💰 **Tax Saving**: Utilize Section 80C deductions (₹1.5L limit).",
+            "🏠 **Home Loan**: Take advantage of additional ₹2L deduction under Section 24(b).",
+            "📊 **ELSS Funds**: Invest in Equity Linked Savings Schemes for tax benefits + growth.",
+            "🎯 **NPS**: Consider National Pension System for retirement (extra ₹50K deduction)."
+        ],
+        'UAE': [
+            "🇦🇪 **Tax-Free Advantage**: No income tax - save/invest 40-50% of income.",
+            "💰 **Offshore Investment**: Set up offshore investment accounts for long-term wealth.",
+            "🏠 **Property**: Consider Dubai real estate for residency + rental income.",
+            "📊 **Gratuity Planning**: Factor in end-of-service gratuity in financial planning.",
+            "🎯 **Repatriation**: Plan for eventual home country return - currency considerations."
+        ],
+        'United States': [
+            "🇺🇸 **401(k) Match**: Contribute minimum 6% to get full employer match.",
+            "💰 **Roth IRA**: If eligible, contribute $7,000/year for tax-free growth.",
+            "📊 **HSA**: Triple tax advantage - contribute $4,150 (individual) or $8,300 (family).",
+            "🏠 **Mortgage Interest**: Deduct mortgage interest up to $750K loan.",
+            "🎯 **FIRE Movement**: Financial Independence Retire Early - save 50-70% income."
+        ],
+        'United Kingdom': [
+            "🇬🇧 **ISA Allowance**: Use full £20,000 ISA allowance for tax-free growth.",
+            "💰 **Pension Contributions**: Maximize workplace pension with employer match.",
+            "📊 **Lifetime ISA**: Get 25% government bonus on contributions (up to £4,000/year).",
+            "🏠 **Help to Buy**: First-time buyers - use government schemes.",
+            "🎯 **Tax Relief**: Get 20-45% tax relief on pension contributions."
+        ],
+        'Canada': [
+            "🇨🇦 **RRSP**: Maximize RRSP contributions for tax deduction.",
+            "💰 **TFSA**: Tax-Free Savings Account - $6,500/year contribution room.",
+            "📊 **RESP**: If you have children, use RESP for education savings (20% government grant).",
+            "🏠 **First Home Savings**: New FHSA allows tax-free saving for first home.",
+            "🎯 **Employer Match**: Contribute enough to get full employer RRSP match."
+        ],
+        'Australia': [
+            "🇦🇺 **Superannuation**: Salary sacrifice to super for tax savings.",
+            "💰 **Concessional Contributions**: Contribute up to $27,500/year pre-tax.",
+            "📊 **First Home Super Saver**: Use super to save for first home deposit.",
+            "🏠 **Negative Gearing**: If investing in property, understand negative gearing benefits.",
+            "🎯 **Government Co-contribution**: Earn up to $500 government match on super."
+        ],
+        'Singapore': [
+            "🇸🇬 **CPF Top-Up**: Maximize CPF Special/Retirement Account contributions.",
+            "💰 **SRS**: Supplementary Retirement Scheme for tax relief (up to $15,300/year).",
+            "📊 **CPF Investment Scheme**: Invest excess CPF for better returns.",
+            "🏠 **HDB Grant**: First-time buyers - utilize CPF Housing Grant.",
+            "🎯 **Tax Relief**: Utilize all available personal tax reliefs."
+        ]
+    }
+})
+
+
+def resolve_template(template):
+    """A rule's text template; (section, key, ..., index) paths point into RECOMMENDATION_DATABASE"""
+    if isinstance(template, (list, tuple)):
+        entry = RECOMMENDATION_DATABASE
+        for key in template:
+            entry = entry[key]
+        return entry
+    return template
+
+
+def compile_template(template, param_names, constants, amounts=()):
+    """
+    Pre-parse a rule's format template into (text, slots).
+    
+    Constants are formatted into the text once, and each remaining
+    placeholder becomes a positional field filled from params[slot], so
+    rendering is one str.format call on the params tuple. A template
+    without params (slots is empty) is already the final text. Amount
+    params take no format spec: they arrive formatted for the currency.
+    """
+    pieces, slots = [], []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        pieces.append(literal.replace('{', '{{').replace('}', '}}'))
+        if field is None:
+            continue
+        if field in constants:
+            value = constants[field]
+            if conversion:
+                value = {'r': repr, 's': str, 'a': ascii}[conversion](value)
+            pieces.append(format(value, spec).replace('{', '{{').replace('}', '}}'))
+        elif field in param_names:
+            if field in amounts and (spec or conversion):
+                raise ValueError(f"Amount {{{field}}} is formatted by currency and takes no format spec: {template}")
+            conversion = f'!{conversion}' if conversion else ''
+            spec = f':{spec}' if spec else ''
+            pieces.append(f'{{{len(slots)}{conversion}{spec}}}')
+            slots.append(param_names.index(field))
+        else:
+            raise ValueError(f"Unknown field {{{field}}} in template: {template}")
+    
+    text = ''.join(pieces)
+    return (text, tuple(slots)) if slots else (text.format(), ())
+
+
+def profile_currency(profile, default='USD'):
+    """Currency code of a profile: its `currency`, else its country's, else `default`"""
+    if profile.get('currency'):
+        return profile['currency']
+    country_config = config.COUNTRY_CONFIG.get(profile.get('country'))
+    return country_config['currency'] if country_config else default
+
+
+def frame_currencies(features, default='USD'):
+    """profile_currency for each row of a feature DataFrame, as an object array"""
+    currencies = pd.Series(None, index=features.index, dtype=object)
+    if 'currency' in features.columns:
+        currencies = features['currency'].astype(object)
+    if 'country' in features.columns:
+        country_currencies = {country: cfg['currency'] for country, cfg in config.COUNTRY_CONFIG.items()}
+        currencies = currencies.where(currencies.notna(), features['country'].astype(object).map(country_currencies))
+    return currencies.where(currencies.notna(), default).to_numpy(dtype=object)
+
 
 class FinancialRecommendationEngine:
     """
@@ -16,205 +645,113 @@ class FinancialRecommendationEngine:
     Uses rule-based AI combined with pattern recognition
     """
     
-    def __init__(self):
-        self.recommendation_database = self._build_recommendation_database()
+    def __init__(self, rules_path=None):
+        # Shared and read-only: built once per process, not per engine
+        self.recommendation_database = RECOMMENDATION_DATABASE
+        self.rules_path = rules_path
+        # (rule table, profile inputs, metrics, skeleton) of the last profile evaluated
+        self._last_profile = (None, None, None, None)
+        self.rules()
+    
+    def rules(self):
+        """The current rule table; reloaded when the rules file changes"""
+        self.rule_table = load_rules(self.rules_path)
+        return self.rule_table
+    
+    def evaluate_profile(self, user_features):
+        """
+        Rule table, metrics and skeleton (see skeleton()) for one profile dict.
         
-    def _build_recommendation_database(self):
-        """Build comprehensive recommendation database"""
-        return {
-            'emergency_fund': {
-                'critical': [
-                    "🚨 **URGENT**: Build emergency fund immediately. Start with $1,000 baseline.",
-                    "⚠️ **High Priority**: Set up automatic transfer of 10% income to emergency savings.",
-                    "💡 **Quick Win**: Cut one non-essential expense and redirect to emergency fund."
-                ],
-                'low': [
-                    "⚠️ **Action Needed**: Your emergency fund covers less than 2 months. Aim for 3-6 months.",
-                    "📊 **Target**: Build emergency fund to cover {months} months of expenses.",
-                    "💰 **Strategy**: Allocate {amount} per month to reach 6-month coverage in 1 year."
-                ],
-                'moderate': [
-                    "✅ **Good Progress**: You have {months} months covered. Aim for 6 months.",
-                    "📈 **Enhancement**: Consider high-yield savings account for emergency fund.",
-                    "🎯 **Goal**: Increase emergency fund by {percentage}% over next 6 months."
-                ]
-            },
-            'debt_management': {
-                'high': [
-                    "🔴 **Critical Debt Level**: Debt-to-income ratio is {dti}%. Immediate action required.",
-                    "💳 **Debt Avalanche**: Focus on highest interest rate debt first (typically credit cards).",
-                    "📉 **Consolidation**: Consider debt consolidation loan if rate is below {current_rate}%.",
-                    "⚡ **Quick Impact**: Pay extra ${amount} toward debt monthly to reduce payoff time by {months} months.",
-                    "🎯 **Target**: Reduce DTI to below 36% within 12 months."
-                ],
-                'medium': [
-                    "⚠️ **Debt Optimization**: Your DTI is {dti}%. Industry standard recommends below 36%.",
-                    "💡 **Balance Transfer**: Explore 0% APR balance transfer cards for credit card debt.",
-                    "📊 **Snowball Method**: Pay off smallest debt first for psychological wins.",
-                    "🔄 **Refinancing**: Check if you can refinance high-interest loans at lower rates."
-                ],
-                'low': [
-                    "✅ **Healthy Debt Level**: DTI of {dti}% is well-managed.",
-                    "📈 **Optimization**: Consider extra payments to save on interest long-term.",
-                    "💰 **Investment vs Debt**: With low debt, focus more on investing for higher returns."
-                ]
-            },
-            'savings_optimization': {
-                'poor': [
-                    "🚨 **Savings Alert**: Current savings rate is {rate}%. Aim for minimum 15-20%.",
-                    "💡 **Pay Yourself First**: Set up automatic transfer on payday to savings account.",
-                    "📊 **Expense Audit**: Review subscriptions and recurring charges - cut unused services.",
-                    "🎯 **Challenge**: Increase savings rate by 1% each month for next 6 months.",
-                    "💰 **Side Income**: Consider freelancing or part-time work to boost savings."
-                ],
-                'moderate': [
-                    "📈 **Good Start**: {rate}% savings rate is solid. Push toward 20-25% for excellence.",
-                    "🔄 **Automation**: Automate savings increases with each raise or bonus.",
-                    "💡 **Tax Advantage**: Max out tax-advantaged accounts (401k, IRA) first.",
-                    "🎯 **Goal**: Reach {target}% savings rate within 12 months."
-                ],
-                'excellent': [
-                    "🌟 **Outstanding**: {rate}% savings rate is excellent! You're wealth-building.",
-                    "📈 **Next Level**: Focus on optimizing investment allocation for growth.",
-                    "💎 **Tax Efficiency**: Review tax-loss harvesting and Roth conversions.",
-                    "🎯 **Wealth Building**: Consider real estate or business investment opportunities."
-                ]
-            },
-            'investment_strategy': {
-                'beginner': [
-                    "📚 **Start Simple**: Begin with low-cost index funds (S&P 500, Total Market).",
-                    "🎯 **401(k) First**: Contribute enough to get full employer match (free money!).",
-                    "💰 **Roth IRA**: Open Roth IRA and contribute ${amount} monthly.",
-                    "📊 **Diversification**: Follow 60/40 stocks/bonds allocation for balanced growth.",
-                    "⏰ **Time is Power**: Starting now gives you {years} years of compound growth."
-                ],
-                'intermediate': [
-                    "📈 **Portfolio Review**: Rebalance portfolio quarterly to maintain target allocation.",
-                    "💎 **Tax Optimization**: Use tax-loss harvesting to offset capital gains.",
-                    "🌍 **International Exposure**: Add 20-30% international stocks for diversification.",
-                    "🏠 **Real Estate**: Consider REITs for real estate exposure without buying property.",
-                    "🎯 **Target**: Aim for {target_percentage}% portfolio growth over next 3 years."
-                ],
-                'advanced': [
-                    "🚀 **Alternative Investments**: Explore opportunities in private equity or startups.",
-                    "💼 **Business Ventures**: Your financial foundation supports entrepreneurship.",
-                    "🌐 **Geographic Diversification**: Consider international real estate or assets.",
-                    "📊 **Advanced Strategies**: Use options for income generation (covered calls).",
-                    "🎯 **Wealth Preservation**: Focus on asset protection and estate planning."
-                ]
-            },
-            'tax_optimization': {
-                'strategies': [
-                    "💰 **Tax-Advantaged Accounts**: Max out 401(k) (${k401_limit}) and IRA (${ira_limit}).",
-                    "📊 **HSA Triple Tax Advantage**: If eligible, max out HSA - tax deductible, grows tax-free, withdraws tax-free.",
-                    "🎯 **Capital Gains**: Hold investments >1 year for lower long-term capital gains tax.",
-                    "💡 **Tax-Loss Harvesting**: Offset gains with losses to reduce taxable income.",
-                    "🏠 **Homeownership**: Mortgage interest and property tax deductions if applicable.",
-                    "📈 **Roth Conversion**: Consider Roth IRA conversion in low-income years."
-                ]
-            },
-            'lifestyle_optimization': {
-                'high_discretionary': [
-                    "⚠️ **Lifestyle Inflation**: Discretionary spending is {percentage}% of income - aim for <15%.",
-                    "💡 **30-Day Rule**: Wait 30 days before purchases over ${amount}.",
-                    "📱 **Subscription Audit**: Cancel unused subscriptions (average person wastes $200/month).",
-                    "🎯 **Challenge**: Reduce discretionary spending by 20% for 3 months.",
-                    "💰 **Redirect Savings**: Put 50% of spending cuts toward investments."
-                ],
-                'balanced': [
-                    "✅ **Balanced Lifestyle**: Your discretionary spending is well-controlled.",
-                    "📊 **Optimization**: Look for value optimization (better deals on same items).",
-                    "💡 **Mindful Spending**: Continue tracking expenses to maintain awareness.",
-                    "🎯 **Upgrade**: With controlled spending, focus on income growth."
-                ]
-            },
-            'income_growth': {
-                'strategies': [
-                    "🚀 **Career Advancement**: Negotiate raise or seek promotion (avg increase: 10-20%).",
-                    "💼 **Side Income**: Start freelancing in your expertise area.",
-                    "📚 **Skill Development**: Invest in courses that increase earning potential.",
-                    "🌐 **Passive Income**: Create digital products, courses, or rental income streams.",
-                    "🎯 **Target**: Increase income by {percentage}% within 12 months.",
-                    "💡 **Job Market**: Update resume and explore market value (avg 20% increase when switching)."
-                ]
-            },
-            'retirement_planning': {
-                'age_based': {
-                    '20s-30s': [
-                        "⚡ **Time Advantage**: You have 30-40 years for compound growth - invest aggressively.",
-                        "📈 **Target Allocation**: 80-90% stocks, 10-20% bonds for maximum growth.",
-                        "🎯 **Retirement Goal**: Save 1x annual salary by age 30, 3x by age 40.",
-                        "💰 **Minimum**: Contribute 15% of income to retirement accounts.",
-                        "🚀 **Power of Starting Early**: $500/month at 25 = $1.2M at 65 (7% return)."
-                    ],
-                    '40s-50s': [
-                        "⏰ **Critical Decade**: 40s-50s are peak earning years - maximize savings.",
-                        "🎯 **Catch-Up**: If behind, you can contribute extra $7,500 to 401(k) after age 50.",
-                        "📊 **Target Allocation**: 60-70% stocks, 30-40% bonds as you approach retirement.",
-                        "💡 **Retirement Calculator**: Need ${target_amount} for ${desired_income}/month in retirement.",
-                        "🏠 **Mortgage**: Consider paying off mortgage before retirement to reduce expenses."
-                    ],
-                    '50s-60s': [
-                        "🎯 **Retirement Ready**: Focus on preservation and guaranteed income.",
-                        "📉 **Risk Reduction**: Shift to 40-50% stocks, 50-60% bonds/fixed income.",
-                        "💰 **Social Security**: Delay claiming until 70 for maximum benefit (8% increase/year).",
-                        "🏥 **Healthcare**: Plan for Medicare gap coverage and long-term care insurance.",
-                        "📊 **Withdrawal Strategy**: Plan 4% safe withdrawal rate from retirement portfolio."
-                    ]
-                }
-            },
-            'country_specific': {
-                'India': [
-                    "🇮🇳 **PPF/EPF**: Maximize Public Provident Fund contributions (tax-free returns).",
-                    "💰 **Tax Saving**: Utilize Section 80C deductions (₹1.5L limit).",
-                    "🏠 **Home Loan**: Take advantage of additional ₹2L deduction under Section 24(b).",
-                    "📊 **ELSS Funds**: Invest in Equity Linked Savings Schemes for tax benefits + growth.",
-                    "🎯 **NPS**: Consider National Pension System for retirement (extra ₹50K deduction)."
-                ],
-                'UAE': [
-                    "🇦🇪 **Tax-Free Advantage**: No income tax - save/invest 40-50% of income.",
-                    "💰 **Offshore Investment**: Set up offshore investment accounts for long-term wealth.",
-                    "🏠 **Property**: Consider Dubai real estate for residency + rental income.",
-                    "📊 **Gratuity Planning**: Factor in end-of-service gratuity in financial planning.",
-                    "🎯 **Repatriation**: Plan for eventual home country return - currency considerations."
-                ],
-                'United States': [
-                    "🇺🇸 **401(k) Match**: Contribute minimum 6% to get full employer match.",
-                    "💰 **Roth IRA**: If eligible, contribute $7,000/year for tax-free growth.",
-                    "📊 **HSA**: Triple tax advantage - contribute $4,150 (individual) or $8,300 (family).",
-                    "🏠 **Mortgage Interest**: Deduct mortgage interest up to $750K loan.",
-                    "🎯 **FIRE Movement**: Financial Independence Retire Early - save 50-70% income."
-                ],
-                'United Kingdom': [
-                    "🇬🇧 **ISA Allowance**: Use full £20,000 ISA allowance for tax-free growth.",
-                    "💰 **Pension Contributions**: Maximize workplace pension with employer match.",
-                    "📊 **Lifetime ISA**: Get 25% government bonus on contributions (up to £4,000/year).",
-                    "🏠 **Help to Buy**: First-time buyers - use government schemes.",
-                    "🎯 **Tax Relief**: Get 20-45% tax relief on pension contributions."
-                ],
-                'Canada': [
-                    "🇨🇦 **RRSP**: Maximize RRSP contributions for tax deduction.",
-                    "💰 **TFSA**: Tax-Free Savings Account - $6,500/year contribution room.",
-                    "📊 **RESP**: If you have children, use RESP for education savings (20% government grant).",
-                    "🏠 **First Home Savings**: New FHSA allows tax-free saving for first home.",
-                    "🎯 **Employer Match**: Contribute enough to get full employer RRSP match."
-                ],
-                'Australia': [
-                    "🇦🇺 **Superannuation**: Salary sacrifice to super for tax savings.",
-                    "💰 **Concessional Contributions**: Contribute up to $27,500/year pre-tax.",
-                    "📊 **First Home Super Saver**: Use super to save for first home deposit.",
-                    "🏠 **Negative Gearing**: If investing in property, understand negative gearing benefits.",
-                    "🎯 **Government Co-contribution**: Earn up to $500 government match on super."
-                ],
-                'Singapore': [
-                    "🇸🇬 **CPF Top-Up**: Maximize CPF Special/Retirement Account contributions.",
-                    "💰 **SRS**: Supplementary Retirement Scheme for tax relief (up to $15,300/year).",
-                    "📊 **CPF Investment Scheme**: Invest excess CPF for better returns.",
-                    "🏠 **HDB Grant**: First-time buyers - utilize CPF Housing Grant.",
-                    "🎯 **Tax Relief**: Utilize all available personal tax reliefs."
-                ]
-            }
-        }
+        They are kept for the last profile, so the three methods called in
+        turn for the same profile evaluate them once.
+        """
+        table = self.rules()
+        inputs = tuple(map(user_features.get, table.inputs))
+        last_table, last_inputs, metrics, skeleton = self._last_profile
+        if last_table is not table or last_inputs != inputs:
+            metrics = table.evaluate(user_features)
+            skeleton = self.skeleton(table, metrics)
+            self._last_profile = (table, inputs, metrics, skeleton)
+        return table, metrics, skeleton
+    
+    @staticmethod
+    def match(rules, metrics):
+        """(priority, position, rule_id, rule) of the `rules` that fire for one profile"""
+        return [(rule['priority'](metrics), rule['position'], rule_id, rule) for rule_id, rule in rules
+                if rule['when'](metrics)]
+    
+    @staticmethod
+    def prepare(matched, group):
+        """(rule_id, prepared output dict, rule) of match() results"""
+        if group != 'recommendations':
+            return tuple((rule_id, rule['static'], rule) for _, _, rule_id, rule in matched)
+        return tuple((rule_id, {'priority': priority, **rule['static']}, rule)
+                     for priority, _, rule_id, rule in matched)
+    
+    def skeleton(self, table, metrics):
+        """
+        Skeleton of one profile from the table's skeleton cache: per group,
+        the match() result of the rules that the bucketed signature
+        determines, and the prepared outputs by outcome of the other rules
+        (filled by fired_rules). The key (table.signature_key) only bisects
+        a few inputs, and one lookup serves all three groups.
+        """
+        key = table.signature_key(metrics)
+        skeleton = table.skeletons.get(key)
+        if skeleton is None:
+            skeleton = {group: (self.match(rules, metrics), {}) for group, rules in table.keyed_rules.items()}
+            table.skeletons.put(key, skeleton)
+        return skeleton
+    
+    def fired_rules(self, table, metrics, skeleton, group):
+        """
+        Rules of `group` that fire for one profile, in output order
+        (recommendations by priority, the rest in table order), as
+        (rule_id, prepared output dict, rule).
+        
+        Only the rules the skeleton does not determine are evaluated; their
+        outcomes (each one's priority if it fires, else None) pick the
+        prepared outputs, which are built once per skeleton and outcome.
+        """
+        matched, variants = skeleton[group]
+        residual = table.residual_rules[group]
+        outcome = tuple([rule['priority'](metrics) if rule['when'](metrics) else None for _, rule in residual])
+        prepared = variants.get(outcome)
+        if prepared is None:
+            fired = matched + [(priority, rule['position'], rule_id, rule)
+                               for (rule_id, rule), priority in zip(residual, outcome) if priority is not None]
+            fired.sort(key=(lambda item: item[:2]) if group == 'recommendations' else (lambda item: item[1]))
+            prepared = variants[outcome] = self.prepare(fired, group)
+        return prepared
+    
+    def cache_info(self):
+        """Hits, misses, hit rate and size of the current rule table's skeleton cache"""
+        return self.rule_table.skeletons.info()
+    
+    @staticmethod
+    def fill_output(output, rule, values, text_values, currency):
+        """
+        Copy of a rule's prepared output dict with its amounts ({name: number})
+        and currency set and its text formatted from `text_values` (the params
+        with amounts already formatted for the currency).
+        """
+        output = {**output, 'amounts': {name: values[index] for name, index, _, _ in rule['amounts']},
+                  'currency': currency}
+        for field, text, slots in rule['formatted']:
+            output[field] = text.format(*[text_values[slot] for slot in slots])
+        return output
+    
+    def fill(self, fired, metrics, currency):
+        """Output dicts of fired_rules(), with each rule's params computed and formatted for one profile"""
+        filled = []
+        for _, output, rule in fired:
+            values = [param(metrics) for param in rule['params'].values()]
+            text_values = list(values)
+            for _, index, decimals, compact in rule['amounts']:
+                text_values[index] = DataUtils.format_currency(values[index], currency, decimals=decimals,
+                                                               compact=compact)
+            filled.append(self.fill_output(output, rule, values, text_values, currency))
+        return filled
     
     def analyze_financial_profile(self, user_features):
         """Comprehensive SWOT analysis"""
@@ -225,310 +762,129 @@ class FinancialRecommendationEngine:
             'threats': []
         }
         
-        # Extract metrics
-        savings_ratio = user_features.get('savings_ratio', 0)
-        dti = user_features.get('debt_to_income_ratio', 0)
-        expense_ratio = user_features.get('expense_ratio', 0)
-        emergency_months = user_features.get('emergency_fund_months', 0)
-        health_score = user_features.get('financial_health_score', 0)
-        discretionary_ratio = user_features.get('discretionary_ratio', 0)
-        investment_ratio = user_features.get('investment_ratio', 0)
-        
-        # Strengths
-        if savings_ratio > 0.20:
-            analysis['strengths'].append(f"💪 Excellent savings rate of {savings_ratio*100:.1f}% (above 20% benchmark)")
-        if dti < 0.20:
-            analysis['strengths'].append(f"✅ Low debt burden - DTI of {dti*100:.1f}% is very healthy")
-        if emergency_months >= 6:
-            analysis['strengths'].append(f"🛡️ Robust emergency fund covering {emergency_months:.1f} months")
-        if health_score >= 75:
-            analysis['strengths'].append(f"🌟 Strong financial health score of {health_score:.0f}/100")
-        if investment_ratio > 0.10:
-            analysis['strengths'].append(f"📈 Good investment activity - {investment_ratio*100:.1f}% of income invested")
-        
-        # Weaknesses
-        if savings_ratio < 0.10:
-            analysis['weaknesses'].append(f"📉 Low savings rate ({savings_ratio*100:.1f}%) - aim for 20%+")
-        if dti > 0.36:
-            analysis['weaknesses'].append(f"⚠️ High debt burden ({dti*100:.1f}% DTI) - reduce to below 36%")
-        if emergency_months < 3:
-            analysis['weaknesses'].append(f"🚨 Insufficient emergency fund ({emergency_months:.1f} months) - need 3-6 months")
-        if discretionary_ratio > 0.15:
-            analysis['weaknesses'].append(f"💸 High discretionary spending ({discretionary_ratio*100:.1f}%) - optimize lifestyle costs")
-        if expense_ratio > 0.75:
-            analysis['weaknesses'].append(f"📊 High expense ratio ({expense_ratio*100:.1f}%) - living paycheck to paycheck")
-        
-        # Opportunities
-        if savings_ratio < 0.15 and expense_ratio < 0.70:
-            analysis['opportunities'].append("💡 Room to increase savings without major lifestyle changes")
-        if dti < 0.30 and investment_ratio < 0.10:
-            analysis['opportunities'].append("📈 Low debt enables higher investment allocation")
-        if discretionary_ratio > 0.10:
-            analysis['opportunities'].append("🎯 Opportunity to redirect discretionary spending to investments")
-        if emergency_months >= 6:
-            analysis['opportunities'].append("🚀 Strong emergency fund - ready for aggressive wealth building")
-        
-        # Threats
-        if emergency_months == 0:
-            analysis['threats'].append("🚨 No emergency fund - vulnerable to unexpected expenses")
-        if dti > 0.43:
-            analysis['threats'].append("⛔ Critical debt level - risk of financial distress")
-        if savings_ratio < 0.05 and dti > 0.30:
-            analysis['threats'].append("❌ Low savings + high debt = financial vulnerability")
-        if expense_ratio > 0.90:
-            analysis['threats'].append("⚠️ Extremely tight budget - no buffer for emergencies")
+        table, metrics, skeleton = self.evaluate_profile(user_features)
+        fired = self.fired_rules(table, metrics, skeleton, 'analysis')
+        for (rule_id, *_), output in zip(fired, self.fill(fired, metrics, profile_currency(user_features))):
+            analysis[table.rules[rule_id]['section']].append(output['text'])
         
         return analysis
     
     def generate_recommendations(self, user_features):
         """Generate advanced AI-powered recommendations"""
-        recommendations = []
-        
-        # Extract all metrics
-        income = user_features.get('total_income', 1)
-        expenses = user_features.get('total_expenses', 0)
-        savings = user_features.get('savings', 0)
-        savings_ratio = user_features.get('savings_ratio', 0)
-        dti = user_features.get('debt_to_income_ratio', 0)
-        emergency_months = user_features.get('emergency_fund_months', 0)
-        discretionary_ratio = user_features.get('discretionary_ratio', 0)
-        investment_ratio = user_features.get('investment_ratio', 0)
-        health_score = user_features.get('financial_health_score', 0)
-        age = user_features.get('age', 30)
-        
-        # Priority 1: Emergency Fund (if critical)
-        if emergency_months < 1:
-            target = expenses * 3
-            monthly_needed = target / 12
-            recommendations.append({
-                'priority': 1,
-                'category': '🆘 Emergency Fund - CRITICAL',
-                'recommendation': self.recommendation_database['emergency_fund']['critical'][0],
-                'action': f"Save ${monthly_needed:.0f}/month for 12 months to build 3-month emergency fund (${target:,.0f})",
-                'impact': '🔴 CRITICAL - Protects against financial catastrophe',
-                'timeline': '12 months',
-                'difficulty': 'High'
-            })
-        elif emergency_months < 3:
-            target = expenses * 6
-            gap = target - (expenses * emergency_months)
-            recommendations.append({
-                'priority': 2,
-                'category': '🛡️ Emergency Fund',
-                'recommendation': self.recommendation_database['emergency_fund']['low'][0],
-                'action': f"Increase emergency fund by ${gap:,.0f} to reach 6-month coverage",
-                'impact': '🟡 HIGH - Essential financial safety net',
-                'timeline': '18 months',
-                'difficulty': 'Medium'
-            })
-        
-        # Priority 2: High Debt
-        if dti > 0.43:
-            reduction_needed = (dti - 0.36) * income
-            recommendations.append({
-                'priority': 1 if emergency_months >= 1 else 2,
-                'category': '💳 Debt Reduction - URGENT',
-                'recommendation': self.recommendation_database['debt_management']['high'][0].format(dti=dti*100),
-                'action': f"Reduce monthly debt payments by ${reduction_needed:.0f} using avalanche method",
-                'impact': '🔴 CRITICAL - Reduce financial stress and interest costs',
-                'timeline': '24-36 months',
-                'difficulty': 'High'
-            })
-        elif dti > 0.36:
-            recommendations.append({
-                'priority': 3,
-                'category': '📉 Debt Optimization',
-                'recommendation': self.recommendation_database['debt_management']['medium'][0].format(dti=dti*100),
-                'action': "Explore refinancing options and balance transfer cards",
-                'impact': '🟡 MEDIUM - Save on interest and improve cash flow',
-                'timeline': '12 months',
-                'difficulty': 'Medium'
-            })
-        
-        # Priority 3: Low Savings Rate
-        if savings_ratio < 0.10:
-            target_savings = income * 0.20
-            increase_needed = target_savings - savings
-            recommendations.append({
-                'priority': 3,
-                'category': '💰 Savings Acceleration',
-                'recommendation': self.recommendation_database['savings_optimization']['poor'][0].format(rate=savings_ratio*100),
-                'action': f"Increase monthly savings by ${increase_needed:.0f} to reach 20% savings rate",
-                'impact': '🟡 HIGH - Build wealth and financial security',
-                'timeline': '6-12 months (gradual increase)',
-                'difficulty': 'Medium'
-            })
-        elif savings_ratio < 0.20:
-            recommendations.append({
-                'priority': 4,
-                'category': '📈 Savings Enhancement',
-                'recommendation': self.recommendation_database['savings_optimization']['moderate'][0].format(rate=savings_ratio*100),
-                'action': "Increase savings rate by 1-2% monthly until reaching 20-25%",
-                'impact': '🟢 MEDIUM - Accelerate wealth building',
-                'timeline': '12 months',
-                'difficulty': 'Low-Medium'
-            })
-        
-        # Priority 4: High Discretionary Spending
-        if discretionary_ratio > 0.15:
-            reduction = income * (discretionary_ratio - 0.10)
-            recommendations.append({
-                'priority': 4,
-                'category': '🎯 Lifestyle Optimization',
-                'recommendation': self.recommendation_database['lifestyle_optimization']['high_discretionary'][0].format(percentage=discretionary_ratio*100),
-                'action': f"Reduce discretionary spending by ${reduction:.0f}/month (audit subscriptions, dining out)",
-                'impact': '🟢 MEDIUM - Redirect to savings/investments',
-                'timeline': '3 months',
-                'difficulty': 'Low'
-            })
-        
-        # Priority 5: Investment Strategy
-        if health_score >= 70 and savings_ratio >= 0.15 and investment_ratio < 0.15:
-            invest_amount = income * 0.15
-            recommendations.append({
-                'priority': 5,
-                'category': '📈 Investment Growth',
-                'recommendation': self.recommendation_database['investment_strategy']['intermediate'][0],
-                'action': f"Start investing ${invest_amount:.0f}/month in diversified index funds",
-                'impact': '🟢 HIGH (Long-term) - Compound growth over time',
-                'timeline': 'Ongoing (long-term)',
-                'difficulty': 'Low'
-            })
-        
-        # Priority 6: Tax Optimization
-        if income > 5000:
-            recommendations.append({
-                'priority': 6,
-                'category': '💼 Tax Strategy',
-                'recommendation': self.recommendation_database['tax_optimization']['strategies'][0].format(
-                    k401_limit='23,000',
-                    ira_limit='7,000'
-                ),
-                'action': "Max out tax-advantaged accounts (401k, IRA, HSA) to reduce taxable income",
-                'impact': '🟢 MEDIUM - Save 20-30% on taxes annually',
-                'timeline': 'This tax year',
-                'difficulty': 'Low'
-            })
-        
-        # Priority 7: Income Growth
-        if savings_ratio < 0.15 and expense_ratio > 0.75:
-            recommendations.append({
-                'priority': 7,
-                'category': '🚀 Income Enhancement',
-                'recommendation': self.recommendation_database['income_growth']['strategies'][0],
-                'action': "Negotiate 10-15% raise or explore job market for 20% income increase",
-                'impact': '🟢 HIGH - More impactful than cutting expenses',
-                'timeline': '6-12 months',
-                'difficulty': 'Medium'
-            })
-        
-        # Priority 8: Retirement Planning
-        age_group = '20s-30s' if age < 40 else '40s-50s' if age < 55 else '50s-60s'
-        retirement_recs = self.recommendation_database['retirement_planning']['age_based'][age_group]
-        
-        recommendations.append({
-            'priority': 8,
-            'category': '🏖️ Retirement Planning',
-            'recommendation': retirement_recs[0],
-            'action': retirement_recs[4] if len(retirement_recs) > 4 else retirement_recs[1],
-            'impact': '🟢 CRITICAL (Long-term) - Secure future',
-            'timeline': 'Long-term',
-            'difficulty': 'Medium'
-        })
-        
-        # Sort by priority
-        recommendations.sort(key=lambda x: x['priority'])
-        
-        return recommendations
+        table, metrics, skeleton = self.evaluate_profile(user_features)
+        # Sorted by priority; amounts in the profile's currency
+        return self.fill(self.fired_rules(table, metrics, skeleton, 'recommendations'), metrics,
+                         profile_currency(user_features))
     
     def generate_ai_insights(self, user_features):
         """Generate AI-powered insights based on pattern analysis"""
-        insights = []
-        
-        savings_ratio = user_features.get('savings_ratio', 0)
-        dti = user_features.get('debt_to_income_ratio', 0)
-        health_score = user_features.get('financial_health_score', 0)
-        emergency_months = user_features.get('emergency_fund_months', 0)
-        income = user_features.get('total_income', 0)
-        investment_ratio = user_features.get('investment_ratio', 0)
-        age = user_features.get('age', 30)
-        
-        # Pattern 1: High earner, low saver
-        if income > 7000 and savings_ratio < 0.15:
-            insights.append({
-                'type': 'warning',
-                'title': '⚠️ Lifestyle Inflation Detected',
-                'message': f'High income (${income:,.0f}) but low savings rate ({savings_ratio*100:.1f}%). Track expenses for 30 days to identify spending leaks.'
-            })
+        table, metrics, skeleton = self.evaluate_profile(user_features)
+        return self.fill(self.fired_rules(table, metrics, skeleton, 'insights'), metrics,
+                         profile_currency(user_features))
+    
+    def generate_batch(self, features, groups=RULE_GROUPS, currency='USD'):
+        """
+        Rules that fire for each row of an engineered feature DataFrame, as a long table.
         
-        # Pattern 2: Good savings but no investments
-        if savings_ratio > 0.20 and investment_ratio < 0.05:
-            insights.append({
-                'type': 'opportunity',
-                'title': '📈 Investment Opportunity Identified',
-                'message': f'Excellent {savings_ratio*100:.1f}% savings rate! Time to put money to work - start with index funds for compound growth.'
-            })
+        The table's metrics and conditions are evaluated once over the whole
+        frame, each rule's condition as one mask, and params are kept for the
+        rows where it holds. Returns one row per fired rule: user_id (the
+        frame's index without a user_id column), rule_id, priority, params (a
+        tuple of numbers in the order of the rule's params; param_dict() names
+        them) and currency (the row's `currency` or `country` column, else
+        `currency`), ordered by user, group and priority. No text is built
+        here; render_batch() formats the rows that need it.
+        """
+        rule_table = self.rules()
+        metrics = rule_table.evaluate(features)
+        currencies = frame_currencies(features, currency)
+        user_ids = features['user_id'].to_numpy() if 'user_id' in features.columns else features.index.to_numpy()
+        n_rows = len(features)
         
-        # Pattern 3: Emergency fund ready for growth
-        if emergency_months >= 6 and dti < 0.30:
-            insights.append({
-                'type': 'success',
-                'title': '🚀 Ready for Aggressive Wealth Building',
-                'message': f'Strong foundation with {emergency_months:.1f} months emergency fund and low debt. Focus on wealth multiplication strategies.'
-            })
+        rows, orders, priorities, params = [], [], [], []
+        for order, (rule_id, rule) in enumerate(rule_table.rules.items()):
+            if rule['group'] not in groups:
+                continue
+            fired = np.flatnonzero(np.broadcast_to(rule['when'](metrics), n_rows))
+            if not len(fired):
+                continue
+            
+            rows.append(fired)
+            orders.append(np.full(len(fired), order))
+            priorities.append(np.broadcast_to(rule['priority'](metrics), n_rows)[fired])
+            columns = [np.broadcast_to(param(metrics), n_rows)[fired].tolist() for param in rule['params'].values()]
+            params.extend(zip(*columns) if columns else [()] * len(fired))
         
-        # Pattern 4: Debt-savings spiral
-        if dti > 0.40 and savings_ratio < 0.10:
-            insights.append({
-                'type': 'critical',
-                'title': '🚨 Critical: Debt-Savings Imbalance',
-                'message': f'DTI {dti*100:.1f}% + {savings_ratio*100:.1f}% savings creates vulnerability. Immediate action required on debt reduction.'
-            })
+        rule_ids = list(rule_table.rules)
+        if not rows:
+            return pd.DataFrame({'user_id': user_ids[:0], 'rule_id': pd.Categorical([], categories=rule_ids),
+                                 'priority': np.array([], dtype=np.int64), 'params': np.array([], dtype=object),
+                                 'currency': pd.Categorical([])})
         
-        # Pattern 5: Retirement readiness
-        expected_multiple = {30: 1, 40: 3, 50: 6, 60: 8}.get((age // 10) * 10, 1)
-        expected_retirement_savings = income * 12 * expected_multiple
-        actual_net_worth = user_features.get('emergency_fund', 0) + user_features.get('investments', 0)
+        rows, orders, priorities = np.concatenate(rows), np.concatenate(orders), np.concatenate(priorities)
+        group_rank = np.array([groups.index(rule['group']) if rule['group'] in groups else -1
+                               for rule in rule_table.rules.values()])
+        by_user = np.lexsort((orders, priorities, group_rank[orders], rows))
+        # fromiter keeps each tuple as one element (array assignment would unpack them)
+        params = np.fromiter(params, dtype=object, count=len(params))
         
-        if actual_net_worth < expected_retirement_savings * 0.5:
-            insights.append({
-                'type': 'warning',
-                'title': '⏰ Retirement Savings Behind Schedule',
-                'message': f'At age {age}, target net worth is ${expected_retirement_savings:,.0f}. Current: ${actual_net_worth:,.0f}. Need to accelerate by ${(expected_retirement_savings - actual_net_worth)/12:.0f}/month.'
-            })
-        elif actual_net_worth >= expected_retirement_savings:
-            insights.append({
-                'type': 'success',
-                'title': '🎯 Retirement On Track or Ahead',
-                'message': f'Excellent! Your net worth (${actual_net_worth:,.0f}) meets or exceeds age {age} target (${expected_retirement_savings:,.0f}).'
-            })
+        return pd.DataFrame({
+            'user_id': user_ids[rows[by_user]],
+            'rule_id': pd.Categorical.from_codes(orders[by_user], categories=rule_ids),
+            'priority': priorities[by_user],
+            'params': params[by_user],
+            'currency': pd.Categorical(currencies[rows[by_user]])
+        })
+    
+    def param_dict(self, rule_id, values):
+        """Params of a generate_batch() row as {name: value}"""
+        return dict(zip(self.rule_table.rules[rule_id]['params'], values))
+    
+    def render_batch(self, table):
+        """
+        Output dicts (as the single-profile methods return them, without
+        priority) for each row of a generate_batch() table.
         
-        # Pattern 6: Young high saver
-        if age < 35 and savings_ratio > 0.30:
-            years_to_retirement = 65 - age
-            potential_wealth = (income * savings_ratio * 12) * ((1.07 ** years_to_retirement - 1) / 0.07)
-            insights.append({
-                'type': 'success',
-                'title': '⚡ Compound Interest Superpower Activated',
-                'message': f'At {age} with {savings_ratio*100:.0f}% savings rate, you could accumulate ${potential_wealth/1000000:.1f}M by retirement (7% annual return)!'
-            })
+        Rows are rendered rule by rule and column by column: each amount param
+        is formatted for all of the rule's rows in one
+        DataUtils.format_currency_batch call, each text field in one pass, and
+        the columns are then zipped into one dict per row.
+        """
+        rendered = np.empty(len(table), dtype=object)
+        codes = table['rule_id'].cat.codes.to_numpy()
+        params = table['params'].to_numpy()
+        currencies = table['currency'].to_numpy(dtype=object)
         
-        # Pattern 7: High expense ratio
-        expense_ratio = user_features.get('expense_ratio', 0)
-        if expense_ratio > 0.85:
-            potential_monthly_savings = income * (expense_ratio - 0.70)
-            insights.append({
-                'type': 'warning',
-                'title': '💸 Expense Ratio Critical',
-                'message': f'{expense_ratio*100:.0f}% expense ratio leaves no buffer. Reducing to 70% would free up ${potential_monthly_savings:,.0f}/month.'
-            })
+        for code in np.unique(codes):
+            rule = self.rule_table.rules[table['rule_id'].cat.categories[code]]
+            rows = np.flatnonzero(codes == code)
+            row_currencies = currencies[rows]
+            columns = [list(column) for column in zip(*params[rows])]
+            text_columns = list(columns)
+            for _, index, decimals, compact in rule['amounts']:
+                text_columns[index] = DataUtils.format_currency_batch(columns[index], row_currencies,
+                                                                      decimals, compact).tolist()
+            
+            fields = [field for field, _, _ in rule['formatted']] + ['amounts', 'currency']
+            output_columns = [[text.format(*args) for args in zip(*[text_columns[slot] for slot in slots])]
+                              for _, text, slots in rule['formatted']]
+            names = [name for name, _, _, _ in rule['amounts']]
+            output_columns.append([dict(zip(names, amounts))
+                                   for amounts in zip(*[columns[index] for _, index, _, _ in rule['amounts']])]
+                                  if names else [{} for _ in rows])
+            output_columns.append(row_currencies.tolist())
+            
+            static = rule['static']
+            outputs = [{**static, **dict(zip(fields, values))} for values in zip(*output_columns)]
+            for row, output in zip(rows.tolist(), outputs):
+                rendered[row] = output
         
-        return insights
+        return pd.Series(rendered, index=table.index, dtype=object)
     
     def get_country_specific_recommendations(self, country):
         """Get country-specific financial recommendations"""
         if country in self.recommendation_database['country_specific']:
-            return self.recommendation_database['country_specific'][country]
+            return list(self.recommendation_database['country_specific'][country])
         return []
 
 
@@ -0,0 +1,209 @@
+"""
+Model Registry
+Versioned, content-addressed bundles of the training artifacts, promoted by an atomic CURRENT pointer
+
+Usage: python -m src.registry list|current|promote VERSION|prune [--keep 5]
+"""
+
+import argparse
+import json
+import shutil
+from pathlib import Path
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import config
+from src.checkpoint import hash_file, hash_params
+
+# Artifacts (files or directories) that make up one model version
+BUNDLE_ARTIFACTS = [
+    config.RISK_MODEL_PATH, config.HEALTH_MODEL_PATH, config.FORECAST_MODEL_PATH,
+    config.RISK_BOOSTER_PATH, config.HEALTH_BOOSTER_PATH, config.FORECAST_ARRAYS_DIR,
+    config.SCALER_PATH, config.SCORER_DIR, config.METRICS_PATH
+]
+BUNDLE_MANIFEST = 'bundle.json'
+# Shown per version by `list`
+SUMMARY_METRICS = [('risk_classifier', 'accuracy'), ('health_predictor', 'r2_score'), ('expense_forecaster', 'mae')]
+
+
+def artifact_path(path, model_dir=None):
+    """Where `path` (one of config's MODEL_DIR artifacts) lives in `model_dir`; unchanged for None"""
+    if model_dir is None:
+        return Path(path)
+    return Path(model_dir) / Path(path).relative_to(config.MODEL_DIR)
+
+
+def bundle_dir(version):
+    """Directory of a published version"""
+    return config.REGISTRY_DIR / version
+
+
+def current_version():
+    """Promoted version, or None before the first promotion"""
+    try:
+        return config.CURRENT_VERSION_PATH.read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_bundle():
+    """
+    (version, model_dir) to serve from, read from one CURRENT lookup.
+    
+    Bundles are never modified after publishing, so everything loaded from
+    model_dir belongs to the same training run even if another version is
+    promoted meanwhile. Before the first promotion this is (None, MODEL_DIR).
+    """
+    version = current_version()
+    if version is None:
+        return None, config.MODEL_DIR
+    return version, bundle_dir(version)
+
+
+def bundle_files(source_dir):
+    """Relative paths of every file in a bundle's artifacts under `source_dir`"""
+    files = []
+    for artifact in BUNDLE_ARTIFACTS:
+        path = artifact_path(artifact, source_dir)
+        if path.is_dir():
+            files.extend(sorted(child.relative_to(source_dir) for child in path.rglob('*') if child.is_file()))
+        elif path.exists():
+            files.append(path.relative_to(source_dir))
+        else:
+            raise FileNotFoundError(f"Missing model artifact {path}; train the models first")
+    return files
+
+
+def stable_metrics(path):
+    """Contents of a metrics file without the wall-clock timings, which differ between identical runs"""
+    with open(path) as f:
+        saved = json.load(f)
+    saved.pop('timings', None)
+    for results in saved.get('cross_validation', {}).values():
+        results.pop('fold_timings', None)
+    return saved
+
+
+def publish(source_dir=config.MODEL_DIR, promote_version=True):
+    """
+    Copy the artifacts in `source_dir` into an immutable bundle; returns its version.
+    
+    The version is a hash of the artifacts' contents (the metrics without
+    their timings), so publishing unchanged artifacts again, or those of an
+    identical retrain, reuses the existing bundle. The bundle is assembled in
+    a staging directory and renamed into place, so readers never see a
+    partial one.
+    """
+    source_dir = Path(source_dir)
+    files = {str(path): hash_file(source_dir / path) for path in bundle_files(source_dir)}
+    metrics_file = str(artifact_path(config.METRICS_PATH, source_dir).relative_to(source_dir))
+    version = hash_params({**files, metrics_file: hash_params(stable_metrics(source_dir / metrics_file))})[:16]
+    target = bundle_dir(version)
+    
+    if not target.exists():
+        staging = config.REGISTRY_DIR / f'.staging-{version}-{os.getpid()}'
+        shutil.rmtree(staging, ignore_errors=True)
+        for path in files:
+            (staging / path).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source_dir / path, staging / path)
+        
+        with open(artifact_path(config.METRICS_PATH, source_dir)) as f:
+            metrics = json.load(f)['metrics']
+        with open(artifact_path(config.SCORER_DIR, source_dir) / 'manifest.json') as f:
+            feature_names = json.load(f)['feature_names']
+        with open(staging / BUNDLE_MANIFEST, 'w') as f:
+            json.dump({
+                'version': version,
+                'created_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+                'feature_names': feature_names,
+                # Scalar metrics only; the full report is in the bundle's metrics file
+                'metrics': {name: {key: value for key, value in model_metrics.items()
+                                   if isinstance(value, (int, float))}
+                            for name, model_metrics in metrics.items()},
+                'files': files
+            }, f, indent=2)
+        
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Published concurrently with identical content
+            shutil.rmtree(staging, ignore_errors=True)
+    print(f"📦 Published model version {version}")
+    
+    if promote_version:
+        promote(version)
+    return version
+
+
+def promote(version):
+    """Point CURRENT at a published version (one atomic rename)"""
+    if not (bundle_dir(version) / BUNDLE_MANIFEST).exists():
+        raise ValueError(f"Unknown model version: {version}")
+    
+    tmp_path = config.CURRENT_VERSION_PATH.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, config.CURRENT_VERSION_PATH)
+    print(f"🚀 Promoted model version {version}")
+
+
+def list_versions():
+    """Manifests of all published versions, oldest first"""
+    manifests = []
+    for path in config.REGISTRY_DIR.glob(f'*/{BUNDLE_MANIFEST}'):
+        if not path.parent.name.startswith('.'):
+            with open(path) as f:
+                manifests.append(json.load(f))
+    return sorted(manifests, key=lambda manifest: manifest['created_at'])
+
+
+def prune(keep=5):
+    """Delete all but the newest `keep` versions, never the current one"""
+    current = current_version()
+    manifests = list_versions()
+    removed = []
+    for manifest in manifests[:max(len(manifests) - keep, 0)]:
+        if manifest['version'] != current:
+            shutil.rmtree(bundle_dir(manifest['version']))
+            removed.append(manifest['version'])
+    return removed
+
+
+def main(argv=None):
+    """List, inspect, promote (or roll back to) and prune model versions"""
+    parser = argparse.ArgumentParser(description="FinSight model versions")
+    subparsers = parser.add_subparsers(dest='action', required=True)
+    subparsers.add_parser('list', help="published versions, oldest first (* = current)")
+    subparsers.add_parser('current', help="print the promoted version")
+    promote_parser = subparsers.add_parser('promote', help="serve VERSION (also used to roll back)")
+    promote_parser.add_argument('version')
+    prune_parser = subparsers.add_parser('prune', help="delete old versions")
+    prune_parser.add_argument('--keep', type=int, default=5)
+    args = parser.parse_args(argv)
+    
+    if args.action == 'list':
+        current = current_version()
+        for manifest in list_versions():
+            marker = '*' if manifest['version'] == current else ' '
+            summary = ', '.join(f"{name}.{key}={manifest['metrics'][name][key]:.4f}" for name, key in SUMMARY_METRICS
+                                if key in manifest['metrics'].get(name, {}))
+            print(f"{marker} {manifest['version']}  {manifest['created_at']}  {summary}")
+    elif args.action == 'current':
+        print(current_version() or "No promoted version (serving the unversioned files in models/)")
+    elif args.action == 'promote':
+        try:
+            promote(args.version)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+    else:
+        for version in prune(args.keep):
+            print(f"🗑️  Removed model version {version}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""
+Compact Dtype Schema
+Downcasts financial records to the dtypes declared in config.COLUMN_DTYPES
+"""
+
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import config
+
+
+def resolve_dtype(column, dtype=None):
+    """Concrete pandas dtype for a column (categoricals get fixed levels)"""
+    dtype = dtype or config.COLUMN_DTYPES[column]
+    if dtype == 'category' and column in config.CATEGORY_LEVELS:
+        return pd.CategoricalDtype(config.CATEGORY_LEVELS[column], ordered=(column == 'risk_category'))
+    return dtype
+
+
+def apply_dtype_schema(df, columns=None, schema=config.COLUMN_DTYPES):
+    """
+    Cast the schema columns present in `df` to their compact dtypes, in place.
+
+    Categoricals use fixed levels so independently built chunks stay
+    concatenable and share one Parquet schema.
+    """
+    columns = schema.keys() if columns is None else columns
+
+    for col in columns:
+        if col in df.columns and col in schema:
+            dtype = resolve_dtype(col, schema[col])
+            if df[col].dtype != dtype:
+                df[col] = df[col].astype(dtype)
+
+    return df
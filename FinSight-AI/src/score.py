@@ -0,0 +1,153 @@
+"""
+Batch Scoring
+Streams profiles through feature engineering, preprocessing and all three models
+
+Usage: python -m src.score INPUT OUTPUT [--chunk-size 100000] [--workers 4] [--model-version VERSION]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import config
+from src.feature_engineer import FinancialFeatureEngineer
+from src.preprocessor import FinancialDataPreprocessor
+from src.model_trainer import FinancialModelTrainer
+from src.registry import artifact_path, bundle_dir, current_bundle
+from src.schema import resolve_dtype
+from src.storage import get_storage
+
+# Probability column per risk label, e.g. 'Medium Risk' -> 'prob_medium_risk'
+PROBABILITY_COLUMNS = ['prob_' + label.lower().replace(' ', '_') for label in config.RISK_LABELS]
+
+# Scorer of the current worker process, loaded once by the pool initializer
+_WORKER_SCORER = None
+
+
+class BatchScorer:
+    """Scores DataFrames of raw profiles with the saved preprocessor and models"""
+    
+    def __init__(self, n_jobs=None, model_dir=None):
+        if model_dir is None:
+            version, model_dir = current_bundle()
+            print(f"🏷️  Model version: {version or 'unversioned'}")
+        self.model_dir = model_dir
+        self.feature_engineer = FinancialFeatureEngineer()
+        self.preprocessor = FinancialDataPreprocessor()
+        self.preprocessor.load_preprocessor(artifact_path(config.SCALER_PATH, model_dir))
+        
+        trainer = FinancialModelTrainer()
+        trainer.load_models(model_dir=model_dir)
+        self.models = trainer.models
+        if n_jobs:
+            for model in self.models.values():
+                model.set_params(n_jobs=n_jobs)
+    
+    def model_input(self, X, model_name):
+        """Columns a model was trained on (all features for artifacts without per-model views)"""
+        if model_name in self.preprocessor.model_features:
+            return self.preprocessor.model_view(X, model_name)
+        return X
+    
+    def score_frame(self, df):
+        """
+        Predictions for every row of `df` (modified in place).
+        
+        Returns user_id (when present), the predicted risk category and its
+        class probabilities, the predicted health score and forecast expenses.
+        """
+        df = self.feature_engineer.compute_features(df, inplace=True)
+        X = self.preprocessor.transform_features(df)
+        
+        risk_proba = self.models['risk_classifier'].predict_proba(self.model_input(X, 'risk_classifier'))
+        health_score = self.models['health_predictor'].predict(self.model_input(X, 'health_predictor'))
+        expenses = self.models['expense_forecaster'].predict(self.model_input(X, 'expense_forecaster'))
+        
+        scores = pd.DataFrame(index=df.index)
+        if 'user_id' in df.columns:
+            scores['user_id'] = df['user_id']
+        scores['predicted_risk_category'] = pd.Categorical.from_codes(
+            risk_proba.argmax(axis=1), dtype=resolve_dtype('risk_category')
+        )
+        for column, proba in zip(PROBABILITY_COLUMNS, risk_proba.T):
+            scores[column] = proba.astype(np.float32)
+        scores['predicted_health_score'] = np.clip(health_score, 0, 100).astype(np.float32)
+        scores['forecasted_expenses'] = np.clip(expenses, 0, None).astype(np.float32)
+        
+        return scores.reset_index(drop=True)
+    
+    def score_chunks(self, chunks, num_workers=1):
+        """
+        Score an iterable of DataFrames, yielding results in input order.
+        
+        With num_workers > 1 chunks are scored across a process pool whose
+        workers each load the artifacts once and split the cores between
+        them (from this scorer's model version); at most 2 * num_workers
+        chunks are in flight.
+        """
+        if num_workers == 1:
+            for chunk in chunks:
+                yield self.score_frame(chunk)
+            return
+        
+        threads = max(1, (os.cpu_count() or 1) // num_workers)
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                 initargs=(threads, self.model_dir)) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_score_chunk, chunk))
+                if len(pending) >= 2 * num_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+    
+    def score_file(self, input_path, output_path, chunk_size=config.CHUNK_SIZE, num_workers=1):
+        """Stream `input_path` through the models into `output_path` (format from each suffix)"""
+        print(f"🔮 Scoring {input_path} ({chunk_size:,} rows per chunk, {num_workers} workers)...")
+        
+        start = time.perf_counter()
+        chunks = get_storage(input_path).iter_chunks(input_path, chunk_size)
+        total_rows = get_storage(output_path).write_chunks(self.score_chunks(chunks, num_workers), output_path)
+        elapsed = time.perf_counter() - start
+        
+        print(f"✅ Scored {total_rows:,} profiles in {elapsed:.2f}s "
+              f"({total_rows / elapsed:,.0f} rows/sec) -> {output_path}")
+        return total_rows, elapsed
+
+
+def _init_worker(n_jobs, model_dir):
+    """Process-pool initializer: load the artifacts once per worker"""
+    global _WORKER_SCORER
+    with contextlib.redirect_stdout(io.StringIO()):
+        _WORKER_SCORER = BatchScorer(n_jobs=n_jobs, model_dir=model_dir)
+
+
+def _score_chunk(chunk):
+    """Score one chunk in a worker process"""
+    return _WORKER_SCORER.score_frame(chunk)
+
+
+def main(argv=None):
+    """Command-line entry point; returns the process exit code"""
+    parser = argparse.ArgumentParser(description="Score financial profiles with the trained FinSight models")
+    parser.add_argument('input', help="CSV or Parquet file of profiles (raw columns, as in data/raw)")
+    parser.add_argument('output', help="CSV or Parquet file for the predictions")
+    parser.add_argument('--chunk-size', type=int, default=config.CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=1, help="scoring processes (0 = all cores)")
+    parser.add_argument('--model-version', help="published model version to use (default: the promoted one)")
+    args = parser.parse_args(argv)
+    
+    model_dir = bundle_dir(args.model_version) if args.model_version else None
+    BatchScorer(model_dir=model_dir).score_file(args.input, args.output, args.chunk_size, args.workers or os.cpu_count() or 1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
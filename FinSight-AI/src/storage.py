@@ -0,0 +1,134 @@
+"""
+Dataset Storage Layer
+Pluggable readers/writers for raw and processed datasets (Parquet or CSV)
+"""
+
+import pandas as pd
+from pathlib import Path
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import config
+from src.schema import apply_dtype_schema
+
+
+class CSVStorage:
+    """Plain-text CSV backend, kept for exports and interoperability"""
+
+    suffix = '.csv'
+
+    def write(self, df, filepath):
+        """Write a DataFrame to CSV"""
+        df.to_csv(filepath, index=False)
+
+    def write_chunks(self, chunks, filepath):
+        """Stream DataFrame chunks to one CSV file"""
+        total_rows = 0
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(filepath, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+            total_rows += len(chunk)
+        return total_rows
+
+    def read(self, filepath, columns=None):
+        """Read a CSV file, optionally only some columns"""
+        return apply_dtype_schema(pd.read_csv(filepath, usecols=columns))
+
+    def iter_chunks(self, filepath, chunk_size=config.CHUNK_SIZE, columns=None):
+        """Yield the file as DataFrames of at most `chunk_size` rows"""
+        for chunk in pd.read_csv(filepath, usecols=columns, chunksize=chunk_size):
+            yield apply_dtype_schema(chunk)
+
+    def read_dtypes(self, filepath, sample_rows=1000):
+        """Column dtypes, inferred from the first rows"""
+        return apply_dtype_schema(pd.read_csv(filepath, nrows=sample_rows)).dtypes
+
+
+class ParquetStorage:
+    """Compressed columnar backend with column projection and memory-mapped reads"""
+
+    suffix = '.parquet'
+
+    def __init__(self, compression=config.PARQUET_COMPRESSION, memory_map=True):
+        self.compression = compression
+        self.memory_map = memory_map
+
+    def write(self, df, filepath):
+        """Write a DataFrame to Parquet"""
+        df.to_parquet(filepath, index=False, compression=self.compression)
+
+    def write_chunks(self, chunks, filepath):
+        """Stream DataFrame chunks to one Parquet file, one row group per chunk"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        total_rows = 0
+        try:
+            for chunk in chunks:
+                if writer is None:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    writer = pq.ParquetWriter(filepath, table.schema, compression=self.compression)
+                else:
+                    table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                writer.write_table(table)
+                total_rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return total_rows
+
+    def read(self, filepath, columns=None):
+        """Read a Parquet file, loading only the requested columns"""
+        return pd.read_parquet(filepath, columns=columns, memory_map=self.memory_map)
+
+    def iter_chunks(self, filepath, chunk_size=config.CHUNK_SIZE, columns=None):
+        """Yield the file as DataFrames of at most `chunk_size` rows"""
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(filepath, memory_map=self.memory_map)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+
+    def read_dtypes(self, filepath):
+        """Column dtypes, read from the file footer without loading any data"""
+        import pyarrow.parquet as pq
+
+        schema = pq.read_schema(filepath, memory_map=self.memory_map)
+        return schema.empty_table().to_pandas().dtypes
+
+
+STORAGE_BACKENDS = {
+    'csv': CSVStorage,
+    'parquet': ParquetStorage
+}
+
+
+def get_storage(filepath=None, data_format=None):
+    """Pick a backend from an explicit format, the file suffix, or config.DATA_FORMAT"""
+    if data_format is None and filepath is not None:
+        data_format = Path(filepath).suffix.lstrip('.').lower() or None
+    data_format = data_format or config.DATA_FORMAT
+
+    if data_format not in STORAGE_BACKENDS:
+        raise ValueError(f"Unsupported data format '{data_format}'. "
+                         f"Choose one of: {', '.join(STORAGE_BACKENDS)}")
+    return STORAGE_BACKENDS[data_format]()
+
+
+def save_dataframe(df, filepath, data_format=None):
+    """Save a DataFrame with the backend matching its path"""
+    get_storage(filepath, data_format).write(df, filepath)
+
+
+def load_dataframe(filepath, columns=None, data_format=None):
+    """Load a dataset, optionally projecting to `columns`"""
+    return get_storage(filepath, data_format).read(filepath, columns=columns)
+
+
+def export_csv(filepath, csv_path=None, chunk_size=config.CHUNK_SIZE):
+    """Export any stored dataset to CSV, streaming chunk by chunk"""
+    csv_path = csv_path or Path(filepath).with_suffix(CSVStorage.suffix)
+    chunks = get_storage(filepath).iter_chunks(filepath, chunk_size=chunk_size)
+    total_rows = CSVStorage().write_chunks(chunks, csv_path)
+    print(f"📤 Exported {total_rows} records to {csv_path}")
+    return csv_path
@@ -0,0 +1,298 @@
+"""
+Tree Arrays
+Fitted tree ensembles flattened into NumPy node arrays, stored as .npy files that load memory-mapped
+
+Usage: python -m src.tree_arrays pack|unpack   (compressed shipping archive of the expense forecaster)
+"""
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import config
+
+
+def iteration_range(model):
+    """Boosting rounds used by the sklearn wrapper's predict (all of them unless early-stopped)"""
+    try:
+        return 0, model.best_iteration + 1
+    except AttributeError:
+        return 0, 0
+
+
+def xgboost_trees(model, columns, first_slot=0):
+    """
+    (left, right, feature, threshold, value, slot) per tree of a fitted XGBoost model.
+    
+    XGBoost goes left when x < split; for a float32 x that is the same as
+    x <= the next float32 below split, so thresholds are shifted down one
+    step to share scikit-learn's test.
+    """
+    booster = json.loads(model.get_booster().save_raw('json'))['learner']['gradient_booster']['model']
+    n_trees = booster['iteration_indptr'][iteration_range(model)[1] or -1]
+    for tree, group in zip(booster['trees'][:n_trees], booster['tree_info']):
+        split = np.array(tree['split_conditions'], dtype=np.float32)
+        yield (np.array(tree['left_children']), np.array(tree['right_children']),
+               columns[tree['split_indices']], np.nextafter(split, np.float32(-np.inf)),
+               split.astype(np.float64), first_slot + group)
+
+
+def sklearn_trees(forest, columns=None, slot=0):
+    """
+    (left, right, feature, threshold, value, slot) per tree of a fitted RandomForestRegressor.
+    
+    The float64 thresholds are rounded down to float32: for a float32 x,
+    x <= t holds exactly when x <= the largest float32 not above t.
+    """
+    if columns is None:
+        columns = np.arange(forest.n_features_in_)
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        threshold = tree.threshold.astype(np.float32)
+        threshold = np.where(threshold > tree.threshold, np.nextafter(threshold, np.float32(-np.inf)), threshold)
+        yield (tree.children_left, tree.children_right, columns[np.maximum(tree.feature, 0)],
+               threshold, tree.value[:, 0, 0], slot)
+
+
+def tree_depth(left, right):
+    """Number of splits on the longest root-to-leaf path"""
+    depth = 0
+    nodes = np.array([0])
+    while True:
+        nodes = nodes[left[nodes] != -1]
+        if not len(nodes):
+            return depth
+        nodes = np.concatenate([left[nodes], right[nodes]])
+        depth += 1
+
+
+def array_filename(name, array):
+    """<name>.<content hash>.npy: identical arrays keep their file name, changed ones get a new file"""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(f'{array.dtype.str}{array.shape}'.encode())
+    digest.update(array.data)
+    return f'{name}.{digest.hexdigest()[:16]}.npy'
+
+
+def save_arrays(directory, arrays, manifest):
+    """
+    Write each array as a new <name>.<hash>.npy, then `manifest` as manifest.json (atomically, last).
+    
+    Nothing is written over a file in place: each array goes to a temporary
+    file renamed into place, and the manifest names the files of its own
+    save. Readers that memory-mapped the previous arrays keep their (now
+    unlinked) files, and a reader that opens the manifest gets the arrays
+    it lists, never a mix of two saves. Files no longer listed are removed.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    files = {}
+    for name, array in arrays.items():
+        files[name] = array_filename(name, array)
+        tmp_path = directory / f'.{files[name]}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, directory / files[name])
+    
+    tmp_path = directory / 'manifest.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({**manifest, 'arrays': files}, f, indent=2)
+    os.replace(tmp_path, directory / 'manifest.json')
+    
+    for path in directory.glob('*.npy'):
+        if path.name not in files.values():
+            path.unlink(missing_ok=True)
+
+
+def load_arrays(directory):
+    """(arrays, manifest) written by save_arrays(); arrays are memory-mapped read-only"""
+    directory = Path(directory)
+    with open(directory / 'manifest.json') as f:
+        manifest = json.load(f)
+    files = manifest['arrays']
+    if isinstance(files, list):
+        files = {name: f'{name}.npy' for name in files}  # Written before file names carried a hash
+    # Plain ndarray views: np.memmap's subclass hooks slow down fancy indexing
+    arrays = {name: np.asarray(np.load(directory / filename, mmap_mode='r')) for name, filename in files.items()}
+    return arrays, manifest
+
+
+def pack(directory, archive):
+    """Compress a save_arrays() directory into one .npz archive for shipping"""
+    arrays, manifest = load_arrays(directory)
+    np.savez_compressed(archive, manifest=np.array(json.dumps(manifest)), **arrays)
+    print(f"📦 Packed {directory} -> {archive} ({os.path.getsize(archive) / 1e6:.1f} MB)")
+
+
+def unpack(archive, directory):
+    """Restore the memory-mappable .npy layout from a pack() archive"""
+    with np.load(archive) as packed:
+        manifest = json.loads(str(packed['manifest']))
+        save_arrays(directory, {name: packed[name] for name in manifest.pop('arrays')}, manifest)
+    print(f"📦 Unpacked {archive} -> {directory}")
+
+
+def unpack_if_newer(archive, directory):
+    """
+    unpack() when `archive` is newer than the directory's arrays (or they are
+    missing). Writes into `directory`, so it is for writers such as train.py;
+    readers only map the arrays.
+    """
+    archive, manifest_path = Path(archive), Path(directory) / 'manifest.json'
+    if archive.exists() and (not manifest_path.exists()
+                             or archive.stat().st_mtime > manifest_path.stat().st_mtime):
+        unpack(archive, directory)
+        return True
+    return False
+
+
+class TreeArrays:
+    """
+    Trees concatenated into flat node arrays, deepest trees first.
+    
+    Leaves point back to themselves, so a tree can be stepped past its
+    depth without checking whether it has finished; active[d] counts the
+    trees still descending at step d, and only that prefix is stepped.
+    Each tree adds its leaf value to one output slot.
+    """
+    
+    ARRAYS = ['children', 'feature', 'threshold', 'value', 'roots', 'slots']
+    
+    def __init__(self, trees):
+        depths = [tree_depth(tree[0], tree[1]) for tree in trees]
+        order = np.argsort(depths, kind='stable')[::-1]
+        trees = [trees[i] for i in order]
+        depths = np.array(depths)[order]
+        self.active = [int((depths > step).sum()) for step in range(depths.max())]
+        
+        offsets = np.cumsum([0] + [len(tree[0]) for tree in trees])
+        children = np.empty((offsets[-1], 2), dtype=np.intp)
+        self.feature = np.empty(offsets[-1], dtype=np.intp)
+        self.threshold = np.empty(offsets[-1], dtype=np.float32)
+        self.value = np.empty(offsets[-1], dtype=np.float64)
+        
+        for (left, right, feature, threshold, value, _), offset in zip(trees, offsets):
+            nodes = slice(offset, offset + len(left))
+            ids = np.arange(len(left)) + offset
+            is_leaf = left == -1
+            children[nodes, 0] = np.where(is_leaf, ids, left + offset)
+            children[nodes, 1] = np.where(is_leaf, ids, right + offset)
+            self.feature[nodes] = np.where(is_leaf, 0, feature)
+            self.threshold[nodes] = np.where(is_leaf, np.inf, threshold)
+            self.value[nodes] = value
+        
+        self.children = children.ravel()
+        self.roots = offsets[:-1]
+        self.slots = np.array([tree[5] for tree in trees])
+        self.n_slots = int(self.slots.max()) + 1
+    
+    def state(self):
+        """(arrays, manifest entries) for save_arrays()"""
+        return {name: getattr(self, name) for name in self.ARRAYS}, {'active': self.active, 'n_slots': self.n_slots}
+    
+    @classmethod
+    def from_state(cls, arrays, manifest):
+        """TreeArrays from state() output, e.g. as returned by load_arrays()"""
+        trees = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(trees, name, arrays[name])
+        trees.active = manifest['active']
+        trees.n_slots = manifest['n_slots']
+        return trees
+    
+    def sums(self, x):
+        """Sum of leaf values per output slot for one float32 feature vector"""
+        nodes = self.roots.copy()
+        for n_active in self.active:
+            current = nodes[:n_active]
+            # Same test as scikit-learn: left if x[feature] <= threshold
+            go_right = x[self.feature[current]] > self.threshold[current]
+            nodes[:n_active] = self.children[2 * current + go_right]
+        return np.bincount(self.slots, weights=self.value[nodes], minlength=self.n_slots)
+    
+    def batch_sums(self, X, block_size=2048):
+        """Sums per output slot for each row of a float32 matrix, shape (rows, n_slots)"""
+        slot_matrix = np.eye(self.n_slots)[self.slots].T
+        sums = np.empty((len(X), self.n_slots))
+        for start in range(0, len(X), block_size):
+            block = X[start:start + block_size]
+            rows = np.arange(len(block))
+            nodes = np.repeat(self.roots[:, None], len(block), axis=1)
+            for n_active in self.active:
+                current = nodes[:n_active]
+                go_right = block[rows, self.feature[current]] > self.threshold[current]
+                nodes[:n_active] = self.children[2 * current + go_right]
+            sums[start:start + len(block)] = (slot_matrix @ self.value[nodes]).T
+        return sums
+
+
+class CompiledForestRegressor:
+    """
+    Drop-in predict() for a fitted RandomForestRegressor, backed by TreeArrays.
+    
+    load() memory-maps the node arrays, so every process serving the same
+    files shares one copy through the page cache instead of unpickling a
+    private forest. Predictions equal scikit-learn's up to float summation
+    order; on large batches it is a few times slower, so batch scoring keeps
+    the pickle.
+    """
+    
+    def __init__(self, trees, n_estimators, feature_names_in=None):
+        self.trees = trees
+        self.n_estimators = n_estimators
+        self.feature_names_in_ = feature_names_in
+    
+    @classmethod
+    def from_forest(cls, forest):
+        """Compile a fitted RandomForestRegressor"""
+        feature_names = getattr(forest, 'feature_names_in_', None)
+        return cls(TreeArrays(list(sklearn_trees(forest))), len(forest.estimators_),
+                   None if feature_names is None else list(feature_names))
+    
+    def predict(self, X):
+        """Mean tree prediction per row (DataFrames are reordered to the training columns)"""
+        if self.feature_names_in_ is not None and hasattr(X, 'columns'):
+            X = X[self.feature_names_in_]
+        X = np.asarray(X, dtype=np.float32)
+        return self.trees.batch_sums(X)[:, 0] / self.n_estimators
+    
+    def save(self, directory=config.FORECAST_ARRAYS_DIR):
+        """Write the memory-mappable .npy layout"""
+        arrays, manifest = self.trees.state()
+        save_arrays(directory, arrays, {
+            **manifest, 'n_estimators': self.n_estimators, 'feature_names_in': self.feature_names_in_
+        })
+    
+    @classmethod
+    def load(cls, directory=config.FORECAST_ARRAYS_DIR):
+        """Memory-mapped forecaster; only reads `directory` (train.py or the unpack CLI restores an archive)"""
+        directory = Path(directory)
+        if not (directory / 'manifest.json').exists():
+            raise FileNotFoundError(f"No forecaster arrays in {directory}: run train.py "
+                                    f"or python -m src.tree_arrays unpack")
+        
+        arrays, manifest = load_arrays(directory)
+        return cls(TreeArrays.from_state(arrays, manifest), manifest['n_estimators'], manifest['feature_names_in'])
+
+
+def main(argv=None):
+    """Pack the expense forecaster's arrays into a compressed archive, or unpack one"""
+    parser = argparse.ArgumentParser(description="Compressed shipping archive of the expense forecaster")
+    parser.add_argument('action', choices=['pack', 'unpack'])
+    parser.add_argument('--directory', default=config.FORECAST_ARRAYS_DIR)
+    parser.add_argument('--archive', default=config.FORECAST_ARCHIVE_PATH)
+    args = parser.parse_args(argv)
+    
+    if args.action == 'pack':
+        pack(args.directory, args.archive)
+    else:
+        unpack(args.archive, args.directory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
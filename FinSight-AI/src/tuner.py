@@ -0,0 +1,314 @@
+"""
+Hyperparameter Tuning
+Successive-halving search with early stopping for the XGBoost models
+
+Usage: python -m src.tuner [--models risk_classifier health_predictor] [--time-budget 600]
+"""
+
+import argparse
+import json
+import math
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from xgboost import XGBClassifier, XGBRegressor
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+import config
+
+# Models with a tunable search space; fixed_params match FinancialModelTrainer
+TUNABLE_MODELS = {
+    'risk_classifier': {
+        'estimator': XGBClassifier,
+        'base_params': config.RISK_CLASSIFIER_PARAMS,
+        'fixed_params': {'objective': 'multi:softmax', 'num_class': 3, 'eval_metric': 'mlogloss'},
+        'search_space': config.RISK_CLASSIFIER_SEARCH_SPACE
+    },
+    'health_predictor': {
+        'estimator': XGBRegressor,
+        'base_params': config.HEALTH_PREDICTOR_PARAMS,
+        'fixed_params': {'objective': 'reg:squarederror', 'eval_metric': 'rmse'},
+        'search_space': config.HEALTH_PREDICTOR_SEARCH_SPACE
+    }
+}
+
+RISK_MAPPING = {label: code for code, label in enumerate(config.RISK_LABELS)}
+
+# (X_fit, y_fit, X_valid, y_valid) per model, set once per worker process
+_WORKER_DATA = {}
+
+
+def load_tuned_params(model_name=None, filepath=config.TUNED_PARAMS_PATH):
+    """Best parameters saved by the tuner ({} if none); all models when model_name is None"""
+    try:
+        with open(filepath) as f:
+            tuned = json.load(f)
+    except (OSError, ValueError):
+        tuned = {}
+    
+    if model_name is None:
+        return {name: result['params'] for name, result in tuned.items()}
+    return tuned.get(model_name, {}).get('params', {})
+
+
+def sample_params(search_space, rng):
+    """Draw one configuration from a search space (see config.*_SEARCH_SPACE)"""
+    params = {}
+    for name, values in search_space.items():
+        if isinstance(values, tuple):
+            low, high = values[:2]
+            if values[2:] == ('log',):
+                params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            else:
+                params[name] = float(rng.uniform(low, high))
+        else:
+            params[name] = values[rng.randint(len(values))]
+    return params
+
+
+def _init_worker(model_name, data):
+    """Process-pool initializer: receive the training split once, not per trial"""
+    _WORKER_DATA[model_name] = data
+
+
+def _run_trial(model_name, trial_id, params, rounds, n_jobs):
+    """Fit one configuration for up to `rounds` boosting rounds with early stopping"""
+    spec = TUNABLE_MODELS[model_name]
+    X_fit, y_fit, X_valid, y_valid = _WORKER_DATA[model_name]
+    
+    model = spec['estimator'](**{
+        **spec['base_params'],
+        **params,
+        **spec['fixed_params'],
+        'n_estimators': rounds,
+        'early_stopping_rounds': config.EARLY_STOPPING_ROUNDS,
+        'n_jobs': n_jobs
+    })
+    
+    start = time.perf_counter()
+    model.fit(X_fit, y_fit, eval_set=[(X_valid, y_valid)], verbose=False)
+    
+    return {
+        'trial': trial_id,
+        'params': params,
+        'rounds': rounds,
+        'best_iteration': int(model.best_iteration),
+        'score': float(model.best_score),
+        'wall_time': time.perf_counter() - start
+    }
+
+
+class HyperparameterTuner:
+    """Successive-halving search over the XGBoost models' hyperparameters"""
+    
+    def __init__(self, n_candidates=config.TUNING_CANDIDATES, halving_factor=config.TUNING_HALVING_FACTOR,
+                 min_rounds=config.TUNING_MIN_ROUNDS, max_rounds=config.TUNING_MAX_ROUNDS,
+                 time_budget=config.TUNING_TIME_BUDGET, n_workers=None, random_state=config.RANDOM_STATE):
+        self.n_candidates = n_candidates
+        self.halving_factor = halving_factor
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.time_budget = time_budget
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.rng = np.random.RandomState(random_state)
+        self.results = {}
+        self.history = {}
+    
+    @staticmethod
+    def validation_split(model_name, X_train, y_train):
+        """Hold out 20% of the training rows for early stopping; the test set stays untouched"""
+        if model_name == 'risk_classifier':
+            y_train = y_train.map(RISK_MAPPING).astype(int)
+        stratify = y_train if model_name == 'risk_classifier' else None
+        
+        X_fit, X_valid, y_fit, y_valid = train_test_split(
+            X_train, y_train, test_size=0.2, random_state=config.RANDOM_STATE, stratify=stratify
+        )
+        return X_fit, y_fit, X_valid, y_valid
+    
+    def run_rung(self, model_name, trials, rounds, deadline, executor, n_jobs):
+        """
+        Evaluate `trials` ([(trial_id, params)]) at `rounds`.
+        
+        At most n_workers trials are in flight; once the deadline passes no
+        new trial is started, so the returned list may be shorter than `trials`.
+        """
+        pending = deque(trials)
+        completed = []
+        
+        if executor is None:
+            while pending and time.perf_counter() < deadline:
+                completed.append(_run_trial(model_name, *pending.popleft(), rounds, n_jobs))
+            return completed
+        
+        in_flight = set()
+        while pending or in_flight:
+            while pending and len(in_flight) < self.n_workers and time.perf_counter() < deadline:
+                in_flight.add(executor.submit(_run_trial, model_name, *pending.popleft(), rounds, n_jobs))
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            completed.extend(future.result() for future in done)
+        
+        return completed
+    
+    def successive_halving(self, model_name, data, deadline):
+        """
+        Tune one model.
+        
+        Every candidate starts with min_rounds boosting rounds; each rung keeps
+        the best 1/halving_factor and multiplies their rounds by the same
+        factor. A trial that early-stopped before its round limit would not
+        change with more rounds, so it is promoted without refitting.
+        """
+        spec = TUNABLE_MODELS[model_name]
+        candidates = [sample_params(spec['search_space'], self.rng) for _ in range(self.n_candidates)]
+        survivors = list(enumerate(candidates))
+        
+        n_workers = min(self.n_workers, len(candidates))
+        n_jobs = max(1, (os.cpu_count() or 1) // n_workers)
+        executor = None
+        if n_workers > 1:
+            executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                           initargs=(model_name, data))
+        else:
+            _init_worker(model_name, data)
+        
+        history = []
+        latest = {}
+        rung_results = []
+        rounds = self.min_rounds
+        rung = 0
+        try:
+            while survivors:
+                reused = [latest[trial_id] for trial_id, _ in survivors
+                          if trial_id in latest and latest[trial_id]['best_iteration']
+                          + config.EARLY_STOPPING_ROUNDS < latest[trial_id]['rounds']]
+                reused_ids = {result['trial'] for result in reused}
+                to_fit = [trial for trial in survivors if trial[0] not in reused_ids]
+                
+                fitted = self.run_rung(model_name, to_fit, rounds, deadline, executor, n_jobs)
+                for result in fitted:
+                    result['rung'] = rung
+                    latest[result['trial']] = result
+                history.extend(fitted)
+                
+                if not fitted and not reused:
+                    print("  ⏱️  Time budget spent, stopping search")
+                    break
+                rung_results = fitted + reused
+                print(f"  • rung {rung}: {len(fitted)} fitted at {rounds} rounds, {len(reused)} reused "
+                      f"| best {TUNABLE_MODELS[model_name]['fixed_params']['eval_metric']} "
+                      f"{min(r['score'] for r in rung_results):.4f}")
+                
+                if len(fitted) < len(to_fit):
+                    print("  ⏱️  Time budget spent, stopping search")
+                    break
+                if len(survivors) == 1 or rounds >= self.max_rounds:
+                    break
+                
+                keep = max(1, math.ceil(len(survivors) / self.halving_factor))
+                ranked = sorted(rung_results, key=lambda r: r['score'])[:keep]
+                survivors = [(r['trial'], r['params']) for r in ranked]
+                rounds = min(rounds * self.halving_factor, self.max_rounds)
+                rung += 1
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        if not rung_results:
+            raise RuntimeError(f"No trial for {model_name} finished within the time budget")
+        
+        best = min(rung_results, key=lambda r: r['score'])
+        return {
+            'params': {**best['params'], 'n_estimators': best['best_iteration'] + 1},
+            'score': best['score'],
+            'metric': spec['fixed_params']['eval_metric'],
+            'trials': len(history),
+            'tuned_at': pd.Timestamp.now().isoformat(timespec='seconds')
+        }, history
+    
+    def tune(self, datasets, model_names=None):
+        """
+        Tune each model in `datasets` ({model_name: (X_train, y_train, X_test, y_test)}).
+        
+        The time budget is shared by all models; each one gets an equal share
+        of what remains when its search starts.
+        """
+        model_names = [name for name in (model_names or TUNABLE_MODELS) if name in datasets]
+        start = time.perf_counter()
+        
+        for position, model_name in enumerate(model_names):
+            remaining = self.time_budget - (time.perf_counter() - start)
+            deadline = time.perf_counter() + remaining / (len(model_names) - position)
+            
+            print(f"\n🔎 Tuning {model_name} ({self.n_candidates} candidates, {self.n_workers} workers)...")
+            X_train, y_train = datasets[model_name][:2]
+            data = self.validation_split(model_name, X_train, y_train)
+            self.results[model_name], self.history[model_name] = self.successive_halving(model_name, data, deadline)
+            
+            result = self.results[model_name]
+            print(f"  ✓ Best {result['metric']}: {result['score']:.4f} "
+                  f"after {result['trials']} trials | {result['params']}")
+        
+        print(f"\n⏱️  Tuning finished in {time.perf_counter() - start:.1f}s")
+        return self.results
+    
+    def save_results(self, params_path=config.TUNED_PARAMS_PATH, history_path=config.TUNING_HISTORY_PATH):
+        """Merge best configs into params_path and append this run's trials to history_path"""
+        try:
+            with open(params_path) as f:
+                tuned = json.load(f)
+        except (OSError, ValueError):
+            tuned = {}
+        tuned.update(self.results)
+        with open(params_path, 'w') as f:
+            json.dump(tuned, f, indent=2)
+        
+        try:
+            with open(history_path) as f:
+                history = json.load(f)
+        except (OSError, ValueError):
+            history = []
+        history.append({
+            'run_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+            'trials': self.history
+        })
+        with open(history_path, 'w') as f:
+            json.dump(history, f, indent=2)
+        
+        print(f"💾 Tuned parameters saved to {params_path}")
+
+
+def main(argv=None):
+    """Tune on the processed dataset's training split and save the results"""
+    from src.preprocessor import FinancialDataPreprocessor
+    
+    parser = argparse.ArgumentParser(description="FinSight AI hyperparameter search")
+    parser.add_argument('--models', nargs='+', choices=list(TUNABLE_MODELS), default=list(TUNABLE_MODELS))
+    parser.add_argument('--time-budget', type=float, default=config.TUNING_TIME_BUDGET,
+                        help="seconds shared by all models")
+    parser.add_argument('--candidates', type=int, default=config.TUNING_CANDIDATES)
+    parser.add_argument('--workers', type=int, default=None, help="parallel trials (default: all cores)")
+    args = parser.parse_args(argv)
+    
+    config.ensure_directories()
+    preprocessor = FinancialDataPreprocessor()
+    X, targets = preprocessor.shared_preprocessing_pipeline(
+        preprocessor.read_feature_frame(config.PROCESSED_DATA_PATH, config.MODEL_TARGETS.values()),
+        target_cols=config.MODEL_TARGETS.values(), inplace=True
+    )
+    datasets = preprocessor.split_model_datasets(X, targets)
+    
+    tuner = HyperparameterTuner(n_candidates=args.candidates, time_budget=args.time_budget, n_workers=args.workers)
+    tuner.tune(datasets, args.models)
+    tuner.save_results()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,28 +4,25 @@ Helper functions for visualization, formatting, and common operations
 FINAL CORRECTED VERSION
 """
 
+import functools
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime, timedelta
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 import config
 
-sns.set_style("whitegrid")
-
 # ==================== VISUALIZATION UTILITIES ====================
 
 class VisualizationUtils:
-    """Visualization utilities for financial data"""
+    """Visualization utilities for financial data (plotly is imported on first use: it is slow to load)"""
     
     @staticmethod
     def create_gauge_chart(value, title, min_val=0, max_val=100):
         """Create gauge chart for financial health score"""
+        import plotly.graph_objects as go
+        
         if value >= 75:
             color = 'green'
         elif value >= 50:
@@ -70,6 +67,8 @@ class VisualizationUtils:
     @staticmethod
     def create_financial_breakdown_chart(user_data):
         """Create pie chart of expense breakdown"""
+        import plotly.express as px
+        
         expense_categories = {
             'Rent': user_data.get('rent', 0),
             'Groceries': user_data.get('groceries', 0),
@@ -112,6 +111,8 @@ class VisualizationUtils:
     @staticmethod
     def create_forecast_chart(historical_data, forecast_data, metric_name):
         """Create forecast visualization with confidence intervals"""
+        import plotly.graph_objects as go
+        
         fig = go.Figure()
         
         fig.add_trace(go.Scatter(
@@ -187,26 +188,86 @@ class VisualizationUtils:
 class DataUtils:
     """Data manipulation utilities with multi-currency support"""
     
+    # Compact notation for currencies without scaled tiers of their own (INR uses lakh/crore)
+    COMPACT_TIERS = [(1000000000, 'B'), (1000000, 'M'), (1000, 'K')]
+    
     @staticmethod
-    def format_currency(amount, currency='USD', country=None):
+    @functools.lru_cache(maxsize=None)
+    def currency_tiers(currency, decimals=None, compact=False):
+        """
+        How format_currency writes amounts in `currency`: (minimum, divisor,
+        format function, rounding) tiers, largest first, with the symbol built
+        in; the last tier (minimum None) takes every other amount. `rounding`
+        is the (divisor, digits) the tier below shows amounts with, see
+        reaches_tier. Built once per currency and options.
+        
+        `decimals` overrides the decimals of unscaled amounts; `compact`
+        writes large amounts as 3.8M (or in lakh/crore for INR).
+        """
+        symbol = config.CURRENCIES[currency]['symbol'] if currency in config.CURRENCIES else '$'
+        if currency == 'INR':
+            tiers = [(10000000, 10000000, 2, ' Cr'), (100000, 100000, 2, ' L')]
+        elif compact:
+            tiers = [(minimum, minimum, 1, suffix) for minimum, suffix in DataUtils.COMPACT_TIERS]
+        else:
+            tiers = []
+        base_decimals = 0 if currency == 'JPY' else 2
+        tiers.append((None, 1, base_decimals if decimals is None else decimals, ''))
+        
+        built = []
+        for index, (minimum, divisor, digits, suffix) in enumerate(tiers):
+            spec = f"{',' if minimum is None else ''}.{digits}f"
+            rounding = tiers[index + 1][1:3] if minimum is not None else None
+            built.append((minimum, divisor, f"{symbol}{{:{spec}}}{suffix}".format, rounding))
+        return tuple(built)
+    
+    @staticmethod
+    def reaches_tier(amount, minimum, rounding):
+        """
+        Whether `amount` is written in the tier starting at `minimum`: also
+        when the tier below would round it up to `minimum`, so 999,950 is
+        $1.0M rather than $1000.0K
+        """
+        if minimum is None or amount >= minimum:
+            return True
+        divisor, digits = rounding
+        return round(amount / divisor, digits) >= minimum / divisor
+    
+    @staticmethod
+    def format_currency(amount, currency='USD', country=None, decimals=None, compact=False):
         """Format number as currency based on country/currency"""
-        if currency in config.CURRENCIES:
-            symbol = config.CURRENCIES[currency]['symbol']
-            
-            if currency == 'INR':
-                if amount >= 10000000:
-                    return f"{symbol}{amount/10000000:.2f} Cr"
-                elif amount >= 100000:
-                    return f"{symbol}{amount/100000:.2f} L"
+        for minimum, divisor, template, rounding in DataUtils.currency_tiers(currency, decimals, compact):
+            if DataUtils.reaches_tier(amount, minimum, rounding):
+                return template(amount / divisor)
+    
+    @staticmethod
+    def format_currency_batch(amounts, currencies='USD', decimals=None, compact=False):
+        """
+        format_currency for a whole array of amounts; `currencies` is one code
+        or one per amount. Each currency's tiers are resolved once and selected
+        with NumPy masks, so only the final string formatting is per amount.
+        Returns an object array of strings.
+        """
+        amounts = np.asarray(amounts, dtype=float)
+        currencies = np.broadcast_to(np.asarray(currencies, dtype=object), amounts.shape)
+        formatted = np.empty(amounts.shape, dtype=object)
+        
+        for currency in pd.unique(currencies.ravel()):
+            remaining = currencies == currency
+            for minimum, divisor, template, rounding in DataUtils.currency_tiers(currency, decimals, compact):
+                if minimum is None:
+                    rows = remaining
                 else:
-                    return f"{symbol}{amount:,.2f}"
-            
-            elif currency == 'JPY':
-                return f"{symbol}{amount:,.0f}"
-            
-            return f"{symbol}{amount:,.2f}"
-        
-        return f"${amount:,.2f}"
+                    rows = remaining & (amounts >= minimum)
+                    # Only amounts within one rounding step below `minimum` can round up into the tier
+                    below_divisor, below_digits = rounding
+                    near = remaining & ~rows & (amounts >= minimum - below_divisor * 10.0 ** -below_digits)
+                    rows[near] = [DataUtils.reaches_tier(amount, minimum, rounding)
+                                  for amount in amounts[near].tolist()]
+                formatted[rows] = [template(amount) for amount in (amounts[rows] / divisor).tolist()]
+                remaining = remaining & ~rows
+        
+        return formatted
     
     @staticmethod
     def convert_currency(amount, from_currency, to_currency):
@@ -263,7 +324,7 @@ class DataUtils:
             num_months: Number of months to generate
             trend: Monthly growth rate
             seasonality: Seasonal variation amplitude
-            
+        
         Returns:
             DataFrame with 'date' and 'value' columns
         """
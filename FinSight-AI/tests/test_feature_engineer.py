@@ -0,0 +1,54 @@
+"""
+Tests: incremental feature engineering
+"""
+
+import contextlib
+import io
+import pandas as pd
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from src.data_generator import FinancialDataGenerator
+from src.feature_engineer import FinancialFeatureEngineer, FINGERPRINT_COLUMN
+
+
+@pytest.fixture(scope='module')
+def raw_df():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return FinancialDataGenerator(200).generate_complete_dataset()
+
+
+def engineer_full(engineer, raw_df):
+    """Processed data as a full (non-incremental) train.py run writes it"""
+    df = engineer.engineer_all_features(raw_df)
+    df[FINGERPRINT_COLUMN] = engineer.fingerprint_rows(raw_df)
+    return df
+
+
+def test_incremental_with_empty_processed_data_engineers_everything(raw_df):
+    # An interrupted earlier run can leave a processed file with the columns but no rows
+    engineer = FinancialFeatureEngineer()
+    expected = engineer_full(engineer, raw_df)
+    empty = expected.iloc[:0]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = engineer.engineer_incremental(raw_df, empty)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_incremental_recomputes_rows_after_a_settings_change(raw_df, monkeypatch):
+    engineer = FinancialFeatureEngineer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        stored = engineer_full(engineer, raw_df)
+
+    monkeypatch.setitem(config.RISK_SCORE_CUTOFFS, 'Low Risk', config.RISK_SCORE_CUTOFFS['Low Risk'] - 1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = engineer_full(engineer, raw_df)
+        result = engineer.engineer_incremental(raw_df, stored)
+
+    assert (expected['risk_category'] != stored['risk_category']).any()
+    pd.testing.assert_frame_equal(result, expected)
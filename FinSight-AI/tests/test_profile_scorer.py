@@ -0,0 +1,61 @@
+"""
+Tests: FastProfileScorer
+One scorer is shared by every Streamlit session, so concurrent predictions must not interfere
+"""
+
+import contextlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from src.data_generator import FinancialDataGenerator
+from src.feature_engineer import FinancialFeatureEngineer, FEATURE_REGISTRY, METADATA_COLUMNS
+from src.preprocessor import FinancialDataPreprocessor
+from src.model_trainer import FinancialModelTrainer
+from src.profile_scorer import FastProfileScorer
+
+
+@pytest.fixture(scope='module')
+def scorer_and_profiles():
+    """Scorer compiled from models trained in memory on a small dataset, and raw profile dicts"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = FinancialDataGenerator(600).generate_complete_dataset()
+        engineered = FinancialFeatureEngineer().engineer_all_features(df)
+        preprocessor = FinancialDataPreprocessor()
+        X, targets = preprocessor.shared_preprocessing_pipeline(engineered, target_cols=config.MODEL_TARGETS.values())
+        trainer = FinancialModelTrainer()
+        trainer.train_all_models(preprocessor.split_model_datasets(X, targets), parallel=False)
+
+    raw = df.drop(columns=[col for col in df.columns if col in FEATURE_REGISTRY or col in METADATA_COLUMNS])
+    profiles = [{name: value.item() if isinstance(value, np.generic) else value for name, value in row.items()}
+                for row in raw.head(200).astype(object).to_dict('records')]
+    return FastProfileScorer(preprocessor, trainer.models), profiles
+
+
+def test_concurrent_predict_matches_single_threaded(scorer_and_profiles):
+    scorer, profiles = scorer_and_profiles
+    expected = [scorer.predict(profile) for profile in profiles]
+
+    def score_all(_):
+        return [scorer.predict(profile) for profile in profiles for _ in range(5)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(score_all, range(8)))
+
+    repeated = [prediction for prediction in expected for _ in range(5)]
+    for result in results:
+        assert result == repeated
+
+
+def test_transform_returns_a_new_vector(scorer_and_profiles):
+    scorer, profiles = scorer_and_profiles
+    features = scorer.feature_engineer.compute_profile_features(profiles[0], scorer.features)
+    first = scorer.transform(features)
+    second = scorer.transform(features)
+    assert first is not second
+    np.testing.assert_array_equal(first, second)
@@ -0,0 +1,53 @@
+"""
+Tests: recommendation skeleton cache
+The cache key buckets a few inputs at the rule table's cut points, so cached rules must match evaluating every rule
+"""
+
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.recommender import FinancialRecommendationEngine, RULE_GROUPS
+
+
+def evaluate_all_rules(table, metrics, group):
+    """(rule_id, priority) of every rule of `group` that fires, in output order, without the cache"""
+    fired = [(rule_id, rule['priority'](metrics)) for rule_id, rule in table.group_rules[group]
+             if rule['when'](metrics)]
+    if group == 'recommendations':
+        fired.sort(key=lambda item: item[1])
+    return fired
+
+
+def profiles_at_cut_points(table, n_profiles, seed=0):
+    """Profiles whose signature inputs sit on, just beside or between the table's cut points"""
+    rng = np.random.default_rng(seed)
+    cuts = dict(table.signature)
+    profiles = []
+    for _ in range(n_profiles):
+        profile = {name: type(default)(rng.uniform(0, 2) * (default or 1)) for name, default in table.inputs.items()}
+        profile['total_income'] = float(rng.uniform(1000, 10000))
+        profile['emergency_fund'] = float(rng.uniform(0, 100000))
+        for name, points in cuts.items():
+            point = points[rng.integers(len(points))]
+            profile[name] = type(table.inputs[name])(point + rng.choice([0, 0, -1e-9, 1e-9, rng.uniform(-0.1, 0.1)]))
+        profiles.append(profile)
+    return profiles
+
+
+def test_cached_rules_match_evaluating_every_rule():
+    engine = FinancialRecommendationEngine()
+    table = engine.rules()
+    assert table.signature
+
+    for profile in profiles_at_cut_points(table, 3000):
+        table, metrics, skeleton = engine.evaluate_profile(profile)
+        for group in RULE_GROUPS:
+            fired = [(rule_id, rule['priority'](metrics))
+                     for rule_id, _, rule in engine.fired_rules(table, metrics, skeleton, group)]
+            assert fired == evaluate_all_rules(table, metrics, group)
+
+    info = engine.cache_info()
+    assert info['hits'] > 0 and info['misses'] > 0
+    assert info['size'] <= info['maxsize']
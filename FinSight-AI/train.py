@@ -3,46 +3,137 @@ Main Training Pipeline
 Orchestrates complete model training workflow
 """
 
+import argparse
+import os
 import sys
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 
 from src.data_generator import FinancialDataGenerator
-from src.feature_engineer import FinancialFeatureEngineer
+from src.feature_engineer import FinancialFeatureEngineer, FINGERPRINT_COLUMN, feature_settings
 from src.preprocessor import FinancialDataPreprocessor
 from src.model_trainer import FinancialModelTrainer
+from src.profile_scorer import FastProfileScorer
+from src.storage import get_storage, load_dataframe, save_dataframe
+from src.checkpoint import PipelineCheckpoint
+from src.registry import publish, bundle_dir, BUNDLE_MANIFEST
+from src.tuner import load_tuned_params, TUNABLE_MODELS
+from src.tree_arrays import unpack_if_newer
 import config
 
 class FinSightTrainingPipeline:
     """Complete end-to-end training pipeline"""
     
-    def __init__(self):
-        self.data_generator = FinancialDataGenerator()
+    # Files the train stage writes, published together as one registry version
+    MODEL_ARTIFACTS = [config.RISK_MODEL_PATH, config.HEALTH_MODEL_PATH, config.FORECAST_MODEL_PATH,
+                       config.RISK_BOOSTER_PATH, config.HEALTH_BOOSTER_PATH,
+                       config.FORECAST_ARRAYS_DIR / 'manifest.json', config.SCALER_PATH,
+                       config.SCORER_DIR / 'manifest.json', config.METRICS_PATH]
+    
+    # Checkpointed stages: the files each one reads and writes, and the steps it runs.
+    # The raw data is an input, never restored: it may hold real records appended since the last run.
+    STAGES = {
+        'features': {
+            'inputs': [config.RAW_DATA_PATH],
+            'outputs': [config.PROCESSED_DATA_PATH],
+            'steps': ['step2_feature_engineering']
+        },
+        'train': {
+            'inputs': [config.PROCESSED_DATA_PATH],
+            'outputs': MODEL_ARTIFACTS,
+            'steps': ['step3_train_models', 'step4_save_artifacts']
+        },
+        'publish': {
+            'inputs': MODEL_ARTIFACTS,
+            'outputs': [],  # The new version's manifest, known once it is published (stage_outputs)
+            'steps': ['publish_models']
+        }
+    }
+    
+    def __init__(self, inplace=False, incremental=False, parallel_training=config.PARALLEL_TRAINING,
+                 headless=False, force=False, large_data=False, external_memory=False, cv_folds=None,
+                 promote=True, regenerate=False, num_samples=config.NUM_SAMPLES, workers=None, chunk_size=None):
+        self.inplace = inplace
+        self.incremental = incremental
+        self.parallel_training = parallel_training
+        self.headless = headless
+        self.force = force
+        self.large_data = large_data
+        self.external_memory = external_memory
+        self.cv_folds = cv_folds
+        self.promote = promote
+        self.regenerate = regenerate
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.checkpoint = PipelineCheckpoint()
+        self.data_generator = FinancialDataGenerator(num_samples)
         self.feature_engineer = FinancialFeatureEngineer()
         self.preprocessor = FinancialDataPreprocessor()
         self.model_trainer = FinancialModelTrainer()
         
         self.raw_data = None
         self.engineered_data = None
+        self.published_version = None
         
+    def load_raw_data(self):
+        """Raw data from the last run, read from disk if step 1 was skipped"""
+        if self.raw_data is None:
+            self.raw_data = load_dataframe(config.RAW_DATA_PATH)
+        return self.raw_data
+    
+    def load_engineered_data(self):
+        """Engineered data from step 2, or only the model columns read from disk if step 2 was skipped"""
+        if self.engineered_data is None:
+            return self.preprocessor.read_feature_frame(config.PROCESSED_DATA_PATH, config.MODEL_TARGETS.values())
+        return self.engineered_data
+    
+    def stage_params(self, stage):
+        """Settings that determine a stage's output besides its input files"""
+        if stage == 'publish':
+            return {'promote': self.promote}
+        if stage == 'features':
+            return feature_settings()
+        return {
+            'risk_classifier': config.RISK_CLASSIFIER_PARAMS,
+            'health_predictor': config.HEALTH_PREDICTOR_PARAMS,
+            'targets': config.MODEL_TARGETS,
+            'excluded_features': config.MODEL_EXCLUDED_FEATURES,
+            'tuned_params': load_tuned_params(),
+            'large_data': self.large_data,
+            'external_memory': self.external_memory,
+            'cv_folds': self.cv_folds,
+            'random_state': config.RANDOM_STATE
+        }
+    
     def step1_generate_data(self):
         """Step 1: Generate synthetic financial data"""
         print("\n" + "="*70)
         print("STEP 1: DATA GENERATION")
         print("="*70)
         
-        if config.RAW_DATA_PATH.exists():
+        # Existing data is kept unless --regenerate was given or the user asks for it
+        if config.RAW_DATA_PATH.exists() and not self.regenerate:
+            if self.headless:
+                print(f"Using existing raw data ({config.RAW_DATA_PATH.name}); pass --regenerate to replace it")
+                return
             user_input = input("Raw data already exists. Regenerate? (y/n): ")
             if user_input.lower() != 'y':
                 print("Loading existing data...")
-                self.raw_data = pd.read_csv(config.RAW_DATA_PATH)
+                self.raw_data = load_dataframe(config.RAW_DATA_PATH)
                 print(f"✅ Loaded {len(self.raw_data)} records")
                 return
         
+        if self.workers is not None or self.chunk_size is not None:
+            # Chunks are generated across processes and streamed to disk; step 2 reads the file
+            chunks = self.data_generator.generate_chunks_parallel(self.chunk_size or config.CHUNK_SIZE, self.workers)
+            self.data_generator.save_chunks(chunks)
+            self.raw_data = None
+            return
+        
         self.raw_data = self.data_generator.generate_complete_dataset()
         self.data_generator.save_data(self.raw_data)
         
@@ -55,8 +146,15 @@ class FinSightTrainingPipeline:
         print("STEP 2: FEATURE ENGINEERING")
         print("="*70)
         
-        self.engineered_data = self.feature_engineer.engineer_all_features(self.raw_data)
-        self.engineered_data.to_csv(config.PROCESSED_DATA_PATH, index=False)
+        raw_data = self.load_raw_data()
+        if self.incremental and config.PROCESSED_DATA_PATH.exists():
+            processed_data = load_dataframe(config.PROCESSED_DATA_PATH)
+            self.engineered_data = self.feature_engineer.engineer_incremental(raw_data, processed_data)
+        else:
+            # In-place mode appends the derived columns to raw_data itself
+            self.engineered_data = self.feature_engineer.engineer_all_features(raw_data, inplace=self.inplace)
+            self.engineered_data[FINGERPRINT_COLUMN] = self.feature_engineer.fingerprint_rows(raw_data)
+        save_dataframe(self.engineered_data, config.PROCESSED_DATA_PATH)
         
         print("\n📊 Sample Engineered Features:")
         feature_cols = ['savings_ratio', 'debt_to_income_ratio', 'financial_health_score', 'risk_category']
@@ -71,82 +169,123 @@ class FinSightTrainingPipeline:
         print("STEP 3: MODEL TRAINING")
         print("="*70)
         
-        # Model 1: Risk Classification
-        print("\n" + "-"*70)
-        print("Training Model 1: Risk Classifier")
-        print("-"*70)
-        
-        X_risk, y_risk, _ = self.preprocessor.full_preprocessing_pipeline(
-            self.engineered_data.copy(),
-            target_col='risk_category',
-            fit=True
-        )
-        
-        if 'risk_score' in X_risk.columns:
-            X_risk = X_risk.drop('risk_score', axis=1)
-        
-        X_train_risk, X_test_risk, y_train_risk, y_test_risk = train_test_split(
-            X_risk, y_risk, test_size=0.2, random_state=config.RANDOM_STATE, stratify=y_risk
-        )
-        
-        risk_model, risk_accuracy = self.model_trainer.train_risk_classifier(
-            X_train_risk, y_train_risk, X_test_risk, y_test_risk
-        )
-        
-        print("\n🔍 Top 10 Features for Risk Prediction:")
-        importance = self.model_trainer.metrics['risk_classifier']['feature_importance'].head(10)
-        print(importance.to_string(index=False))
-        
-        # Model 2: Financial Health Score
-        print("\n" + "-"*70)
-        print("Training Model 2: Financial Health Predictor")
-        print("-"*70)
-        
-        preprocessor_health = FinancialDataPreprocessor()
-        
-        X_health, y_health, _ = preprocessor_health.full_preprocessing_pipeline(
-            self.engineered_data.copy(),
-            target_col='financial_health_score',
-            fit=True
-        )
-        
-        X_train_health, X_test_health, y_train_health, y_test_health = train_test_split(
-            X_health, y_health, test_size=0.2, random_state=config.RANDOM_STATE
-        )
-        
-        health_model, health_mae = self.model_trainer.train_health_predictor(
-            X_train_health, y_train_health, X_test_health, y_test_health
-        )
-        
-        print("\n🔍 Top 10 Features for Health Score:")
-        importance = self.model_trainer.metrics['health_predictor']['feature_importance'].head(10)
-        print(importance.to_string(index=False))
-        
-        # Model 3: Expense Forecasting
-        print("\n" + "-"*70)
-        print("Training Model 3: Expense Forecaster")
-        print("-"*70)
-        
-        preprocessor_expense = FinancialDataPreprocessor()
+        if self.external_memory:
+            self.train_external_memory()
+        else:
+            engineered_data = self.load_engineered_data()
+            large_data = self.large_data or len(engineered_data) >= config.LARGE_DATA_ROWS
+            
+            # One preprocessing pass shared by all three models; in large-data mode the
+            # XGBoost models also share columns so one quantised matrix serves both
+            X, targets = self.preprocessor.shared_preprocessing_pipeline(
+                engineered_data,
+                target_cols=config.MODEL_TARGETS.values(),
+                inplace=self.inplace,
+                shared_models=list(TUNABLE_MODELS) if large_data else None
+            )
+            
+            datasets = self.preprocessor.split_model_datasets(X, targets)
+            
+            if large_data:
+                self.model_trainer.train_all_models_large(datasets)
+            else:
+                # Models are independent: train them concurrently within the core budget
+                self.model_trainer.train_all_models(datasets, parallel=self.parallel_training)
+            
+            if self.cv_folds:
+                # One split's metrics are noisy: also report mean ± std over k folds
+                self.model_trainer.cross_validate(X, targets, self.preprocessor.model_features,
+                                                  n_splits=self.cv_folds)
+        
+        titles = {
+            'risk_classifier': 'Risk Prediction',
+            'health_predictor': 'Health Score',
+            'expense_forecaster': 'Expense Prediction'
+        }
+        for model_name, title in titles.items():
+            print(f"\n🔍 Top 10 Features for {title}:")
+            importance = self.model_trainer.metrics[model_name]['feature_importance'].head(10)
+            print(importance.to_string(index=False))
+        
+    def train_external_memory(self, chunk_size=config.CHUNK_SIZE, test_size=0.2):
+        """
+        Train from the processed file without loading it into memory.
         
-        X_expense, y_expense, _ = preprocessor_expense.full_preprocessing_pipeline(
-            self.engineered_data.copy(),
-            target_col='total_expenses',
-            fit=True
-        )
+        The preprocessor is fitted chunk by chunk; XGBoost then iterates the
+        preprocessed chunks into quantised pages on disk, shared by the risk and
+        health models. The random forest has no out-of-core fit and trains on a
+        sample of at most config.EXTERNAL_MEMORY_RF_ROWS rows.
+        """
+        # The report falls back to the checkpointed dataset summary
+        self.engineered_data = None
         
-        X_train_expense, X_test_expense, y_train_expense, y_test_expense = train_test_split(
-            X_expense, y_expense, test_size=0.2, random_state=config.RANDOM_STATE
+        filepath = config.PROCESSED_DATA_PATH
+        xgb_models = [name for name in config.MODEL_TARGETS if name in TUNABLE_MODELS]
+        n_jobs = config.TRAINING_THREADS or os.cpu_count() or 1
+        
+        print("🔄 Fitting preprocessor chunk by chunk...")
+        self.preprocessor.fit_streaming(filepath, chunk_size, shared_models=xgb_models)
+        xgb_features = self.preprocessor.model_features[xgb_models[0]]
+        columns = self.preprocessor.feature_names + [
+            col for col in config.MODEL_TARGETS.values() if col not in self.preprocessor.feature_names
+        ]
+        
+        num_rows = int(np.max(self.preprocessor.scaler.n_samples_seen_))
+        sample_rate = min(1.0, config.EXTERNAL_MEMORY_RF_ROWS / (num_rows * (1 - test_size)))
+        
+        def preprocessed_chunks():
+            """(features, targets, test mask, RF sample mask) per chunk, deterministic across passes"""
+            for chunk_index, chunk in enumerate(get_storage(filepath).iter_chunks(filepath, chunk_size, columns)):
+                rng = np.random.RandomState(config.RANDOM_STATE + chunk_index)
+                is_test = rng.rand(len(chunk)) < test_size
+                in_sample = rng.rand(len(chunk)) < sample_rate
+                targets = {name: chunk[col].copy() for name, col in config.MODEL_TARGETS.items()}
+                yield self.preprocessor.transform_features(chunk), targets, is_test, in_sample
+        
+        def xgb_chunks(test):
+            return lambda: (X[xgb_features].to_numpy(dtype=np.float32)[is_test == test]
+                            for X, _, is_test, _ in preprocessed_chunks())
+        
+        # One pass collects the XGBoost labels and the sample for the other models
+        sampled_models = [name for name in config.MODEL_TARGETS if name not in xgb_models]
+        parts = {name: ([], [], [], []) for name in config.MODEL_TARGETS}
+        for X, targets, is_test, in_sample in preprocessed_chunks():
+            for name, (X_train, y_train, X_test, y_test) in parts.items():
+                train_rows, test_rows = ~is_test, is_test
+                if name in sampled_models:
+                    train_rows, test_rows = train_rows & in_sample, test_rows & in_sample
+                    X_train.append(X[train_rows])
+                    X_test.append(X[test_rows])
+                y_train.append(targets[name][train_rows])
+                y_test.append(targets[name][test_rows])
+        
+        def combine(frames):
+            return pd.concat(frames, ignore_index=True) if frames else None
+        datasets = {name: tuple(combine(frames) for frames in model_parts) for name, model_parts in parts.items()}
+        
+        start = time.perf_counter()
+        print(f"\n📦 Building external-memory matrices from {num_rows:,} rows "
+              f"({config.XGB_MAX_BIN} bins, {n_jobs} threads)...")
+        dtrain, dtest = self.model_trainer.build_external_matrices(
+            xgb_chunks(False), xgb_chunks(True), xgb_features, n_jobs
         )
-        
-        expense_model, expense_mae = self.model_trainer.train_expense_forecaster(
-            X_train_expense, y_train_expense, X_test_expense, y_test_expense
+        self.model_trainer.train_shared_boosters(
+            dtrain, dtest, {name: (datasets[name][1], datasets[name][3]) for name in xgb_models}, n_jobs
         )
-        
-        print("\n🔍 Top 10 Features for Expense Prediction:")
-        importance = self.model_trainer.metrics['expense_forecaster']['feature_importance'].head(10)
-        print(importance.to_string(index=False))
-        
+        del dtrain, dtest
+        
+        for model_name in sampled_models:
+            X_train, y_train, X_test, y_test = datasets[model_name]
+            print(f"\n🎲 {model_name}: trained on a sample of {len(X_train):,} rows")
+            self.model_trainer.train_with_timing(
+                model_name,
+                self.preprocessor.model_view(X_train, model_name), y_train,
+                self.preprocessor.model_view(X_test, model_name), y_test,
+                n_jobs
+            )
+        
+        self.model_trainer.print_timing_report(time.perf_counter() - start)
+    
     def step4_save_artifacts(self):
         """Step 4: Save all models and preprocessors"""
         print("\n" + "="*70)
@@ -155,23 +294,40 @@ class FinSightTrainingPipeline:
         
         self.model_trainer.save_models()
         self.preprocessor.save_preprocessor()
+        FastProfileScorer(self.preprocessor, self.model_trainer.models).save()
+        self.model_trainer.save_metrics()
         
         print("✅ All artifacts saved successfully")
         
+    def publish_models(self):
+        """Copy the saved artifacts into a new registry version and, unless disabled, promote it"""
+        self.published_version = publish(promote_version=self.promote)
+        if not self.promote:
+            print(f"   Serve it with: python -m src.registry promote {self.published_version}")
+        
     def step5_generate_report(self):
         """Step 5: Generate training summary report"""
         print("\n" + "="*70)
         print("STEP 5: TRAINING SUMMARY")
         print("="*70)
         
+        # Skipped stages leave nothing in memory: use the checkpointed summary instead
+        if not self.model_trainer.metrics:
+            self.model_trainer.load_metrics()
+        if self.engineered_data is not None:
+            num_records, num_features = self.engineered_data.shape
+        else:
+            dataset_info = self.checkpoint.info('features')
+            num_records, num_features = dataset_info.get('records', 'n/a'), dataset_info.get('columns', 'n/a')
+        
         report = f"""
 ╔════════════════════════════════════════════════════════════════════╗
 ║                    FINSIGHT AI TRAINING REPORT                     ║
 ╚════════════════════════════════════════════════════════════════════╝
 
 📅 Training Date: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')}
-📊 Dataset Size: {len(self.engineered_data)} records
-🔢 Total Features: {len(self.engineered_data.columns)}
+📊 Dataset Size: {num_records} records
+🔢 Total Features: {num_features}
 
 ┌────────────────────────────────────────────────────────────────────┐
 │ MODEL PERFORMANCE METRICS                                          │
@@ -200,27 +356,100 @@ class FinSightTrainingPipeline:
         
         print(report)
         
+    def stage_info(self, stage):
+        """Details kept with a stage's checkpoint for later runs that skip it"""
+        if stage == 'features':
+            return {'records': len(self.engineered_data), 'columns': len(self.engineered_data.columns)}
+        return {}
+    
+    def stage_outputs(self, stage):
+        """Files a stage wrote, recorded with its checkpoint"""
+        if stage == 'publish':
+            return [bundle_dir(self.published_version) / BUNDLE_MANIFEST]
+        return self.STAGES[stage]['outputs']
+    
+    def run_stage(self, stage):
+        """Run a stage unless its checkpoint shows inputs and outputs unchanged"""
+        spec = self.STAGES[stage]
+        key = self.checkpoint.stage_key(spec['inputs'], self.stage_params(stage))
+        
+        if not self.force and self.checkpoint.is_current(stage, key):
+            print(f"\n⏭️  Stage '{stage}' is up to date (inputs unchanged), skipping")
+            return False
+        
+        for step in spec['steps']:
+            getattr(self, step)()
+        self.checkpoint.mark_complete(stage, key, self.stage_outputs(stage), info=self.stage_info(stage))
+        return True
+    
     def run_complete_pipeline(self):
-        """Execute complete training pipeline"""
+        """
+        Execute complete training pipeline.
+        
+        Each stage is checkpointed once it succeeds, so a rerun after a failure
+        resumes from the failed stage and an unchanged run only prints the
+        report. Publishing is a stage of its own: trained models whose publish
+        failed are published by the next run, while a version that was
+        published and then rolled back is not promoted again. Returns True on
+        success.
+        """
         try:
             self.step1_generate_data()
-            self.step2_feature_engineering()
-            self.step3_train_models()
-            self.step4_save_artifacts()
+            # A shipped forecaster archive is restored here, never by the processes that map the arrays
+            unpack_if_newer(config.FORECAST_ARCHIVE_PATH, config.FORECAST_ARRAYS_DIR)
+            for stage in self.STAGES:
+                self.run_stage(stage)
             self.step5_generate_report()
             
             print("\n" + "="*70)
             print("🎉 TRAINING PIPELINE COMPLETED SUCCESSFULLY!")
             print("="*70)
+            return True
             
         except Exception as e:
             print(f"\n❌ ERROR: {str(e)}")
             import traceback
             traceback.print_exc()
+            return False
 
 
-def main():
-    """Main execution function"""
+def parse_args(argv=None):
+    """Command-line options"""
+    parser = argparse.ArgumentParser(description="FinSight AI training pipeline")
+    parser.add_argument('--headless', action='store_true',
+                        help="never prompt; existing raw data is kept (implied without a terminal)")
+    parser.add_argument('--regenerate', action='store_true',
+                        help="replace the raw data with a fresh synthetic dataset")
+    parser.add_argument('--samples', type=int, default=config.NUM_SAMPLES,
+                        help="records to generate when (re)generating the raw data")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="generate the raw data in chunks across processes (0 = all cores)")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help=f"rows per generated chunk (default {config.CHUNK_SIZE:,}); implies chunked generation")
+    parser.add_argument('--force', action='store_true',
+                        help="rerun every stage, ignoring checkpoints")
+    parser.add_argument('--incremental', action='store_true',
+                        help="re-engineer only new or changed rows")
+    parser.add_argument('--inplace', action='store_true',
+                        help="engineer and preprocess without copying the data")
+    parser.add_argument('--sequential', action='store_true',
+                        help="train the models one after another")
+    parser.add_argument('--cv', type=int, nargs='?', const=config.CV_FOLDS, default=None, metavar='K',
+                        help=f"also report k-fold cross-validated metrics (default k={config.CV_FOLDS})")
+    parser.add_argument('--large-data', action='store_true',
+                        help="share one quantised XGBoost matrix between models "
+                             f"(automatic from {config.LARGE_DATA_ROWS:,} records)")
+    parser.add_argument('--external-memory', action='store_true',
+                        help="stream the processed data from disk for training (data bigger than RAM)")
+    parser.add_argument('--no-promote', action='store_true',
+                        help="publish the new model version without serving it (see python -m src.registry)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main execution function; returns the process exit code"""
+    args = parse_args(argv)
+    
     print("""
     ╔════════════════════════════════════════════════════════════════╗
     ║                                                                ║
@@ -231,9 +460,24 @@ def main():
     ╚════════════════════════════════════════════════════════════════╝
     """)
     
-    pipeline = FinSightTrainingPipeline()
-    pipeline.run_complete_pipeline()
+    config.ensure_directories()
+    pipeline = FinSightTrainingPipeline(
+        inplace=args.inplace,
+        incremental=args.incremental,
+        parallel_training=config.PARALLEL_TRAINING and not args.sequential,
+        headless=args.headless or not sys.stdin.isatty(),
+        force=args.force,
+        large_data=args.large_data,
+        external_memory=args.external_memory,
+        cv_folds=args.cv,
+        promote=not args.no_promote,
+        regenerate=args.regenerate,
+        num_samples=args.samples,
+        workers=args.workers,
+        chunk_size=args.chunk_size
+    )
+    return 0 if pipeline.run_complete_pipeline() else 1
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file